@@ -14,6 +14,29 @@ PROJ_ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = PROJ_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
+EXTERNAL_DATA_DIR = DATA_DIR / "external"
+# Hive partitioned Parquet dataset (source=/state=/city=/crawl_date=) shared by all sources
+PROCESSED_DATASET_DIR = PROCESSED_DATA_DIR / "dataset"
+# MinHash/LSH index used to cluster the same property across sources and crawls
+ENTITY_INDEX_DIR = PROCESSED_DATA_DIR / "entity_index"
+# Listing photos resized to thumbnails, stored once per content hash
+IMAGES_DIR = RAW_DATA_DIR / "images"
+# Decoded thumbnails as one fixed-shape uint8 array, memory mapped during training
+IMAGE_TENSORS_DIR = PROCESSED_DATA_DIR / "image_tensors"
+# Pretrained CNN embeddings of every stored image, one float16 matrix per backbone
+IMAGE_EMBEDDINGS_DIR = PROCESSED_DATA_DIR / "image_embeddings"
+# Hashed TF-IDF of listing texts as CSR shards aligned to source/listing_id
+TEXT_FEATURES_DIR = PROCESSED_DATA_DIR / "text_features"
+# Text embeddings keyed by normalized text hash, one bounded LRU cache per model version
+TEXT_EMBEDDINGS_DIR = PROCESSED_DATA_DIR / "text_embeddings"
+# Versioned feature groups keyed by source/listing_id, updated incrementally
+FEATURE_STORE_DIR = PROCESSED_DATA_DIR / "feature_store"
+# Offline gazetteer of neighborhood and city centroids (state, city, neighborhood, lat, lon)
+GAZETTEER_PATH = EXTERNAL_DATA_DIR / "gazetteer.csv"
+# Memoized gazetteer lookups, one row per distinct normalized location
+GEOCODE_CACHE_PATH = PROCESSED_DATA_DIR / "geocode_cache.sqlite"
+# Coordinates, neighborhood price aggregates and kNN comparables of every listing
+GEO_FEATURES_PATH = PROCESSED_DATA_DIR / "geo_features.parquet"
 
 # Get current date for organizing processed data
 CURRENT_DATE = datetime.now().strftime("%Y%m%d")
@@ -25,6 +48,24 @@ def get_processed_dir(source: str) -> Path:
     return PROCESSED_DATA_DIR / source / CURRENT_DATE
 
 
+def get_latest_processed_dir(source: str, filename: str = "listings.parquet") -> Path | None:
+    """Get the most recent processed directory for a source that contains filename"""
+    source_dir = PROCESSED_DATA_DIR / source
+    if not source_dir.exists():
+        return None
+
+    dated_dirs = sorted(
+        (d for d in source_dir.iterdir() if d.is_dir() and (d / filename).exists()),
+        key=lambda d: d.name,
+    )
+    return dated_dirs[-1] if dated_dirs else None
+
+
+def get_manifest_path(source: str) -> Path:
+    """Get the manifest of already processed raw files for a specific source"""
+    return PROCESSED_DATA_DIR / source / "manifest.json"
+
+
 MODELS_DIR = PROJ_ROOT / "models"
 
 REPORTS_DIR = PROJ_ROOT / "reports"
@@ -1,13 +1,230 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 
 from loguru import logger
+import numpy as np
+import pandas as pd
+from PIL import Image
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from tqdm import tqdm
 import typer
 
-from real_estate_ml.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
+from real_estate_ml.config import (
+    IMAGE_TENSORS_DIR,
+    IMAGES_DIR,
+    PROCESSED_DATA_DIR,
+    PROCESSED_DATASET_DIR,
+    RAW_DATA_DIR,
+)
+from real_estate_ml.processing.image_store import ImageStore
+from real_estate_ml.processing.parallel import resolve_workers
+from real_estate_ml.processing.sinks import LISTINGS_PARTITIONING
 
 app = typer.Typer()
 
+# Filters in the pandas/pyarrow DNF form, e.g. [("city", "==", "Recife"), ("price", "<", 3000)]
+Filters = Union[pc.Expression, List[Tuple], List[List[Tuple]]]
+
+
+def open_listings_dataset(root: Path = PROCESSED_DATASET_DIR) -> ds.Dataset:
+    """Open the Hive partitioned listings dataset written by write_partitioned_dataset."""
+    return ds.dataset(
+        root,
+        format="parquet",
+        partitioning=ds.partitioning(LISTINGS_PARTITIONING, flavor="hive"),
+    )
+
+
+def _to_expression(filters: Optional[Filters]) -> Optional[pc.Expression]:
+    if filters is None or isinstance(filters, pc.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def read_listings(
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[Filters] = None,
+    root: Path = PROCESSED_DATASET_DIR,
+) -> pd.DataFrame:
+    """
+    Read processed listings, loading only the requested columns and matching rows.
+
+    Filters on partition columns (source, state, city, crawl_date) prune whole
+    directories; filters on other columns are checked against row group statistics
+    so non-matching row groups are never decoded.
+
+    Args:
+        columns: Columns to load (all columns if None)
+        filters: Row filter as a pyarrow expression or DNF list of tuples
+        root: Root directory of the dataset
+    """
+    dataset = open_listings_dataset(root)
+    table = dataset.to_table(columns=columns, filter=_to_expression(filters))
+    logger.info(f"Read {table.num_rows} listings from {root}")
+    return table.to_pandas()
+
+
+def iter_listing_batches(
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[Filters] = None,
+    root: Path = PROCESSED_DATASET_DIR,
+    batch_size: int = 65_536,
+) -> Iterator[pa.RecordBatch]:
+    """Stream processed listings as record batches, with the same pushdown as read_listings."""
+    dataset = open_listings_dataset(root)
+    yield from dataset.to_batches(
+        columns=columns, filter=_to_expression(filters), batch_size=batch_size
+    )
+
+
+IMAGE_TENSOR_FILE = "images.npy"
+IMAGE_INDEX_FILE = "index.parquet"
+
+
+def decode_image(path: Path, size: int) -> np.ndarray:
+    """Load an image as a (size, size, 3) uint8 RGB array, resizing it if needed."""
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        if image.size != (size, size):
+            image = image.resize((size, size), Image.Resampling.BICUBIC)
+        return np.asarray(image, dtype=np.uint8)
+
+
+def _decode_row(tensor: np.ndarray, paths: List[Path], size: int, row: int) -> bool:
+    try:
+        tensor[row] = decode_image(paths[row], size)
+        return True
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not decode thumbnail {paths[row]}: {e}")
+        tensor[row] = 0
+        return False
+
+
+def build_image_tensors(
+    images_dir: Path = IMAGES_DIR,
+    output_dir: Path = IMAGE_TENSORS_DIR,
+    size: int = 224,
+    max_images_per_listing: Optional[int] = None,
+    seed: Optional[int] = 0,
+    workers: Optional[int] = None,
+) -> Path:
+    """
+    Decode the stored listing thumbnails once into a memory mapped uint8 array.
+
+    Writes ``images.npy`` of shape (rows, size, size, 3), where the photos of each
+    listing occupy consecutive rows, and ``index.parquet`` mapping every
+    (source, listing_id) to its ``start``/``stop`` row range. Listings are laid out
+    in a random order (``seed``; None keeps them sorted), so contiguous batches
+    are already shuffled across listings. A thumbnail that cannot be decoded is
+    logged and its row is left zero-filled.
+
+    Args:
+        images_dir: Root of the ImageStore filled by the image downloader
+        output_dir: Directory for the array and its index
+        size: Side of the square images; thumbnails of another size are resized
+        max_images_per_listing: Keep at most this many photos per listing
+        seed: Seed of the listing order
+        workers: Decoding threads (None uses all cores)
+    """
+    with ImageStore(images_dir, (size,)) as store:
+        refs = store.listing_images().drop_duplicates(["source", "listing_id", "content_hash"])
+        refs["path"] = [store.path(content_hash, size) for content_hash in refs["content_hash"]]
+    refs = refs[refs["path"].map(Path.exists).astype(bool)]
+    if refs.empty:
+        raise ValueError(f"No stored {size}px thumbnails found in {images_dir}")
+    if max_images_per_listing:
+        refs = refs.groupby(["source", "listing_id"], sort=False).head(max_images_per_listing)
+
+    listings = refs[["source", "listing_id"]].drop_duplicates(ignore_index=True)
+    if seed is not None:
+        listings = listings.sample(frac=1, random_state=seed, ignore_index=True)
+    refs = listings.merge(refs, on=["source", "listing_id"], how="left", sort=False)
+
+    counts = refs.groupby(["source", "listing_id"], sort=False).size()
+    index = counts.reset_index(name="count")
+    index["stop"] = index["count"].cumsum()
+    index["start"] = index["stop"] - index["count"]
+    index = index[["source", "listing_id", "start", "stop"]]
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tensor_path = output_dir / IMAGE_TENSOR_FILE
+    tmp_path = output_dir / f"{IMAGE_TENSOR_FILE}.tmp"
+    tensor = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.uint8, shape=(len(refs), size, size, 3)
+    )
+
+    paths = refs["path"].tolist()
+    decode = partial(_decode_row, tensor, paths, size)
+    try:
+        # PIL releases the GIL while decoding, so threads can write rows in parallel
+        with ThreadPoolExecutor(resolve_workers(workers)) as executor:
+            decoded = tqdm(executor.map(decode, range(len(paths))), total=len(paths))
+            failed = sum(not ok for ok in decoded)
+        tensor.flush()
+        del tensor
+
+        # Publish the array only once it is complete, then the index that describes it
+        tmp_path.replace(tensor_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    index.to_parquet(output_dir / IMAGE_INDEX_FILE, index=False)
+    if failed:
+        logger.warning(f"{failed} thumbnails could not be decoded, their rows are zero-filled")
+    logger.success(f"Stored {len(refs)} images of {len(index)} listings in {tensor_path}")
+    return tensor_path
+
+
+class ImageTensorLoader:
+    """
+    Serve batches of listing images from the array written by build_image_tensors.
+
+    Batches are contiguous row slices of the memory map, so they are zero-copy
+    views read straight from the page cache; ``shuffle`` only permutes the order
+    of the batches. Each batch comes with the position in ``index`` of the listing
+    every row belongs to.
+    """
+
+    def __init__(
+        self,
+        tensor_dir: Path = IMAGE_TENSORS_DIR,
+        batch_size: int = 64,
+        shuffle: bool = False,
+        seed: Optional[int] = None,
+    ):
+        self.images = np.load(tensor_dir / IMAGE_TENSOR_FILE, mmap_mode="r")
+        self.index = pd.read_parquet(tensor_dir / IMAGE_INDEX_FILE)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+
+        counts = (self.index["stop"] - self.index["start"]).to_numpy()
+        self.row_listing = np.repeat(np.arange(len(self.index)), counts)
+        self._ranges = {
+            (source, str(listing_id)): (start, stop)
+            for source, listing_id, start, stop in self.index.itertuples(index=False)
+        }
+
+    def __len__(self) -> int:
+        return -(-len(self.images) // self.batch_size)
+
+    def listing_images(self, source: str, listing_id) -> np.ndarray:
+        """All photos of one listing as a (n, size, size, 3) view."""
+        start, stop = self._ranges[(source, str(listing_id))]
+        return self.images[start:stop]
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        starts = np.arange(0, len(self.images), self.batch_size)
+        if self.shuffle:
+            starts = self.rng.permutation(starts)
+        for start in starts:
+            stop = start + self.batch_size
+            yield self.images[start:stop], self.row_listing[start:stop]
+
 
 @app.command()
 def main(
@@ -0,0 +1,313 @@
+import hashlib
+import json
+from pathlib import Path
+import re
+import sqlite3
+import time
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+import unicodedata
+
+from loguru import logger
+import numpy as np
+
+from real_estate_ml.config import TEXT_EMBEDDINGS_DIR
+
+VECTORS_FILE = "vectors.f16"
+KEYS_FILE = "keys.sqlite"
+META_FILE = "meta.json"
+
+# Rows the matrix grows by at least when it is full
+MIN_GROWTH_ROWS = 1024
+# Default size cap of a text embedding cache, in vectors
+DEFAULT_MAX_TEXT_EMBEDDINGS = 1_000_000
+
+
+class EmbeddingStore:
+    """
+    Embedding vectors keyed by a content hash, in a memory mapped float16 matrix.
+
+    Vectors are rows of ``vectors.f16`` (raw float16, ``dim`` columns), and a
+    SQLite table maps every key to its row and last access time. Reads are
+    slices of the memory map, so a matrix far larger than RAM can be used. When
+    the matrix is full, its capacity doubles. An existing key is never written
+    again.
+
+    With ``max_rows`` set, the store is a bounded cache: once it is full, adding
+    new keys evicts the least recently used ones and reuses their rows.
+    """
+
+    def __init__(
+        self, directory: Path, dim: int, model: str = "", max_rows: Optional[int] = None
+    ):
+        self.directory = directory
+        self.dim = dim
+        self.model = model
+        self.max_rows = max_rows
+
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_path = directory / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta["dim"] != dim or meta["model"] != model:
+                raise ValueError(
+                    f"{directory} holds {meta['dim']}-d vectors of {meta['model']!r}, "
+                    f"not {dim}-d vectors of {model!r}"
+                )
+        else:
+            meta_path.write_text(json.dumps({"dim": dim, "model": model, "dtype": "float16"}))
+
+        self.conn = sqlite3.connect(directory / KEYS_FILE)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS keys (
+                key TEXT PRIMARY KEY,
+                row INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS keys_accessed ON keys (accessed_at);
+            """
+        )
+        self._count, self._next_row = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(row) + 1, 0) FROM keys"
+        ).fetchone()
+
+        self.vectors_path = directory / VECTORS_FILE
+        self.vectors_path.touch()
+        self._map()
+
+    @classmethod
+    def open(cls, directory: Path, max_rows: Optional[int] = None) -> "EmbeddingStore":
+        """Open an existing store with the dimension and model recorded in its metadata."""
+        meta = json.loads((directory / META_FILE).read_text())
+        return cls(directory, meta["dim"], meta["model"], max_rows=max_rows)
+
+    def _map(self):
+        capacity = self.vectors_path.stat().st_size // (2 * self.dim)
+        self.vectors = (
+            np.memmap(self.vectors_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+            if capacity
+            else np.zeros((0, self.dim), dtype=np.float16)
+        )
+
+    def _reserve(self, rows: int):
+        if rows <= len(self.vectors):
+            return
+        capacity = max(rows, 2 * len(self.vectors), MIN_GROWTH_ROWS)
+        if self.max_rows is not None:
+            capacity = max(rows, min(capacity, self.max_rows))
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        del self.vectors
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 2)
+        self._map()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone() is not None
+
+    def rows(self, keys: Sequence[str]) -> np.ndarray:
+        """Row of every key, or -1 for keys without a vector."""
+        found = {}
+        keys = list(keys)
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(keys), 900):
+            chunk = keys[start : start + 900]
+            found.update(
+                self.conn.execute(
+                    f"SELECT key, row FROM keys WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return np.array([found.get(key, -1) for key in keys], dtype=np.int64)
+
+    def _touch(self, keys: Iterable[str]):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE keys SET accessed_at = ? WHERE key = ?", ((now, key) for key in keys)
+            )
+
+    def missing(self, keys: Iterable[str]) -> List[str]:
+        """Distinct keys that have no vector yet, in input order."""
+        keys = list(dict.fromkeys(keys))
+        return [key for key, row in zip(keys, self.rows(keys)) if row < 0]
+
+    def lookup(self, keys: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch lookup that marks the keys found as recently used.
+
+        Returns:
+            (n, dim) float16 vectors, zero for missing keys, and the boolean mask of hits
+        """
+        keys = list(keys)
+        rows = self.rows(keys)
+        found = rows >= 0
+        vectors = np.zeros((len(keys), self.dim), dtype=np.float16)
+        vectors[found] = self.vectors[rows[found]]
+        self._touch(key for key, hit in zip(keys, found) if hit)
+        return vectors, found
+
+    def get(self, keys: Sequence[str]) -> np.ndarray:
+        """Vectors of the keys as a (n, dim) float16 array; missing keys raise KeyError."""
+        vectors, found = self.lookup(keys)
+        if not found.all():
+            raise KeyError(f"No embedding for {list(np.asarray(keys)[~found][:5])}")
+        return vectors
+
+    def _evict(self, count: int) -> List[int]:
+        """Drop the ``count`` least recently used keys and return their rows."""
+        victims = self.conn.execute(
+            "SELECT key, row FROM keys ORDER BY accessed_at LIMIT ?", (count,)
+        ).fetchall()
+        with self.conn:
+            self.conn.executemany("DELETE FROM keys WHERE key = ?", ((k,) for k, _ in victims))
+        self._count -= len(victims)
+        logger.debug(f"Evicted {len(victims)} least recently used vectors from {self.directory}")
+        return [row for _, row in victims]
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray):
+        """Store vectors for keys not stored yet; keys already present are skipped."""
+        keys = list(keys)
+        new = [i for i, row in enumerate(self.rows(keys)) if row < 0]
+        new = list({keys[i]: i for i in new}.values())
+        if self.max_rows is not None:
+            new = new[-self.max_rows :]
+        if not new:
+            return
+
+        # Rows stay dense: every evicted row is refilled right away
+        appended = len(new)
+        if self.max_rows is not None:
+            appended = min(appended, max(self.max_rows - self._next_row, 0))
+        # Victims leave the index before their rows are overwritten
+        reused = self._evict(len(new) - appended) if appended < len(new) else []
+        rows = np.array(reused + list(range(self._next_row, self._next_row + appended)))
+
+        self._reserve(self._next_row + appended)
+        self.vectors[rows] = np.asarray(vectors)[new].astype(np.float16)
+        self.vectors.flush()
+        # Rows are only published once their vectors are on disk
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO keys VALUES (?, ?, ?)",
+                ((keys[i], int(row), now) for i, row in zip(new, rows)),
+            )
+        self._next_row += appended
+        self._count += len(new)
+
+    def close(self):
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        self.conn.close()
+        logger.debug(f"Closed embedding store {self.directory} with {self._count} vectors")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Unicode, case and whitespace normalization, so trivially different texts share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def text_embedding_key(text: str, model_version: str) -> str:
+    normalized = normalize_embedding_text(text)
+    return hashlib.blake2b(f"{model_version}\0{normalized}".encode(), digest_size=16).hexdigest()
+
+
+class TextEmbeddingCache:
+    """
+    Persistent LRU cache of text embeddings for one model version.
+
+    Vectors are keyed by a hash of the model version and the normalized text, so
+    repeated listing texts (reposts, other sources, reruns) are encoded once,
+    and a new model version never reuses stale vectors. Each version gets its
+    own bounded EmbeddingStore under ``directory``; past ``max_entries`` the
+    least recently used vectors are evicted.
+    """
+
+    def __init__(
+        self,
+        model_version: str,
+        dim: int,
+        directory: Path = TEXT_EMBEDDINGS_DIR,
+        max_entries: int = DEFAULT_MAX_TEXT_EMBEDDINGS,
+    ):
+        self.model_version = model_version
+        self.store = EmbeddingStore(
+            directory / re.sub(r"[^\w.-]+", "_", model_version),
+            dim,
+            model_version,
+            max_rows=max_entries,
+        )
+        self.stats = {"hits": 0, "misses": 0}
+
+    def keys(self, texts: Sequence[str]) -> List[str]:
+        return [text_embedding_key(text, self.model_version) for text in texts]
+
+    def lookup(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Cached vectors of the texts (zero where missing) and the boolean mask of hits."""
+        vectors, found = self.store.lookup(self.keys(texts))
+        self.stats["hits"] += int(found.sum())
+        self.stats["misses"] += int((~found).sum())
+        return vectors, found
+
+    def insert(self, texts: Sequence[str], vectors: np.ndarray):
+        self.store.add(self.keys(texts), vectors)
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        encode: Callable[[List[str]], np.ndarray],
+        batch_size: int = 256,
+    ) -> np.ndarray:
+        """
+        Embed texts, calling ``encode`` only for distinct texts missing from the cache.
+
+        Args:
+            texts: Texts to embed
+            encode: Model call mapping a list of texts to a (n, dim) array
+            batch_size: Texts per ``encode`` call
+
+        Returns:
+            (len(texts), dim) float16 array, in input order
+        """
+        texts = list(texts)
+        keys = self.keys(texts)
+        vectors, found = self.store.lookup(keys)
+        self.stats["hits"] += int(found.sum())
+
+        # One encode per distinct missing key, however often its text repeats
+        pending = {}
+        for i in np.flatnonzero(~found):
+            pending.setdefault(keys[i], []).append(i)
+        self.stats["misses"] += len(pending)
+        pending_keys = list(pending)
+        for start in range(0, len(pending_keys), batch_size):
+            batch_keys = pending_keys[start : start + batch_size]
+            encoded = np.asarray(encode([texts[pending[key][0]] for key in batch_keys]))
+            self.store.add(batch_keys, encoded)
+            for key, vector in zip(batch_keys, encoded.astype(np.float16)):
+                vectors[pending[key]] = vector
+        return vectors
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def close(self):
+        logger.info(f"Text embedding cache {self.model_version}: {self.stats}")
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
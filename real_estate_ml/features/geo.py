@@ -0,0 +1,418 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import hashlib
+from pathlib import Path
+import re
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from real_estate_ml.config import (
+    GAZETTEER_PATH,
+    GEO_FEATURES_PATH,
+    GEOCODE_CACHE_PATH,
+    PROCESSED_DATASET_DIR,
+)
+from real_estate_ml.dataset import open_listings_dataset, read_listings
+from real_estate_ml.processing.entities import normalize_text
+from real_estate_ml.processing.manifest import file_digest
+from real_estate_ml.processing.parallel import resolve_workers
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_K = 10
+DEFAULT_WINDOW_DAYS = 90
+# Listings queried against the tree per thread task
+DEFAULT_QUERY_ROWS = 65_536
+
+# Areas outside this range (m²) are data errors and give no price per m²
+MIN_AREA = 10
+MAX_AREA = 10_000
+
+LOCATION_COLUMNS = ["state", "city", "neighborhood"]
+GEO_INPUT_COLUMNS = [
+    "source",
+    "listing_id",
+    "crawl_date",
+    *LOCATION_COLUMNS,
+    "address",
+    "listing_type",
+    "price",
+    "area",
+]
+
+# (latitude, longitude, level) where level is "neighborhood", "address" or "city"
+Place = Tuple[float, float, str]
+
+
+def normalize_location(values: pd.Series) -> pd.Series:
+    """Accent folded, lowercase location names, null when empty."""
+    return values.astype(object).map(normalize_text).replace("", None).astype("string")
+
+
+class Gazetteer:
+    """
+    Offline table of place centroids, read from a CSV file.
+
+    The file has ``state``, ``city``, ``neighborhood``, ``lat`` and ``lon``
+    columns, with names spelled as in the listings. A row with an empty
+    neighborhood is the centroid of the city itself.
+    """
+
+    def __init__(self, path: Path = GAZETTEER_PATH):
+        table = pd.read_csv(path, dtype={column: str for column in LOCATION_COLUMNS})
+        for column in LOCATION_COLUMNS:
+            table[column] = table[column].map(normalize_text)
+
+        self.path = path
+        # Lookups cached under another version of the file are not reused
+        self.digest = file_digest(path)
+        self.places: Dict[Tuple[str, str, str], Tuple[float, float]] = {
+            (state, city, neighborhood): (float(lat), float(lon))
+            for state, city, neighborhood, lat, lon in table[
+                [*LOCATION_COLUMNS, "lat", "lon"]
+            ].itertuples(index=False)
+        }
+
+        # Neighborhood names of every city as one regex, longest first so "boa viagem"
+        # wins over "viagem"
+        self.neighborhood_patterns: Dict[Tuple[str, str], re.Pattern] = {}
+        for (state, city), names in table[table["neighborhood"] != ""].groupby(
+            ["state", "city"]
+        )["neighborhood"]:
+            alternatives = "|".join(
+                re.escape(name) for name in sorted(set(names), key=len, reverse=True)
+            )
+            self.neighborhood_patterns[state, city] = re.compile(f" ({alternatives}) ")
+        logger.info(f"Loaded {len(self.places)} places from gazetteer {path}")
+
+    def resolve(self, state: str, city: str, neighborhood: str, address: str) -> Optional[Place]:
+        """
+        Coordinates of the most specific place matching a normalized location.
+
+        The neighborhood column is tried first, then a known neighborhood of the
+        city mentioned in the address, then the city centroid.
+        """
+        if neighborhood and (state, city, neighborhood) in self.places:
+            return (*self.places[state, city, neighborhood], "neighborhood")
+
+        pattern = self.neighborhood_patterns.get((state, city))
+        if address and pattern is not None:
+            match = pattern.search(f" {address} ")
+            if match:
+                return (*self.places[state, city, match.group(1)], "address")
+
+        if (state, city, "") in self.places:
+            return (*self.places[state, city, ""], "city")
+        return None
+
+
+class Geocoder:
+    """
+    Resolve listing locations through a Gazetteer, memoizing lookups in SQLite.
+
+    Only distinct locations are resolved, and each result (including "not
+    found") is stored under a hash of the normalized location and the gazetteer
+    version, so a rerun only resolves locations it has never seen.
+    """
+
+    def __init__(self, gazetteer: Gazetteer, cache_path: Path = GEOCODE_CACHE_PATH):
+        self.gazetteer = gazetteer
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocodes (
+                key TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                level TEXT
+            )
+            """
+        )
+        self.stats = {"cached": 0, "resolved": 0, "unresolved": 0}
+
+    def _key(self, location: Sequence[str]) -> str:
+        text = "\0".join([self.gazetteer.digest, *location])
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def _cached(self, keys: List[str]) -> Dict[str, Tuple]:
+        found = {}
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(keys), 900):
+            chunk = keys[start : start + 900]
+            rows = self.conn.execute(
+                "SELECT key, lat, lon, level FROM geocodes "
+                f"WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update((key, (lat, lon, level)) for key, lat, lon, level in rows)
+        return found
+
+    def geocode(self, locations: pd.DataFrame) -> pd.DataFrame:
+        """
+        Latitude, longitude and resolution level of every row.
+
+        Args:
+            locations: Frame with state, city, neighborhood and address columns
+
+        Returns:
+            Frame with ``lat``, ``lon`` and ``geo_level`` columns, aligned with ``locations``
+        """
+        columns = [*LOCATION_COLUMNS, "address"]
+        normalized = pd.DataFrame(
+            {column: locations[column].astype(object).map(normalize_text) for column in columns}
+        )
+        distinct = normalized.drop_duplicates().reset_index(drop=True)
+        keys = [self._key(location) for location in distinct.itertuples(index=False)]
+
+        places = self._cached(keys)
+        self.stats["cached"] += len(places)
+        new = []
+        for key, location in zip(keys, distinct.itertuples(index=False)):
+            if key not in places:
+                place = self.gazetteer.resolve(*location) or (None, None, None)
+                places[key] = place
+                new.append((key, *place))
+                self.stats["resolved" if place[0] is not None else "unresolved"] += 1
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)", new)
+
+        resolved = pd.DataFrame([places[key] for key in keys], columns=["lat", "lon", "geo_level"])
+        resolved = pd.concat([distinct, resolved], axis=1)
+        coordinates = normalized.merge(resolved, on=columns, how="left")
+        return coordinates[["lat", "lon", "geo_level"]].set_axis(locations.index)
+
+    def close(self):
+        logger.info(f"Geocoder lookups: {self.stats}")
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def log_price_per_m2(price: pd.Series, area: pd.Series) -> pd.Series:
+    price = pd.to_numeric(price, errors="coerce").astype("float64")
+    area = pd.to_numeric(area, errors="coerce").astype("float64")
+    valid = (price > 0) & area.between(MIN_AREA, MAX_AREA)
+    return np.log(price / area).where(valid)
+
+
+def rolling_price_per_m2(
+    listings: pd.DataFrame, by: List[str], window_days: int = DEFAULT_WINDOW_DAYS
+) -> pd.DataFrame:
+    """
+    Mean log price per m² of the other listings of the same group over a trailing window.
+
+    Listings are aggregated per group and day first, so the rolling window runs
+    over a few points per group instead of over every listing. The window covers
+    the ``window_days`` days up to and including the day of each listing, and the
+    listing itself is left out of its own aggregate.
+
+    Args:
+        listings: Frame with the ``by`` columns, ``day`` and ``log_price_m2``
+        by: Grouping columns, e.g. listing type, city and neighborhood
+        window_days: Length of the trailing window
+
+    Returns:
+        ``mean`` and ``count`` columns aligned with ``listings``
+    """
+    daily = (
+        listings.groupby([*by, "day"], observed=True)["log_price_m2"]
+        .agg(["sum", "count"])
+        .reset_index()
+        .sort_values([*by, "day"])
+    )
+    rolled = (
+        daily.set_index("day")
+        .groupby(by, sort=False, observed=True)[["sum", "count"]]
+        .rolling(f"{window_days}D")
+        .sum()
+        .reset_index()
+    )
+    window = listings[[*by, "day"]].merge(rolled, on=[*by, "day"], how="left")
+
+    own = listings["log_price_m2"].to_numpy()
+    has_own = ~np.isnan(own)
+    count = window["count"].to_numpy() - has_own
+    total = window["sum"].to_numpy() - np.where(has_own, own, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+    return pd.DataFrame({"mean": mean, "count": np.nan_to_num(count)}, index=listings.index)
+
+
+def knn_price_per_m2(
+    coordinates: np.ndarray,
+    log_price_m2: np.ndarray,
+    days: Optional[np.ndarray] = None,
+    k: int = DEFAULT_K,
+    query_rows: int = DEFAULT_QUERY_ROWS,
+    workers: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Median log price per m² and mean distance of the k nearest priced listings.
+
+    A BallTree with the haversine metric is built over the listings that have a
+    price per m², and every listing is queried against it in chunks on a thread
+    pool (tree queries release the GIL). Each query is O(log n), so a million
+    listings take minutes rather than the hours of a pairwise scan. A listing
+    is never its own neighbor.
+
+    With ``days``, like the rolling aggregates, a listing only has neighbors
+    crawled on or before its own day, so later prices never leak into earlier
+    features: days are visited in increasing order, each with a tree over the
+    listings priced up to that day. Listings without a day see every listing.
+
+    Args:
+        coordinates: (n, 2) latitude and longitude in degrees, NaN when unknown
+        log_price_m2: (n,) log price per m², NaN when unknown
+        days: (n,) crawl day of every listing as a number, NaN when unknown
+        k: Neighbors per listing
+        query_rows: Listings per query task
+        workers: Query threads (None uses all cores)
+
+    Returns:
+        (n,) median neighbor log price per m² and (n,) mean neighbor distance in km
+    """
+    n = len(coordinates)
+    median_price = np.full(n, np.nan)
+    mean_distance = np.full(n, np.nan)
+
+    days = np.zeros(n) if days is None else np.asarray(days, dtype="float64")
+    located = ~np.isnan(coordinates).any(axis=1)
+    priced = located & ~np.isnan(log_price_m2)
+    radians = np.radians(coordinates)
+
+    # (reference rows of a tree, rows queried against it)
+    searches = [
+        (np.flatnonzero(priced & (days <= day)), np.flatnonzero(located & (days == day)))
+        for day in np.unique(days[located & ~np.isnan(days)])
+    ]
+    undated = np.flatnonzero(located & np.isnan(days))
+    if len(undated):
+        searches.append((np.flatnonzero(priced), undated))
+
+    def query(tree: BallTree, references: np.ndarray, rows: np.ndarray):
+        neighbors = min(k + 1, len(references))
+        distances, positions = tree.query(radians[rows], k=neighbors)
+        found = references[positions]
+        # Drop the listing itself, then keep the k nearest of the rest
+        keep = found != rows[:, None]
+        keep &= np.cumsum(keep, axis=1) <= k
+        prices = np.where(keep, log_price_m2[found], np.nan)
+        median_price[rows] = np.nanmedian(prices, axis=1)
+        mean_distance[rows] = np.nanmean(np.where(keep, distances, np.nan), axis=1)
+
+    with ThreadPoolExecutor(resolve_workers(workers)) as executor:
+        for references, queries in searches:
+            if len(references) < 2:
+                continue
+            tree = BallTree(radians[references], metric="haversine")
+            chunks = [
+                queries[start : start + query_rows] for start in range(0, len(queries), query_rows)
+            ]
+            list(executor.map(partial(query, tree, references), chunks))
+    return median_price, mean_distance * EARTH_RADIUS_KM
+
+
+def build_geo_features(
+    output_path: Path = GEO_FEATURES_PATH,
+    root: Path = PROCESSED_DATASET_DIR,
+    gazetteer_path: Path = GAZETTEER_PATH,
+    cache_path: Path = GEOCODE_CACHE_PATH,
+    k: int = DEFAULT_K,
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Geocode every listing and compute its neighborhood and kNN price features.
+
+    The latest crawl of each listing is geocoded through the gazetteer. Then
+    the following are computed per listing type (sale and rent prices are
+    never mixed):
+    - rolling neighborhood and city means of log price per m²
+    - the median log price per m² of the ``k`` nearest listings priced up to
+      the crawl date
+
+    Args:
+        output_path: Parquet file for the features, keyed by source and listing_id
+        root: Root of the listings dataset
+        gazetteer_path: Gazetteer CSV file
+        cache_path: SQLite geocoding cache
+        k: Comparables per listing
+        window_days: Trailing window of the neighborhood aggregates
+        workers: kNN query threads (None uses all cores)
+    """
+    available = set(open_listings_dataset(root).schema.names)
+    listings = read_listings(
+        columns=[column for column in GEO_INPUT_COLUMNS if column in available], root=root
+    ).reindex(columns=GEO_INPUT_COLUMNS)
+    listings = listings.dropna(subset=["source", "listing_id"])
+    listings["source"] = listings["source"].astype(str)
+    listings["listing_id"] = listings["listing_id"].astype(str)
+    # One row per listing, as of its latest crawl
+    listings = (
+        listings.sort_values("crawl_date", kind="stable")
+        .drop_duplicates(["source", "listing_id"], keep="last")
+        .reset_index(drop=True)
+    )
+
+    with Geocoder(Gazetteer(gazetteer_path), cache_path) as geocoder:
+        features = listings[["source", "listing_id"]].join(geocoder.geocode(listings))
+    for column in LOCATION_COLUMNS:
+        features[f"{column}_key"] = normalize_location(listings[column])
+    features["location_key"] = (
+        features[[f"{column}_key" for column in LOCATION_COLUMNS]]
+        .fillna("")
+        .astype(str)
+        .agg("/".join, axis=1)
+    )
+
+    groups = pd.DataFrame(
+        {
+            "listing_type": normalize_location(listings["listing_type"]).fillna(""),
+            "state_key": features["state_key"],
+            "city_key": features["city_key"],
+            "neighborhood_key": features["neighborhood_key"],
+            "day": pd.to_datetime(listings["crawl_date"], format="%Y%m%d", errors="coerce"),
+            "log_price_m2": log_price_per_m2(listings["price"], listings["area"]),
+        }
+    )
+    for level, by in [
+        ("neighborhood", ["listing_type", "state_key", "city_key", "neighborhood_key"]),
+        ("city", ["listing_type", "state_key", "city_key"]),
+    ]:
+        aggregate = rolling_price_per_m2(groups, by, window_days)
+        features[f"{level}_log_price_m2"] = aggregate["mean"].astype("float32")
+        features[f"{level}_listings"] = aggregate["count"].astype("int32")
+
+    features["knn_log_price_m2"] = np.nan
+    features["knn_distance_km"] = np.nan
+    coordinates = features[["lat", "lon"]].to_numpy(dtype="float64", na_value=np.nan)
+    days = (groups["day"] - pd.Timestamp(0)).dt.days.to_numpy(dtype="float64", na_value=np.nan)
+    for _, rows in groups.groupby("listing_type").indices.items():
+        median_price, mean_distance = knn_price_per_m2(
+            coordinates[rows],
+            groups["log_price_m2"].to_numpy()[rows],
+            days[rows],
+            k=k,
+            workers=workers,
+        )
+        features.loc[rows, "knn_log_price_m2"] = median_price
+        features.loc[rows, "knn_distance_km"] = mean_distance
+    features = features.astype({"knn_log_price_m2": "float32", "knn_distance_km": "float32"})
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    features.to_parquet(output_path, index=False)
+    located = features["lat"].notna().mean() if len(features) else 0
+    logger.success(
+        f"Wrote geo features of {len(features)} listings ({located:.0%} located) to {output_path}"
+    )
+    return features
@@ -0,0 +1,178 @@
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+
+from real_estate_ml.config import (
+    GEO_FEATURES_PATH,
+    IMAGE_EMBEDDINGS_DIR,
+    IMAGES_DIR,
+    PROCESSED_DATASET_DIR,
+)
+from real_estate_ml.dataset import iter_listing_batches, open_listings_dataset
+from real_estate_ml.features.embeddings import META_FILE, EmbeddingStore
+from real_estate_ml.features.geo import normalize_location
+from real_estate_ml.features.images import listing_image_embeddings
+from real_estate_ml.features.store import KEY_COLUMNS, ORDER_COLUMN, FeatureGroup
+from real_estate_ml.processing.entities import normalize_text
+from real_estate_ml.processing.image_store import ImageStore
+
+TABULAR_COLUMNS = ["area", "bedrooms", "bathrooms", "parking_spaces"]
+CATEGORY_COLUMNS = ["property_type", "listing_type"]
+TEXT_COLUMNS = ["title", "description"]
+
+# Amenity flags matched as whole phrases against accent folded listing text
+TEXT_KEYWORDS = {
+    "has_pool": ("piscina",),
+    "has_balcony": ("varanda", "sacada"),
+    "has_barbecue": ("churrasqueira",),
+    "has_elevator": ("elevador",),
+    "has_gym": ("academia",),
+    "has_doorman": ("portaria", "porteiro"),
+    "is_furnished": ("mobiliado", "mobiliada"),
+    "is_gated": ("condominio fechado",),
+    "sea_view": ("vista mar", "vista para o mar", "beira mar"),
+}
+
+
+def listing_inputs(
+    columns: Sequence[str], root: Path = PROCESSED_DATASET_DIR
+) -> Callable[[], Iterator[pd.DataFrame]]:
+    """Input reader streaming the keys, crawl date and ``columns`` of the listings dataset."""
+    wanted = [*KEY_COLUMNS, ORDER_COLUMN, *columns]
+
+    def read() -> Iterator[pd.DataFrame]:
+        available = set(open_listings_dataset(root).schema.names)
+        present = [column for column in wanted if column in available]
+        for batch in iter_listing_batches(columns=present, root=root):
+            # Columns a dataset lacks are null, so the fingerprints stay comparable
+            yield batch.to_pandas().reindex(columns=wanted)
+
+    return read
+
+
+def tabular_features(inputs: pd.DataFrame) -> pd.DataFrame:
+    features = inputs[TABULAR_COLUMNS].apply(pd.to_numeric, errors="coerce").astype("float32")
+    area = features["area"].where(features["area"] > 0)
+    features["log_area"] = np.log1p(area)
+    features["area_per_bedroom"] = area / features["bedrooms"].where(features["bedrooms"] > 0)
+    features["rooms"] = features["bedrooms"] + features["bathrooms"]
+    for column in CATEGORY_COLUMNS:
+        features[column] = normalize_location(inputs[column])
+    return features
+
+
+def text_features(inputs: pd.DataFrame) -> pd.DataFrame:
+    title = inputs["title"].fillna("").astype(str)
+    text = inputs[TEXT_COLUMNS].fillna("").astype(str).agg(" ".join, axis=1)
+    # Pad with spaces so that phrases only match whole words
+    normalized = " " + text.map(normalize_text) + " "
+
+    features = pd.DataFrame(
+        {
+            "title_length": title.str.len().astype("int32"),
+            "text_words": normalized.str.split().str.len().astype("int32"),
+        }
+    )
+    for name, phrases in TEXT_KEYWORDS.items():
+        pattern = " (?:" + "|".join(phrases) + ") "
+        features[name] = normalized.str.contains(pattern).astype("uint8")
+    return features
+
+
+def geo_feature_group(path: Path = GEO_FEATURES_PATH) -> FeatureGroup:
+    """
+    Coordinates, location keys, neighborhood price aggregates and kNN comparables.
+
+    These depend on other listings, so they are computed for the whole dataset
+    at once by build_geo_features. The group stores that output, and only the
+    listings whose geo features changed get a new row.
+    """
+
+    def read() -> Iterator[pd.DataFrame]:
+        yield pd.read_parquet(path)
+
+    def compute(inputs: pd.DataFrame) -> pd.DataFrame:
+        return inputs.drop(columns=KEY_COLUMNS)
+
+    return FeatureGroup("geo", "2", read, compute)
+
+
+def image_feature_group(embeddings_dir: Path, images_dir: Path = IMAGES_DIR) -> FeatureGroup:
+    """
+    Mean image embedding and photo count of every listing.
+
+    The input of a listing is the sorted list of its photo hashes that have an
+    embedding, so it is recomputed when photos are added or newly embedded.
+    The version includes the embedding model, so a new backbone starts afresh.
+    """
+
+    def read() -> Iterator[pd.DataFrame]:
+        with ImageStore(images_dir) as store:
+            references = store.listing_images()
+        with EmbeddingStore.open(embeddings_dir) as embeddings:
+            embedded = embeddings.rows(references["content_hash"].tolist()) >= 0
+        hashes = (
+            references[embedded]
+            .sort_values("content_hash")
+            .groupby(KEY_COLUMNS, sort=False)["content_hash"]
+            .agg(" ".join)
+        )
+        yield hashes.rename("content_hashes").reset_index()
+
+    def compute(inputs: pd.DataFrame) -> pd.DataFrame:
+        references = inputs.assign(content_hash=inputs["content_hashes"].str.split())
+        references = references.explode("content_hash")
+        with EmbeddingStore.open(embeddings_dir) as embeddings:
+            means = listing_image_embeddings(embeddings, references)
+        features = inputs[KEY_COLUMNS].merge(means, on=KEY_COLUMNS, how="left")
+        features["image_count"] = inputs["content_hashes"].str.split().str.len()
+        return features.drop(columns=KEY_COLUMNS)
+
+    with EmbeddingStore.open(embeddings_dir) as embeddings:
+        model = embeddings.model
+    return FeatureGroup("image", f"1-{model}", read, compute)
+
+
+def latest_image_embeddings_dir(root: Path = IMAGE_EMBEDDINGS_DIR) -> Optional[Path]:
+    """Most recently updated embedding store under ``root``, if any."""
+    stores = [meta.parent for meta in root.glob(f"*/{META_FILE}")]
+    return max(stores, key=lambda path: path.stat().st_mtime, default=None)
+
+
+def default_feature_groups(
+    root: Path = PROCESSED_DATASET_DIR,
+    images_dir: Path = IMAGES_DIR,
+    image_embeddings_dir: Optional[Path] = None,
+    geo_features_path: Path = GEO_FEATURES_PATH,
+) -> List[FeatureGroup]:
+    """
+    The tabular, text, geo and image feature groups.
+
+    The geo group reads the output of build_geo_features, and the image group
+    reads ``image_embeddings_dir``, by default the most recently updated
+    embedding store. Each is left out until its input exists.
+    """
+    groups = [
+        FeatureGroup(
+            "tabular",
+            "1",
+            listing_inputs(TABULAR_COLUMNS + CATEGORY_COLUMNS, root),
+            tabular_features,
+        ),
+        FeatureGroup("text", "1", listing_inputs(TEXT_COLUMNS, root), text_features),
+    ]
+
+    if geo_features_path.exists():
+        groups.append(geo_feature_group(geo_features_path))
+    else:
+        logger.warning(f"No geo features at {geo_features_path}, leaving out the geo group")
+
+    image_embeddings_dir = image_embeddings_dir or latest_image_embeddings_dir()
+    if image_embeddings_dir is None:
+        logger.warning("No image embeddings found, leaving out the image feature group")
+    else:
+        groups.append(image_feature_group(image_embeddings_dir, images_dir))
+    return groups
@@ -0,0 +1,146 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import torch
+import torchvision
+from tqdm import tqdm
+
+from real_estate_ml.config import IMAGE_EMBEDDINGS_DIR, IMAGES_DIR
+from real_estate_ml.dataset import decode_image
+from real_estate_ml.features.embeddings import EmbeddingStore
+from real_estate_ml.processing.image_store import ImageStore
+
+DEFAULT_BACKBONE = "resnet50"
+DEFAULT_BATCH_SIZE = 128
+
+# Attribute holding the classification head in torchvision's model families
+_HEAD_ATTRIBUTES = ("fc", "classifier", "head", "heads")
+
+
+class ImageEmbedder:
+    """
+    Pretrained torchvision CNN with its classification head removed, run on CPU.
+
+    ``threads`` sets the intra-op thread count of torch (None keeps its default of
+    one per core). Set ``pretrained=False`` to use random weights, e.g. offline.
+    """
+
+    def __init__(
+        self,
+        backbone: str = DEFAULT_BACKBONE,
+        threads: Optional[int] = None,
+        pretrained: bool = True,
+    ):
+        if threads:
+            torch.set_num_threads(threads)
+
+        weights = torchvision.models.get_model_weights(backbone).DEFAULT
+        self.model = torchvision.models.get_model(
+            backbone, weights=weights if pretrained else None
+        )
+        for attribute in _HEAD_ATTRIBUTES:
+            if hasattr(self.model, attribute):
+                setattr(self.model, attribute, torch.nn.Identity())
+                break
+        self.model.eval()
+
+        # Resize, crop and normalize exactly as the weights were trained
+        self.transform = weights.transforms()
+        self.name = f"{backbone}-{weights.name}" if pretrained else f"{backbone}-random"
+        self.dim = self.embed(np.zeros((1, 224, 224, 3), dtype=np.uint8)).shape[1]
+
+    @torch.inference_mode()
+    def embed(self, images: np.ndarray) -> np.ndarray:
+        """Embed a (n, height, width, 3) uint8 batch into a (n, dim) float32 array."""
+        batch = torch.from_numpy(np.ascontiguousarray(images)).permute(0, 3, 1, 2)
+        return self.model(self.transform(batch)).numpy()
+
+
+def _load_batch(
+    keys: List[str], paths: List[Path], size: int
+) -> Tuple[List[str], Optional[np.ndarray]]:
+    """Decode a batch, skipping (and logging) the images that cannot be decoded."""
+    decoded_keys, images = [], []
+    for key, path in zip(keys, paths):
+        try:
+            images.append(decode_image(path, size))
+            decoded_keys.append(key)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping image {path} that could not be decoded: {e}")
+    return decoded_keys, np.stack(images) if images else None
+
+
+def embed_images(
+    images_dir: Path = IMAGES_DIR,
+    embeddings_dir: Path = IMAGE_EMBEDDINGS_DIR,
+    backbone: str = DEFAULT_BACKBONE,
+    size: int = 224,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    threads: Optional[int] = None,
+    loader_workers: int = 2,
+    prefetch: int = 4,
+    pretrained: bool = True,
+) -> EmbeddingStore:
+    """
+    Embed every stored thumbnail that has no embedding yet.
+
+    Embeddings are kept per backbone under ``embeddings_dir`` and keyed by the
+    image content hash. Photos shared between listings are therefore embedded
+    once, and a rerun only embeds images downloaded since the last run.
+    ``loader_workers`` threads decode up to ``prefetch`` batches ahead while
+    the model runs on the current one. An image that cannot be decoded is
+    skipped without an embedding, so the next run tries it again.
+
+    Returns:
+        The open EmbeddingStore; the caller closes it
+    """
+    embedder = ImageEmbedder(backbone, threads=threads, pretrained=pretrained)
+    embeddings = EmbeddingStore(embeddings_dir / embedder.name, embedder.dim, embedder.name)
+
+    with ImageStore(images_dir, (size,)) as store:
+        hashes = store.listing_images()["content_hash"].unique()
+        pending = [h for h in embeddings.missing(hashes) if store.path(h, size).exists()]
+        paths = [store.path(h, size) for h in pending]
+    logger.info(f"{len(pending)} of {len(hashes)} images need an embedding ({embedder.name})")
+
+    batches = (
+        (pending[start : start + batch_size], paths[start : start + batch_size])
+        for start in range(0, len(pending), batch_size)
+    )
+    with ThreadPoolExecutor(loader_workers) as executor, tqdm(total=len(pending)) as progress:
+        # Loaders decode up to `prefetch` batches ahead while the model runs on the current one
+        queue = deque(
+            (len(keys), executor.submit(_load_batch, keys, batch_paths, size))
+            for keys, batch_paths in islice(batches, prefetch)
+        )
+        while queue:
+            batch_rows, loading = queue.popleft()
+            for next_keys, next_paths in islice(batches, 1):
+                queue.append(
+                    (len(next_keys), executor.submit(_load_batch, next_keys, next_paths, size))
+                )
+            keys, images = loading.result()
+            if images is not None:
+                embeddings.add(keys, embedder.embed(images))
+            progress.update(batch_rows)
+
+    logger.success(f"Embedding store {embeddings.directory} holds {len(embeddings)} images")
+    return embeddings
+
+
+def listing_image_embeddings(
+    embeddings: EmbeddingStore, listing_images: pd.DataFrame
+) -> pd.DataFrame:
+    """Mean image embedding of every listing, from the rows of ImageStore.listing_images()."""
+    rows = embeddings.rows(listing_images["content_hash"].tolist())
+    keys = listing_images.loc[rows >= 0, ["source", "listing_id"]].reset_index(drop=True)
+    columns = [f"image_emb_{i}" for i in range(embeddings.dim)]
+    vectors = pd.DataFrame(embeddings.vectors[rows[rows >= 0]].astype(np.float32), columns=columns)
+    means = pd.concat([keys, vectors], axis=1).groupby(["source", "listing_id"], sort=False).mean()
+    return means.reset_index()
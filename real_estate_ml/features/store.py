@@ -0,0 +1,252 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from real_estate_ml.config import FEATURE_STORE_DIR
+
+KEY_COLUMNS = ["source", "listing_id"]
+FINGERPRINT_COLUMN = "_fingerprint"
+# Inputs seen in several crawls are ordered by this column; the latest crawl wins
+ORDER_COLUMN = "crawl_date"
+
+DEFAULT_PART_ROWS = 256 * 1024
+# Parts a group may accumulate before update() compacts them into one
+DEFAULT_MAX_PARTS = 16
+ROW_GROUP_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class FeatureGroup:
+    """
+    Features computed together from the same inputs.
+
+    ``read_inputs`` yields frames with the key columns, optionally ``crawl_date``,
+    and the input columns. ``compute`` maps such a frame to its features, one row
+    per input row. Bump ``version`` whenever the features of unchanged inputs
+    would change: each version is stored apart and computed from scratch.
+    """
+
+    name: str
+    version: str
+    read_inputs: Callable[[], Iterable[pd.DataFrame]]
+    compute: Callable[[pd.DataFrame], pd.DataFrame]
+
+
+def listing_keys(frame: pd.DataFrame) -> pd.MultiIndex:
+    """(source, listing_id) index of a frame, both as strings like the stored keys."""
+    return pd.MultiIndex.from_arrays(
+        [frame[column].astype(str).to_numpy() for column in KEY_COLUMNS], names=KEY_COLUMNS
+    )
+
+
+def input_fingerprints(inputs: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of the input columns of every row, used to detect changed rows."""
+    columns = inputs.drop(columns=KEY_COLUMNS + [ORDER_COLUMN], errors="ignore")
+    return pd.util.hash_pandas_object(columns, index=False).to_numpy()
+
+
+def _prepare_inputs(inputs: pd.DataFrame) -> pd.DataFrame:
+    inputs = inputs.dropna(subset=KEY_COLUMNS).reset_index(drop=True)
+    for column in KEY_COLUMNS:
+        inputs[column] = inputs[column].astype(str)
+    return inputs
+
+
+class FeatureStore:
+    """
+    Versioned feature groups keyed by ``(source, listing_id)``, stored as Parquet.
+
+    Every group version lives in ``<root>/<name>/v<version>/`` as a sequence of
+    ``part-NNNNN.parquet`` files holding the keys, a fingerprint of the inputs
+    and the features. An update hashes the inputs of every listing, compares
+    the hashes with the stored ones and computes features only for new or
+    changed listings, written as a new part; the latest part holding a listing
+    wins. Parts are sorted by key and written with statistics, so ``fetch``
+    reads just the rows of the requested listings instead of joining whole files.
+    """
+
+    def __init__(
+        self,
+        groups: Sequence[FeatureGroup],
+        root: Path = FEATURE_STORE_DIR,
+        part_rows: int = DEFAULT_PART_ROWS,
+        max_parts: int = DEFAULT_MAX_PARTS,
+    ):
+        self.groups = {group.name: group for group in groups}
+        self.root = root
+        self.part_rows = part_rows
+        self.max_parts = max_parts
+
+    def group_dir(self, name: str) -> Path:
+        return self.root / name / f"v{self.groups[name].version}"
+
+    def _parts(self, name: str) -> List[Path]:
+        return sorted(self.group_dir(name).glob("part-*.parquet"))
+
+    def _read_parts(self, name: str, **kwargs) -> pd.DataFrame:
+        """Latest stored row of every listing; kwargs go to pq.read_table."""
+        parts = self._parts(name)
+        if not parts:
+            raise ValueError(f"Feature group {name!r} has no data yet; run update first")
+        frames = [pq.read_table(part, **kwargs).to_pandas() for part in parts]
+        # Parts are read in write order, so the last copy of a listing is the newest
+        rows = pd.concat(frames, ignore_index=True)
+        return rows.drop_duplicates(KEY_COLUMNS, keep="last").reset_index(drop=True)
+
+    def stored_fingerprints(self, name: str) -> pd.Series:
+        if self._parts(name):
+            rows = self._read_parts(name, columns=KEY_COLUMNS + [FINGERPRINT_COLUMN])
+        else:
+            rows = pd.DataFrame(
+                {"source": [], "listing_id": [], FINGERPRINT_COLUMN: np.empty(0, np.uint64)}
+            )
+        return pd.Series(rows[FINGERPRINT_COLUMN].to_numpy(), index=listing_keys(rows))
+
+    def _latest_fingerprints(self, group: FeatureGroup) -> pd.Series:
+        """Fingerprint of the latest inputs of every listing (first pass)."""
+        frames = []
+        for inputs in group.read_inputs():
+            inputs = _prepare_inputs(inputs)
+            fingerprints = inputs[KEY_COLUMNS].assign(
+                **{FINGERPRINT_COLUMN: input_fingerprints(inputs)}
+            )
+            if ORDER_COLUMN in inputs:
+                fingerprints[ORDER_COLUMN] = inputs[ORDER_COLUMN].astype(str).to_numpy()
+            frames.append(fingerprints)
+        if not frames:
+            return self.stored_fingerprints(group.name).iloc[:0]
+
+        latest = pd.concat(frames, ignore_index=True)
+        if ORDER_COLUMN in latest:
+            latest = latest.sort_values(ORDER_COLUMN, kind="stable")
+        latest = latest.drop_duplicates(KEY_COLUMNS, keep="last")
+        return pd.Series(latest[FINGERPRINT_COLUMN].to_numpy(), index=listing_keys(latest))
+
+    def update(self, names: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Compute the features of new or changed listings for the given groups.
+
+        Returns:
+            Number of listings computed per group
+        """
+        return {name: self._update_group(self.groups[name]) for name in names or self.groups}
+
+    def _update_group(self, group: FeatureGroup) -> int:
+        stored = self.stored_fingerprints(group.name)
+        latest = self._latest_fingerprints(group)
+        positions = stored.index.get_indexer(latest.index)
+        changed = positions < 0
+        known = ~changed
+        changed[known] = stored.to_numpy()[positions[known]] != latest.to_numpy()[known]
+        targets = latest[changed]
+        logger.info(
+            f"Feature group {group.name} v{group.version}: {len(targets)} of {len(latest)} "
+            "listings are new or changed"
+        )
+        if not len(targets):
+            return 0
+
+        # Second pass: compute only the rows carrying the latest inputs of a target listing
+        computed = np.zeros(len(targets), dtype=bool)
+        target_fingerprints = targets.to_numpy()
+        buffered, buffered_rows = [], 0
+        for inputs in group.read_inputs():
+            inputs = _prepare_inputs(inputs)
+            fingerprints = input_fingerprints(inputs)
+            positions = targets.index.get_indexer(listing_keys(inputs))
+            keep = positions >= 0
+            keep[keep] = target_fingerprints[positions[keep]] == fingerprints[keep]
+            keep[keep] = ~computed[positions[keep]]
+            if not keep.any():
+                continue
+            # A listing repeated inside the batch is computed once
+            kept = np.flatnonzero(keep)
+            keep[kept] = False
+            keep[kept[np.unique(positions[kept], return_index=True)[1]]] = True
+            computed[positions[keep]] = True
+
+            inputs = inputs[keep].reset_index(drop=True)
+            features = group.compute(inputs.drop(columns=[ORDER_COLUMN], errors="ignore"))
+            buffered.append(
+                pd.concat(
+                    [
+                        inputs[KEY_COLUMNS].assign(**{FINGERPRINT_COLUMN: fingerprints[keep]}),
+                        features.reset_index(drop=True),
+                    ],
+                    axis=1,
+                )
+            )
+            buffered_rows += len(inputs)
+            if buffered_rows >= self.part_rows:
+                self._write_part(group.name, buffered)
+                buffered, buffered_rows = [], 0
+        if buffered:
+            self._write_part(group.name, buffered)
+
+        if len(self._parts(group.name)) > self.max_parts:
+            self.compact(group.name)
+        return int(computed.sum())
+
+    def _write_part(self, name: str, frames: List[pd.DataFrame]):
+        group_dir = self.group_dir(name)
+        group_dir.mkdir(parents=True, exist_ok=True)
+        parts = self._parts(name)
+        number = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        path = group_dir / f"part-{number:05d}.parquet"
+
+        rows = pd.concat(frames, ignore_index=True).sort_values(KEY_COLUMNS, kind="stable")
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        # Write then rename, so an interrupted update never leaves a partial part
+        tmp_path = path.with_suffix(".tmp")
+        pq.write_table(
+            table,
+            tmp_path,
+            row_group_size=ROW_GROUP_SIZE,
+            compression="zstd",
+            write_statistics=True,
+        )
+        tmp_path.replace(path)
+        logger.info(f"Wrote {len(rows)} rows of feature group {name} to {path}")
+
+    def compact(self, name: str):
+        """Rewrite the parts of a group into one part holding the latest row of every listing."""
+        parts = self._parts(name)
+        if len(parts) < 2:
+            return
+        self._write_part(name, [self._read_parts(name)])
+        for part in parts:
+            part.unlink()
+        logger.info(f"Compacted {len(parts)} parts of feature group {name}")
+
+    def read(self, name: str) -> pd.DataFrame:
+        """Every stored listing of a group: the key columns and the features."""
+        return self._read_parts(name).drop(columns=FINGERPRINT_COLUMN)
+
+    def fetch(self, keys: pd.DataFrame, names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Features of the given listings from one or more groups, aligned with ``keys``.
+
+        Only the rows of the requested listing IDs are read from each group. Listings
+        missing from a group get nulls for its features.
+
+        Args:
+            keys: Frame with ``source`` and ``listing_id`` columns
+            names: Groups to fetch (all groups if None)
+
+        Returns:
+            One row per row of ``keys``, with the same index
+        """
+        index = listing_keys(keys)
+        listing_ids = index.get_level_values("listing_id").unique().tolist()
+        blocks = []
+        for name in names or self.groups:
+            rows = self._read_parts(name, filters=[("listing_id", "in", listing_ids)])
+            features = rows.drop(columns=KEY_COLUMNS + [FINGERPRINT_COLUMN])
+            blocks.append(features.set_axis(listing_keys(rows)).reindex(index))
+        return pd.concat(blocks, axis=1).set_axis(keys.index)
@@ -0,0 +1,310 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from real_estate_ml.config import PROCESSED_DATASET_DIR, TEXT_FEATURES_DIR
+from real_estate_ml.dataset import iter_listing_batches, open_listings_dataset
+from real_estate_ml.features.store import KEY_COLUMNS, ORDER_COLUMN
+from real_estate_ml.processing.dedup import DEFAULT_PARTITIONS, ExternalDeduplicator
+from real_estate_ml.processing.entities import normalize_text
+from real_estate_ml.processing.parallel import bounded_map, resolve_workers
+
+DEFAULT_N_FEATURES = 2**20
+DEFAULT_TEXT_COLUMNS = ("title", "description")
+# Texts handed to a worker process at a time
+DEFAULT_CHUNK_ROWS = 4096
+
+# Common Portuguese function words, accent folded like the tokens they are matched against
+PORTUGUESE_STOP_WORDS = frozenset(
+    """
+    a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas
+    dele deles depois do dos e ela elas ele eles em entre era eram essa essas esse esses
+    esta estao estas este estes eu foi foram ha isso isto ja la lhe lhes mais mas me
+    mesmo meu meus minha minhas muito na nao nas nem no nos nossa nossas nosso nossos
+    num numa o os ou para pela pelas pelo pelos por qual quando que quem se sem ser
+    seu seus so sua suas tambem te tem tinha to tu tua tuas um uma umas uns voce voces
+    vos sao sobre apos cada todo toda todos todas
+    """.split()
+)
+
+
+class PortugueseAnalyzer:
+    """Accent fold, lowercase and tokenize Portuguese text, dropping stop words."""
+
+    def __init__(self, ngram_range: Tuple[int, int] = (1, 2), min_token_length: int = 2):
+        self.ngram_range = ngram_range
+        self.min_token_length = min_token_length
+
+    def __call__(self, text: str) -> List[str]:
+        tokens = [
+            token
+            for token in normalize_text(text).split()
+            if len(token) >= self.min_token_length and token not in PORTUGUESE_STOP_WORDS
+        ]
+        low, high = self.ngram_range
+        grams = tokens if low == 1 else []
+        for n in range(max(low, 2), high + 1):
+            grams += [" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1)]
+        return grams
+
+
+class HashingTfidf:
+    """
+    TF-IDF over a stateless hashing vectorizer.
+
+    There is no vocabulary: terms are hashed into ``n_features`` columns, so the
+    only fitted state is the document frequency of every column and the number
+    of documents, a fixed size array however much text is seen. ``partial_fit``
+    can therefore be called batch by batch in constant memory.
+    """
+
+    def __init__(
+        self,
+        n_features: int = DEFAULT_N_FEATURES,
+        ngram_range: Tuple[int, int] = (1, 2),
+        sublinear_tf: bool = True,
+    ):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.sublinear_tf = sublinear_tf
+        self.vectorizer = HashingVectorizer(
+            analyzer=PortugueseAnalyzer(self.ngram_range),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32,
+        )
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+
+    def counts(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """Hashed term counts; stateless, so it can run in any worker process."""
+        return self.vectorizer.transform(texts)
+
+    def partial_fit(self, texts: Sequence[str]):
+        self.partial_fit_counts(self.counts(texts))
+
+    def transform(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        return self.transform_counts(self.counts(texts))
+
+    def partial_fit_counts(self, counts: sparse.csr_matrix):
+        # Rows of the hashing vectorizer hold each column at most once
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents += counts.shape[0]
+
+    @property
+    def idf(self) -> np.ndarray:
+        # Smoothed like scikit-learn's TfidfTransformer
+        return (
+            np.log((1 + self.n_documents) / (1 + self.document_frequency)) + 1
+        ).astype(np.float32)
+
+    def transform_counts(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        tf = counts.astype(np.float32, copy=True)
+        if self.sublinear_tf:
+            np.log(tf.data, out=tf.data)
+            tf.data += 1
+        return normalize(sparse.csr_matrix(tf.multiply(self.idf)), norm="l2", copy=False)
+
+    def save(self, path: Path):
+        np.savez(
+            path,
+            document_frequency=self.document_frequency,
+            n_documents=self.n_documents,
+            n_features=self.n_features,
+            ngram_range=self.ngram_range,
+            sublinear_tf=self.sublinear_tf,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "HashingTfidf":
+        with np.load(path) as state:
+            model = cls(
+                int(state["n_features"]),
+                tuple(int(n) for n in state["ngram_range"]),
+                bool(state["sublinear_tf"]),
+            )
+            model.document_frequency = state["document_frequency"]
+            model.n_documents = int(state["n_documents"])
+        return model
+
+
+def _frame_texts(frame: pd.DataFrame, text_columns: Sequence[str]) -> List[str]:
+    texts = frame[list(text_columns)].fillna("").astype(str)
+    return texts.agg(" ".join, axis=1).tolist()
+
+
+def _crawl_recency(listing: Dict) -> Tuple[str]:
+    return (listing[ORDER_COLUMN] or "",)
+
+
+def _spill_latest_texts(
+    text_columns: Sequence[str],
+    root: Path,
+    batch_rows: int,
+    spill_dir: Optional[Path],
+    partitions: int,
+) -> ExternalDeduplicator:
+    """Spill the text of every listing row to disk, to be read back once per listing."""
+    latest = ExternalDeduplicator(spill_dir, partitions, key="key", recency=_crawl_recency)
+    for batch in iter_listing_batches(
+        columns=[*KEY_COLUMNS, ORDER_COLUMN, *text_columns], root=root, batch_size=batch_rows
+    ):
+        frame = batch.to_pandas().dropna(subset=KEY_COLUMNS)
+        if frame.empty:
+            continue
+        sources = frame["source"].astype(str).tolist()
+        listing_ids = frame["listing_id"].astype("int64").tolist()
+        latest.add_many(
+            {
+                "key": f"{source}:{listing_id}",
+                "source": source,
+                "listing_id": listing_id,
+                ORDER_COLUMN: crawl,
+                "text": text,
+            }
+            for source, listing_id, crawl, text in zip(
+                sources,
+                listing_ids,
+                frame[ORDER_COLUMN].astype(str).tolist(),
+                _frame_texts(frame, text_columns),
+            )
+        )
+    return latest
+
+
+def _iter_text_chunks(
+    latest: ExternalDeduplicator, chunk_rows: int
+) -> Iterator[Tuple[pd.DataFrame, List[str]]]:
+    # Listings are re-crawled into a partition per crawl date; the deduplicator yields
+    # one row of the latest crawl, so neither the shards nor the IDF count re-crawls
+    listings = iter(latest)
+    while chunk := list(islice(listings, chunk_rows)):
+        # Each chunk carries its keys, so shards stay aligned however chunks are grouped
+        keys = pd.DataFrame(chunk, columns=[*KEY_COLUMNS, ORDER_COLUMN])
+        yield keys, [listing["text"] for listing in chunk]
+
+
+def _counts_chunk(args) -> Tuple[pd.DataFrame, sparse.csr_matrix]:
+    vectorizer, keys, texts = args
+    return keys, vectorizer.transform(texts)
+
+
+def build_text_features(
+    output_dir: Path = TEXT_FEATURES_DIR,
+    root: Path = PROCESSED_DATASET_DIR,
+    text_columns: Sequence[str] = DEFAULT_TEXT_COLUMNS,
+    n_features: int = DEFAULT_N_FEATURES,
+    ngram_range: Tuple[int, int] = (1, 2),
+    shard_rows: int = 65_536,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: Optional[int] = None,
+    refit: bool = True,
+    spill_dir: Optional[Path] = None,
+    dedup_partitions: int = DEFAULT_PARTITIONS,
+) -> HashingTfidf:
+    """
+    Hash listing texts into TF-IDF features written as CSR ``.npz`` shards.
+
+    The texts are first spilled to disk by an ExternalDeduplicator, which keeps
+    the row of the latest crawl of every listing. Two streaming passes over the
+    deduplicated texts follow: the first counts document frequencies, the second
+    writes ``text-NNNNN.npz`` shards of about ``shard_rows`` rows, each next to a
+    ``text-NNNNN.keys.parquet`` with the source, listing_id and crawl_date of
+    every row. Tokenization is fanned out to ``workers`` processes in chunks of
+    ``chunk_rows`` texts, with a bounded number in flight, so time grows linearly
+    with the data and memory is bounded by the largest dedup partition.
+
+    Args:
+        output_dir: Directory for ``idf.npz`` and the shards
+        root: Root of the listings dataset
+        text_columns: Text columns concatenated per listing (missing ones are skipped)
+        n_features: Hashed feature columns
+        ngram_range: Word n-gram sizes
+        shard_rows: Rows per shard
+        chunk_rows: Texts per worker task
+        workers: Worker processes (None uses all cores, 1 runs inline)
+        refit: Recount document frequencies; with False the saved ``idf.npz`` is reused
+        spill_dir: Directory for the dedup partitions (default: system temp)
+        dedup_partitions: Number of partitions the texts are spilled to
+    """
+    available = set(open_listings_dataset(root).schema.names)
+    text_columns = [column for column in text_columns if column in available]
+    if not text_columns:
+        raise ValueError(f"None of the text columns are in the dataset at {root}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    idf_path = output_dir / "idf.npz"
+    model = (
+        HashingTfidf(n_features, ngram_range)
+        if refit or not idf_path.exists()
+        else HashingTfidf.load(idf_path)
+    )
+
+    latest = _spill_latest_texts(text_columns, root, shard_rows, spill_dir, dedup_partitions)
+
+    workers = resolve_workers(workers)
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+
+    def counted_chunks():
+        # Only the stateless vectorizer is sent to the workers, not the fitted frequencies
+        chunks = (
+            (model.vectorizer, keys, texts)
+            for keys, texts in _iter_text_chunks(latest, chunk_rows)
+        )
+        return bounded_map(executor, _counts_chunk, chunks, max_in_flight=2 * workers)
+
+    try:
+        if refit or not idf_path.exists():
+            # Pass 1: document frequencies
+            for _, counts in counted_chunks():
+                model.partial_fit_counts(counts)
+            model.save(idf_path)
+            logger.info(f"Counted document frequencies over {model.n_documents} listings")
+
+        # Pass 2: weighted, normalized shards
+        for old_shard in output_dir.glob("text-*"):
+            old_shard.unlink()
+        shard, buffered_keys, buffered = 0, [], []
+        for keys, counts in counted_chunks():
+            buffered_keys.append(keys)
+            buffered.append(model.transform_counts(counts))
+            if sum(m.shape[0] for m in buffered) >= shard_rows:
+                _write_shard(output_dir, shard, buffered_keys, buffered)
+                shard, buffered_keys, buffered = shard + 1, [], []
+        if buffered:
+            _write_shard(output_dir, shard, buffered_keys, buffered)
+            shard += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        latest.close()
+
+    logger.success(f"Wrote {shard} text feature shards to {output_dir}")
+    return model
+
+
+def _write_shard(
+    output_dir: Path, shard: int, keys: List[pd.DataFrame], matrices: List[sparse.csr_matrix]
+):
+    sparse.save_npz(output_dir / f"text-{shard:05d}.npz", sparse.vstack(matrices, format="csr"))
+    pd.concat(keys, ignore_index=True).to_parquet(
+        output_dir / f"text-{shard:05d}.keys.parquet", index=False
+    )
+
+
+def iter_text_features(
+    output_dir: Path = TEXT_FEATURES_DIR,
+) -> Iterator[Tuple[pd.DataFrame, sparse.csr_matrix]]:
+    """Yield the (keys, CSR matrix) pairs of every shard, in order."""
+    for matrix_path in sorted(output_dir.glob("text-*.npz")):
+        keys = pd.read_parquet(matrix_path.with_suffix(".keys.parquet"))
+        yield keys, sparse.load_npz(matrix_path)
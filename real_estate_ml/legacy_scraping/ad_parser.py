@@ -0,0 +1,107 @@
+import codecs
+from functools import lru_cache
+from typing import Dict, Optional, Union
+
+from lxml import etree
+
+# Single-valued fields of an OLX ad page, keyed by the data-testid of their element
+AD_FIELD_TESTIDS = {
+    "ad-title": "title",
+    "ad-description": "description",
+    "ad-price-value": "price",
+    "ad-address": "location",
+    "ad-posted-date": "published_date",
+    "ad-identifier": "ad_id",
+    "seller-name": "seller_name",
+    "seller-member-since": "seller_since",
+}
+
+# Labels of the property table and the item field each one maps to
+AD_PROPERTY_FIELDS = {
+    "Tipo": "property_type",
+    "Área total": "area_total",
+    "Área útil": "area_util",
+    "Quartos": "bedrooms",
+    "Banheiros": "bathrooms",
+    "Vagas na garagem": "parking_spots",
+    "Condomínio": "condo_fee",
+    "IPTU": "iptu",
+    "Aceita animais": "accept_pets",
+    "Mobiliado": "furnished",
+}
+
+# Compiled once at import. Every field is marked with a data-testid, so a single
+# walk over those elements replaces one descendant search per field.
+_TESTID_XPATH = etree.XPath("//*[@data-testid]")
+
+
+@lru_cache(maxsize=None)
+def _html_parser(encoding: Optional[str]) -> etree.HTMLParser:
+    # libxml2 does not know every Python alias (e.g. "latin-1"), so pass the codec name
+    if encoding:
+        encoding = codecs.lookup(encoding).name
+    return etree.HTMLParser(
+        encoding=encoding, remove_comments=True, no_network=True, collect_ids=False
+    )
+
+
+def _text(element) -> str:
+    return "".join(element.itertext()).strip()
+
+
+def parse_ad_html(body: Union[bytes, str], encoding: Optional[str] = "utf-8") -> Dict:
+    """
+    Extract the fields of an OLX ad page from its raw HTML.
+
+    Args:
+        body: Response body, as bytes or already decoded text
+        encoding: Encoding of ``body`` when given as bytes
+
+    Returns:
+        Dictionary with every ``RealEstateItem`` field the page provides; fields
+        missing from the page are None and ``image_urls`` is a list
+    """
+    if isinstance(body, str):
+        body, encoding = body.encode("utf-8"), "utf-8"
+
+    ad = dict.fromkeys([*AD_FIELD_TESTIDS.values(), *AD_PROPERTY_FIELDS.values()])
+    ad["image_urls"] = []
+
+    root = etree.fromstring(body, _html_parser(encoding)) if body.strip() else None
+    if root is None:
+        return ad
+
+    label = None
+    for element in _TESTID_XPATH(root):
+        testid = element.get("data-testid")
+        field = AD_FIELD_TESTIDS.get(testid)
+        if field is not None:
+            # The first occurrence wins, as with a CSS selector's get()
+            if ad[field] is None:
+                ad[field] = _text(element) or None
+        elif testid == "ad-property-label":
+            label = _text(element)
+        elif testid == "ad-property-value":
+            field = AD_PROPERTY_FIELDS.get(label)
+            value = _text(element)
+            if field and value and ad[field] is None:
+                ad[field] = value
+            label = None
+        elif testid == "ad-image":
+            src = element.get("src")
+            if src:
+                ad["image_urls"].append(src)
+
+    # Keep just the number of identifiers shown like "ID: 12345678"
+    if ad["ad_id"]:
+        ad["ad_id"] = ad["ad_id"].split(":")[-1].strip()
+
+    return ad
+
+
+def is_empty_ad(ad: Dict) -> bool:
+    """True when a parsed page has none of the core fields, e.g. a blocked or JS-only page."""
+    return not any(
+        ad.get(field)
+        for field in ("title", "description", "price", "property_type", "area_util", "bedrooms")
+    )
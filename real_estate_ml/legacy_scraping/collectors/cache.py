@@ -0,0 +1,272 @@
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import sqlite3
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from loguru import logger
+
+from real_estate_ml.config import RAW_DATA_DIR
+
+DEFAULT_CACHE_PATH = RAW_DATA_DIR / "http_cache.sqlite"
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# Listing details change slowly, recommendations rotate quickly
+DEFAULT_ENDPOINT_TTLS = {
+    "https://apigw.olx.com.br/api/v2/rec": 6 * 3600,
+    "https://glue-api.zapimoveis.com.br/v2/listings": 24 * 3600,
+}
+
+# Query parameters that change per session without changing the response
+VOLATILE_PARAMS = {"lurker_id"}
+
+
+def normalize_url(url: str, params: Optional[Dict] = None) -> str:
+    """Canonical cache key: lowercase scheme/host, sorted query without session parameters."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(str(k), str(v)) for k, v in (params or {}).items()]
+    query = sorted((k, v) for k, v in query if k not in VOLATILE_PARAMS)
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), "")
+    )
+
+
+@dataclass
+class CachedResponse:
+    key: str
+    status: int
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ResponseCache:
+    """
+    On-disk cache of JSON API responses in SQLite.
+
+    Entries are keyed by the normalized URL and query parameters. An entry is
+    served without any request while younger than the TTL of its endpoint (the
+    longest matching prefix in ``ttls``); after that it is revalidated with
+    ``If-None-Match``/``If-Modified-Since`` when the server sent an ETag or
+    Last-Modified header, and a 304 renews it without downloading the body.
+    When the bodies exceed ``max_bytes`` the least recently used entries are
+    evicted. With ``offline=True`` every cached entry is served regardless of
+    age and missing entries are not fetched, so development runs need no network.
+
+    ``stats`` counts hits (served from cache), revalidated (304) and misses.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DEFAULT_CACHE_PATH,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        offline: bool = False,
+    ):
+        self.db_path = db_path
+        self.ttls = DEFAULT_ENDPOINT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+        )
+        # Kept up to date by store/_evict, so checking the size limit needs no table scan
+        self.total_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def ttl_for(self, key: str) -> float:
+        matches = [prefix for prefix in self.ttls if key.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else self.default_ttl
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        row = self.conn.execute(
+            "SELECT key, status, body, etag, last_modified, stored_at FROM responses "
+            "WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return CachedResponse(*row)
+
+    def store(self, key: str, status: int, body: bytes, headers) -> CachedResponse:
+        now = time.time()
+        entry = CachedResponse(
+            key, status, body, headers.get("ETag"), headers.get("Last-Modified"), now
+        )
+        with self.conn:
+            replaced = self.conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, status, body, entry.etag, entry.last_modified, now, now, len(body)),
+            )
+        self.total_bytes += len(body) - (replaced[0] if replaced else 0)
+        self._evict()
+        return entry
+
+    def _renew(self, key: str):
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key),
+            )
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        total = self.total_bytes
+
+        evicted = 0
+        with self.conn:
+            rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+            stale = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            evicted = len(stale)
+        self.total_bytes = total
+        logger.debug(f"Evicted {evicted} cached responses to stay under {self.max_bytes} bytes")
+
+    @staticmethod
+    def conditional_headers(entry: CachedResponse) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _serve_cached(
+        self, key: str, entry: Optional[CachedResponse]
+    ) -> Optional[Tuple[Optional[int], Optional[object]]]:
+        """The result to return without any request, or None if one is needed."""
+        if entry is not None and (
+            self.offline or time.time() - entry.stored_at < self.ttl_for(key)
+        ):
+            self.stats["hits"] += 1
+            return entry.status, entry.json()
+
+        if self.offline:
+            self.stats["misses"] += 1
+            logger.warning(f"Offline and not cached: {key}")
+            return None, None
+        return None
+
+    def _request_headers(
+        self, entry: Optional[CachedResponse], headers: Optional[Dict]
+    ) -> Dict[str, str]:
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(self.conditional_headers(entry))
+        return request_headers
+
+    def _complete(
+        self, key: str, entry: Optional[CachedResponse], status: Optional[int], response
+    ) -> Tuple[Optional[int], Optional[object]]:
+        if status == 304 and entry is not None:
+            self.stats["revalidated"] += 1
+            self._renew(key)
+            return entry.status, entry.json()
+
+        self.stats["misses"] += 1
+        if status != 200:
+            return status, None
+
+        entry = self.store(key, status, response.content, response.headers)
+        return entry.status, entry.json()
+
+    def get_json(
+        self,
+        fetch: Callable,
+        url: str,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+    ) -> Tuple[Optional[int], Optional[object]]:
+        """
+        Return ``(status, data)`` for a GET, going through the cache.
+
+        Args:
+            fetch: Function called like ``fetch(url, params=..., headers=...)`` that
+                returns a response with ``status_code``, ``headers`` and ``content``
+            url: Request URL
+            params: Query parameters
+            headers: Request headers
+        """
+        key = normalize_url(url, params)
+        entry = self.lookup(key)
+        cached = self._serve_cached(key, entry)
+        if cached is not None:
+            return cached
+
+        response = fetch(url, params=params, headers=self._request_headers(entry, headers))
+        return self._complete(key, entry, response.status_code, response)
+
+    async def get_json_async(
+        self,
+        fetch: Callable[..., Awaitable[Tuple[Optional[int], Optional[object]]]],
+        url: str,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+    ) -> Tuple[Optional[int], Optional[object]]:
+        """
+        Async version of get_json.
+
+        Args:
+            fetch: Coroutine function called like ``fetch(url, params=..., headers=...)``
+                returning ``(status, response)``, e.g. AsyncFetcher.get_response
+            url: Request URL
+            params: Query parameters
+            headers: Request headers
+        """
+        key = normalize_url(url, params)
+        entry = self.lookup(key)
+        cached = self._serve_cached(key, entry)
+        if cached is not None:
+            return cached
+
+        status, response = await fetch(
+            url, params=params, headers=self._request_headers(entry, headers)
+        )
+        return self._complete(key, entry, status, response)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from curl_cffi.requests import AsyncSession
+from loguru import logger
+
+# Status codes worth retrying; anything else is returned to the caller as is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hold back every request to this host for ``seconds`` (e.g. after a 429)."""
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class AsyncFetcher:
+    """
+    Fetch JSON APIs concurrently over one pooled keep-alive session.
+
+    At most ``concurrency`` requests are in flight and every host gets its own
+    token bucket of ``rate`` requests per second, so throughput is bounded by the
+    agreed budget rather than by fixed sleeps. Failed requests are retried with
+    exponential backoff and jitter; a ``Retry-After`` header takes precedence and
+    also pauses the host's bucket.
+
+    Use as an async context manager::
+
+        async with AsyncFetcher(concurrency=8, rate=2) as fetcher:
+            status, data = await fetcher.get_json(url, params=params)
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        rate: float = 1.0,
+        burst: int = 1,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        headers: Optional[Dict[str, str]] = None,
+        impersonate: str = "chrome110",
+        timeout: float = 30.0,
+    ):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.headers = headers or {}
+        self.impersonate = impersonate
+        self.timeout = timeout
+
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.session: Optional[AsyncSession] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    async def __aenter__(self):
+        self.session = AsyncSession(
+            max_clients=self.concurrency,
+            headers=self.headers,
+            impersonate=self.impersonate,
+            timeout=self.timeout,
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def get_json(
+        self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None
+    ) -> Tuple[Optional[int], Optional[object]]:
+        """
+        GET a JSON resource.
+
+        Returns:
+            ``(status, data)``; ``data`` is None unless the response was a 200, and
+            ``status`` is None when every attempt failed without a response
+        """
+        return await self._get(url, params, headers, lambda response: response.json())
+
+    async def get_bytes(
+        self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None
+    ) -> Tuple[Optional[int], Optional[bytes]]:
+        """GET a binary resource such as an image; returns ``(status, body)`` like get_json."""
+        return await self._get(url, params, headers, lambda response: response.content)
+
+    async def get_response(
+        self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None
+    ):
+        """GET a resource and return ``(status, response)``, for ResponseCache.get_json_async."""
+        return await self._get(url, params, headers, lambda response: response)
+
+    async def _get(
+        self, url: str, params: Optional[Dict], headers: Optional[Dict], parse: Callable
+    ) -> Tuple[Optional[int], Optional[object]]:
+        bucket = self._bucket(url)
+        status = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+
+            await bucket.acquire()
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    self.stats["requests"] += 1
+                    response = await self.session.get(url, params=params, headers=headers)
+                status = response.status_code
+
+                if status == 200:
+                    return status, parse(response)
+                if status == 304:
+                    # Answer to a conditional request; the caller still has the body
+                    return status, None
+                if status not in RETRY_STATUSES:
+                    logger.error(f"Request to {url} failed with status {status}")
+                    return status, None
+
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                logger.warning(f"Request to {url} returned {status} (attempt {attempt + 1})")
+            except Exception as e:
+                logger.warning(f"Request to {url} failed (attempt {attempt + 1}): {e}")
+
+            if attempt < self.max_retries:
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if retry_after is not None:
+                    bucket.pause(retry_after)
+                await asyncio.sleep(delay)
+
+        self.stats["failures"] += 1
+        logger.error(f"Giving up on {url} after {self.max_retries + 1} attempts")
+        return status, None
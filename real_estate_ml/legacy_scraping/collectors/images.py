@@ -0,0 +1,126 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from loguru import logger
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from real_estate_ml.legacy_scraping.collectors.fetcher import AsyncFetcher
+from real_estate_ml.processing.image_store import ImageReference, ImageStore, image_content_hash
+
+DEFAULT_JPEG_QUALITY = 90
+
+
+def make_thumbnails(
+    body: bytes, sizes: Sequence[int], quality: int = DEFAULT_JPEG_QUALITY
+) -> Tuple[Dict[int, bytes], Tuple[int, int]]:
+    """
+    Decode an image and center crop it to square JPEG thumbnails.
+
+    Returns:
+        Thumbnail bytes per size, and the (width, height) of the original image
+    """
+    with Image.open(io.BytesIO(body)) as image:
+        original_size = image.size
+        # Let the JPEG decoder downscale by a power of two while staying above the largest size
+        image.draft("RGB", (max(sizes), max(sizes)))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        thumbnails = {}
+        for size in sizes:
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.BICUBIC)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format="JPEG", quality=quality)
+            thumbnails[size] = buffer.getvalue()
+    return thumbnails, original_size
+
+
+class ImageDownloader:
+    """
+    Download listing photos into an ImageStore with a bounded pool of workers.
+
+    ``concurrency`` workers share one pooled AsyncFetcher session, so connections
+    to the image CDN are reused and every host is held to ``rate`` requests per
+    second. Decoding and resizing run in a thread pool while other downloads
+    continue. An image whose content hash is already stored is not resized or
+    written again. URLs with a final outcome are skipped, so an interrupted run
+    picks up where it stopped.
+    """
+
+    def __init__(
+        self,
+        store: ImageStore,
+        concurrency: int = 16,
+        rate: float = 10.0,
+        burst: int = 10,
+        resize_workers: Optional[int] = None,
+        quality: int = DEFAULT_JPEG_QUALITY,
+    ):
+        self.store = store
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.resize_workers = resize_workers or os.cpu_count() or 1
+        self.quality = quality
+        self.stats = {"downloaded": 0, "deduplicated": 0, "failed": 0, "invalid": 0}
+
+    async def _fetch_one(self, fetcher: AsyncFetcher, executor: ThreadPoolExecutor, url: str):
+        status, body = await fetcher.get_bytes(url)
+        if body is None:
+            self.stats["failed"] += 1
+            self.store.record_url(url, status)
+            return
+
+        content_hash = image_content_hash(body)
+        if self.store.has_image(content_hash):
+            self.stats["deduplicated"] += 1
+            self.store.record_url(url, status, content_hash)
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            thumbnails, original_size = await loop.run_in_executor(
+                executor, make_thumbnails, body, self.store.sizes, self.quality
+            )
+        except (UnidentifiedImageError, OSError) as e:
+            logger.warning(f"Could not decode image {url}: {e}")
+            self.stats["invalid"] += 1
+            self.store.record_url(url, status)
+            return
+
+        self.store.add_image(content_hash, thumbnails, original_size, len(body))
+        self.store.record_url(url, status, content_hash)
+        self.stats["downloaded"] += 1
+
+    async def _worker(self, queue: asyncio.Queue, fetcher, executor):
+        while (url := await queue.get()) is not None:
+            try:
+                await self._fetch_one(fetcher, executor, url)
+            except Exception as e:
+                logger.error(f"Error downloading image {url}: {e}")
+                self.stats["failed"] += 1
+
+    async def download(self, references: Iterable[ImageReference]) -> Dict[str, int]:
+        """Link the references to their listings and fetch every URL not stored yet."""
+        self.store.link(references)
+
+        # A bounded queue keeps memory flat however many URLs are pending
+        queue = asyncio.Queue(maxsize=self.concurrency * 4)
+        async with AsyncFetcher(
+            concurrency=self.concurrency, rate=self.rate, burst=self.burst
+        ) as fetcher:
+            with ThreadPoolExecutor(self.resize_workers) as executor:
+                workers = [
+                    asyncio.create_task(self._worker(queue, fetcher, executor))
+                    for _ in range(self.concurrency)
+                ]
+                for url in self.store.pending_urls():
+                    await queue.put(url)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+
+        logger.info(f"Image download finished: {self.stats}")
+        return self.stats
@@ -1,23 +1,48 @@
+import asyncio
 from datetime import datetime
-import json
+from functools import partial
 from pathlib import Path
 import random
 import time
+from typing import Optional
 import uuid
 
 from curl_cffi import requests as cureq
 from loguru import logger
 
+from real_estate_ml.legacy_scraping.collectors.cache import ResponseCache
+from real_estate_ml.legacy_scraping.collectors.fetcher import AsyncFetcher
+from real_estate_ml.legacy_scraping.collectors.storage import StorageKind, create_store
+from real_estate_ml.legacy_scraping.frontier import (
+    DEFAULT_FRONTIER_PATH,
+    DEFAULT_SEEN_MAX_AGE,
+    CrawlFrontier,
+)
+
 
 class OlxApiCollector:
-    def __init__(self):
+    def __init__(
+        self,
+        storage: StorageKind = "files",
+        frontier_path: Path = DEFAULT_FRONTIER_PATH,
+        cache: Optional[ResponseCache] = None,
+        seen_max_age: Optional[float] = DEFAULT_SEEN_MAX_AGE,
+    ):
         # Create timestamped output directory
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.output_dir = Path("data/raw/olx") / timestamp / "listings"
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # "files" writes one JSON file per response, "segments" appends to zstd JSONL segments
+        # and "dedup" only stores listings whose content was not stored before
+        self.store = create_store(storage, self.output_dir)
 
         self.lurker_id = str(uuid.uuid4())
-        self.processed_listings = set()
+        # Persisted so a restarted collector skips listings it already handled; listings
+        # seen more than seen_max_age seconds ago (None: never) are fetched again
+        self.processed_listings = CrawlFrontier(
+            frontier_path, namespace="olx_collector", max_age=seen_max_age
+        )
+        # Optional on-disk response cache; reruns then skip or revalidate known responses
+        self.cache = cache
 
         # Base API URL
         self.api_base_url = "https://apigw.olx.com.br/api/v2/rec"
@@ -39,20 +64,24 @@ class OlxApiCollector:
 
         logger.info("OLX API Collector initialized")
 
+    def api_params(self, list_id, region_id="81", category_id="1020"):
+        """Query parameters of the recommendation API for a listing ID"""
+        return {
+            "custom_tag": "vi_web",
+            "list_id": list_id,
+            "lurker_id": self.lurker_id,
+            "object_name": "ad_detail",
+            "platform": "web",
+            "region_id": region_id,
+            "subcategory_id": category_id,
+            "test_id": "hold",
+        }
+
     def get_api_response(self, list_id, region_id="81", category_id="1020"):
         """Get API response for a specific listing ID"""
         try:
             # Prepare API parameters
-            params = {
-                "custom_tag": "vi_web",
-                "list_id": list_id,
-                "lurker_id": self.lurker_id,
-                "object_name": "ad_detail",
-                "platform": "web",
-                "region_id": region_id,
-                "subcategory_id": category_id,
-                "test_id": "hold",
-            }
+            params = self.api_params(list_id, region_id, category_id)
 
             # Prepare headers to mimic a browser
             headers = {
@@ -67,35 +96,51 @@ class OlxApiCollector:
             url = f"{self.api_base_url}"
             logger.info(f"Making API request for listing ID: {list_id}")
 
-            response = cureq.get(url, params=params, headers=headers, impersonate="chrome110")
+            status, data = self._get_json(url, params=params, headers=headers)
 
             # Check if request was successful
-            if response.status_code == 200:
+            if status == 200:
                 logger.info(f"Successfully retrieved API response for listing ID: {list_id}")
-                return response.json()
+                return data
             else:
-                logger.error(f"Failed to get API response: {response.status_code}")
+                logger.error(f"Failed to get API response: {status}")
                 return None
 
         except Exception as e:
             logger.error(f"Error getting API response: {e}")
             return None
 
-    def save_api_response(self, data, list_id):
-        """Save API response to a JSON file"""
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"listing_{list_id}_{timestamp}.json"
-            filepath = self.output_dir / filename
+    def _get_json(self, url, params=None, headers=None):
+        """GET a JSON resource through the response cache when one is configured"""
+        fetch = partial(cureq.get, impersonate="chrome110")
+        if self.cache is not None:
+            return self.cache.get_json(fetch, url, params=params, headers=headers)
 
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        response = fetch(url, params=params, headers=headers)
+        return response.status_code, response.json() if response.status_code == 200 else None
 
-            return filepath
+    async def _get_json_async(self, fetcher, url, params=None):
+        """Async GET of a JSON resource through the response cache when one is configured"""
+        if self.cache is not None:
+            return await self.cache.get_json_async(fetcher.get_response, url, params=params)
+        return await fetcher.get_json(url, params=params)
+
+    def save_api_response(self, data, list_id, status=200):
+        """Save API response to the configured store"""
+        try:
+            return self.store.save(data, list_id, status=status)
         except Exception as e:
             logger.error(f"Error saving API response: {e}")
             return None
 
+    def close(self):
+        """Flush and close the response store, the seen listings and the response cache"""
+        self.store.close()
+        self.processed_listings.close()
+        if self.cache is not None:
+            logger.info(f"Response cache stats: {self.cache.stats}")
+            self.cache.close()
+
     def extract_listings_from_response(self, response_data):
         """Extract listing IDs from API response"""
         listings = []
@@ -227,6 +272,39 @@ class OlxApiCollector:
 
         except Exception as e:
             logger.error(f"Error during data collection: {e}")
+        finally:
+            self.close()
+
+    async def collect_listings_async(self, listing_ids, concurrency=8, rate=1.0, burst=1):
+        """
+        Collect listings concurrently over a pooled session.
+
+        Up to ``concurrency`` requests are in flight and the API host receives at
+        most ``rate`` requests per second, instead of sleeping between requests.
+        Responses go through the response cache like in the sequential path.
+        """
+        pending = [i for i in dict.fromkeys(listing_ids) if i not in self.processed_listings]
+        collected_count = 0
+
+        async def collect(fetcher, list_id):
+            nonlocal collected_count
+            status, response_data = await self._get_json_async(
+                fetcher, self.api_base_url, params=self.api_params(list_id)
+            )
+            if response_data:
+                self.save_api_response(response_data, list_id, status=status)
+                collected_count += len(self.extract_listings_from_response(response_data))
+
+        try:
+            async with AsyncFetcher(
+                concurrency=concurrency, rate=rate, burst=burst, headers=self.headers
+            ) as fetcher:
+                await asyncio.gather(*(collect(fetcher, list_id) for list_id in pending))
+                logger.info(f"Request stats: {fetcher.stats}")
+
+            logger.info(f"Data collection completed. Total listings processed: {collected_count}")
+        finally:
+            self.close()
 
 
 if __name__ == "__main__":
@@ -310,5 +388,5 @@ if __name__ == "__main__":
     ]
 
     # Run the collector
-    collector = OlxApiCollector()
+    collector = OlxApiCollector(cache=ResponseCache())
     collector.collect_listings_from_urls(listing_ids)
@@ -0,0 +1,178 @@
+from datetime import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Literal, Optional
+
+from loguru import logger
+
+from real_estate_ml.processing.columnar import iter_gallery_listings
+from real_estate_ml.processing.shards import DEFAULT_MAX_SEGMENT_BYTES, SegmentWriter
+
+StorageKind = Literal["files", "segments", "dedup"]
+
+# Seen (listing ID, content hash) pairs, shared by every run of a source
+CONTENT_INDEX_FILENAME = "content_index.tsv"
+RESPONSE_LOG_FILENAME = "responses.jsonl"
+
+
+class JsonFileStore:
+    """Write every API response to its own ``listing_<id>_<timestamp>.json`` file."""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def save(self, data, listing_id, status: int = 200) -> Path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = self.output_dir / f"listing_{listing_id}_{timestamp}.json"
+
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        return filepath
+
+    def close(self):
+        pass
+
+
+class SegmentStore:
+    """
+    Append API responses to rotating zstd compressed JSONL segments.
+
+    Each record is ``{"listing_id", "fetched_at", "status", "data"}``, the same
+    envelope as the compacted shards, so the processors read both alike.
+    """
+
+    def __init__(self, output_dir: Path, max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES):
+        self.output_dir = output_dir
+        self.writer = SegmentWriter(output_dir, max_segment_bytes=max_segment_bytes)
+
+    def save(self, data, listing_id, status: int = 200) -> Path:
+        record = {
+            "listing_id": str(listing_id),
+            "fetched_at": datetime.now().isoformat(),
+            "status": status,
+            "data": data,
+        }
+        return self.writer.write(record)
+
+    def close(self):
+        self.writer.close()
+
+
+def listing_content_hash(listing: Dict) -> str:
+    """Hash a listing independently of key order and formatting."""
+    canonical = json.dumps(listing, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ContentDedupStore:
+    """
+    Store OLX recommendation responses as deduplicated listing records.
+
+    The same listing shows up in the galleries of many seed IDs, so every response
+    is split into its listings and only (listing ID, content hash) pairs that were
+    never stored before are appended to the segments, as
+    ``{"listing_id", "content_hash", "fetched_at", "seed_id", "data"}`` records.
+    A listing whose content changed is stored again under its new hash. Each
+    response also appends a line to ``responses.jsonl`` referencing its listings,
+    so the original gallery membership can still be reconstructed.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        index_path: Optional[Path] = None,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+    ):
+        self.output_dir = output_dir
+        # output_dir is data/raw/<source>/<timestamp>/listings, the index data/raw/<source>
+        self.index_path = index_path or output_dir.parents[1] / CONTENT_INDEX_FILENAME
+        self.writer = SegmentWriter(
+            output_dir, max_segment_bytes=max_segment_bytes, prefix="listings"
+        )
+        self.seen = self._load_index()
+        self._pending_index: List[str] = []
+        self._log = open(output_dir / RESPONSE_LOG_FILENAME, "a", encoding="utf-8")
+        self.listings_seen = 0
+        self.listings_stored = 0
+
+    def _load_index(self) -> set:
+        if not self.index_path.exists():
+            return set()
+
+        with open(self.index_path, encoding="utf-8") as f:
+            seen = {tuple(line.rstrip("\n").split("\t")) for line in f if line.strip()}
+        logger.info(f"Loaded {len(seen)} stored listing versions from {self.index_path}")
+        return seen
+
+    def save(self, data, listing_id, status: int = 200) -> Path:
+        fetched_at = datetime.now().isoformat()
+        references: List[List[str]] = []
+
+        for listing in iter_gallery_listings(data):
+            item_id = str(listing.get("list_id"))
+            content_hash = listing_content_hash(listing)
+            references.append([item_id, content_hash])
+            self.listings_seen += 1
+
+            if (item_id, content_hash) in self.seen:
+                continue
+
+            self.writer.write(
+                {
+                    "listing_id": item_id,
+                    "content_hash": content_hash,
+                    "fetched_at": fetched_at,
+                    "seed_id": str(listing_id),
+                    "data": listing,
+                }
+            )
+            self.seen.add((item_id, content_hash))
+            self._pending_index.append(f"{item_id}\t{content_hash}\n")
+            self.listings_stored += 1
+
+        response = {
+            "listing_id": str(listing_id),
+            "fetched_at": fetched_at,
+            "status": status,
+            "listings": references,
+        }
+        self._log.write(json.dumps(response, separators=(",", ":")) + "\n")
+        self._log.flush()
+        return self.output_dir / RESPONSE_LOG_FILENAME
+
+    def close(self):
+        # Segments must be durable before the index claims their listings are stored;
+        # after a crash the unindexed listings are simply stored again next run
+        self.writer.close()
+        with open(self.index_path, "a", encoding="utf-8") as index:
+            index.writelines(self._pending_index)
+            index.flush()
+            os.fsync(index.fileno())
+        self._pending_index = []
+
+        if not self._log.closed:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+
+        if self.listings_seen:
+            logger.info(
+                f"Stored {self.listings_stored} of {self.listings_seen} listings "
+                f"({self.listings_seen - self.listings_stored} duplicates skipped)"
+            )
+
+
+def create_store(storage: StorageKind, output_dir: Path):
+    """Create the response store for a collector."""
+    if storage == "files":
+        return JsonFileStore(output_dir)
+    if storage == "segments":
+        return SegmentStore(output_dir)
+    if storage == "dedup":
+        # Only meaningful for OLX recommendation responses, which are lists of galleries
+        return ContentDedupStore(output_dir)
+    raise ValueError(f"Unsupported storage: {storage}")
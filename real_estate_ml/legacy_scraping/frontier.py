@@ -0,0 +1,258 @@
+import hashlib
+import math
+from pathlib import Path
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+from loguru import logger
+import numpy as np
+
+from real_estate_ml.config import RAW_DATA_DIR
+
+# One database shared by every collector and spider, each source in its own namespace
+DEFAULT_FRONTIER_PATH = RAW_DATA_DIR / "frontier.sqlite"
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_EXPECTED_ITEMS = 1_000_000
+# Seen IDs older than this are fetched again by the collectors and spiders: a restart
+# within the same crawl skips them, the next daily crawl picks up price and status changes
+DEFAULT_SEEN_MAX_AGE = 12 * 3600
+
+_MASK64 = (1 << 64) - 1
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys, used to skip database lookups."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> List[int]:
+        # Double hashing with 64 bit wraparound, matching add_many's vectorized version
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [((h1 + i * h2) & _MASK64) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> bool:
+        """Add a key and return whether it may have been present already."""
+        present = True
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                present = False
+                self.bits[position >> 3] |= mask
+        return present
+
+    def _positions_many(self, keys: List[str]) -> np.ndarray:
+        digests = b"".join(
+            hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest() for key in keys
+        )
+        halves = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+        h1, h2 = halves[:, 0], halves[:, 1] | np.uint64(1)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h1[:, None] + steps * h2[:, None]) % np.uint64(self.size)
+
+    def add_many(self, keys: List[str]):
+        """Add many keys at once, hashing them in Python and setting bits with NumPy."""
+        if not keys:
+            return
+        positions = self._positions_many(keys).ravel()
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        np.bitwise_or.at(bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+
+    def contains_many(self, keys: List[str]) -> np.ndarray:
+        """Vectorized membership test; True means the key may be present."""
+        if not keys:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions_many(keys)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        return ((bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1).all(axis=1)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class CrawlFrontier:
+    """
+    Persistent seen-set and work queue for crawlers, backed by SQLite in WAL mode.
+
+    ``add``/``in``/``len`` behave like the in-memory sets the collectors used, so
+    it can replace them directly. Seen IDs are buffered and written in batches of
+    ``batch_size``; a Bloom filter in front of the table answers most lookups of
+    unseen IDs without touching the database, so resident memory stays at a few
+    MB even with millions of IDs.
+
+    IDs queued with ``enqueue`` stay in the queue until they are marked as seen.
+    ``dequeue`` hands each queued ID out once per session, so after a crash or
+    restart every ID that was not finished is handed out again and the crawl
+    resumes where it stopped.
+
+    With ``max_age`` (seconds), IDs seen longer ago than that before the frontier
+    was opened count as unseen, so a later crawl visits them again; marking them
+    seen refreshes their timestamp. Without it, a seen ID is skipped forever.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DEFAULT_FRONTIER_PATH,
+        namespace: str = "default",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        expected_items: int = DEFAULT_EXPECTED_ITEMS,
+        error_rate: float = 0.001,
+        max_age: Optional[float] = None,
+    ):
+        self.db_path = db_path
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.max_age = max_age
+        # Fixed when opening, so IDs marked during this session always stay seen
+        self._cutoff = time.time() - max_age if max_age is not None else 0.0
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seen (
+                namespace TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (namespace, item_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS frontier (
+                position INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                UNIQUE (namespace, item_id)
+            );
+            """
+        )
+
+        self._pending = {}
+        self._cursor = 0
+        self._count = self.conn.execute(
+            "SELECT COUNT(*) FROM seen WHERE namespace = ? AND seen_at >= ?",
+            (namespace, self._cutoff),
+        ).fetchone()[0]
+
+        # Leave headroom so the false positive rate holds while the crawl grows
+        self.bloom = BloomFilter(max(expected_items, 2 * self._count), error_rate)
+        cursor = self.conn.execute(
+            "SELECT item_id FROM seen WHERE namespace = ? AND seen_at >= ?",
+            (namespace, self._cutoff),
+        )
+        while rows := cursor.fetchmany(100_000):
+            self.bloom.add_many([item_id for (item_id,) in rows])
+
+        logger.info(
+            f"Opened crawl frontier {db_path} ({namespace}): {self._count} seen, "
+            f"{self.pending_count()} queued"
+        )
+
+    def _stored(self, key: str) -> bool:
+        if key in self._pending:
+            return True
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM seen WHERE namespace = ? AND item_id = ? AND seen_at >= ?",
+                (self.namespace, key, self._cutoff),
+            ).fetchone()
+            is not None
+        )
+
+    def _unseen(self, item_ids: Iterable) -> List[str]:
+        keys = list(dict.fromkeys(str(i) for i in item_ids))
+        maybe_seen = self.bloom.contains_many(keys)
+        return [key for key, maybe in zip(keys, maybe_seen) if not (maybe and self._stored(key))]
+
+    def __contains__(self, item_id) -> bool:
+        key = str(item_id)
+        return key in self.bloom and self._stored(key)
+
+    def __len__(self) -> int:
+        return self._count + len(self._pending)
+
+    def add(self, item_id):
+        """Mark an ID as seen; it is written with the next batch."""
+        key = str(item_id)
+        if self.bloom.add(key) and self._stored(key):
+            return
+        self._pending[key] = time.time()
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def update(self, item_ids: Iterable):
+        """Mark many IDs as seen, checking the Bloom filter for all of them at once."""
+        new = self._unseen(item_ids)
+        now = time.time()
+        self.bloom.add_many(new)
+        self._pending.update(dict.fromkeys(new, now))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered seen IDs and drop them from the frontier queue."""
+        if not self._pending:
+            return
+
+        rows = [
+            (self.namespace, key, seen_at, self._cutoff) for key, seen_at in self._pending.items()
+        ]
+        with self.conn:
+            # New IDs and expired ones that were seen again become live; rows written
+            # since opening (e.g. by another process) are left alone and not counted
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT INTO seen (namespace, item_id, seen_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (namespace, item_id) DO UPDATE SET seen_at = excluded.seen_at "
+                "WHERE seen.seen_at < ?",
+                rows,
+            )
+            self._count += self.conn.total_changes - before
+            if self.pending_count():
+                self.conn.executemany(
+                    "DELETE FROM frontier WHERE namespace = ? AND item_id = ?",
+                    [(namespace, key) for namespace, key, _, _ in rows],
+                )
+        self._pending.clear()
+
+    def enqueue(self, item_ids: Iterable) -> int:
+        """Queue IDs that were not seen yet; returns how many were added."""
+        rows = [(self.namespace, key) for key in self._unseen(item_ids)]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO frontier (namespace, item_id) VALUES (?, ?)", rows
+            )
+            return self.conn.total_changes - before
+
+    def dequeue(self, limit: int = 1) -> List[str]:
+        """Take up to ``limit`` queued IDs in insertion order, skipping those already taken."""
+        rows = self.conn.execute(
+            "SELECT position, item_id FROM frontier WHERE namespace = ? AND position > ? "
+            "ORDER BY position LIMIT ?",
+            (self.namespace, self._cursor, limit),
+        ).fetchall()
+        if rows:
+            self._cursor = rows[-1][0]
+        return [item_id for _, item_id in rows if item_id not in self._pending]
+
+    def pending_count(self) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,52 +1,27 @@
 # real_estate_ml/scraping/pipelines.py
-import re
+from real_estate_ml.processing.normalize import parse_area, parse_bool, parse_brl, parse_count
 
 
 class RealEstatePipeline:
     def process_item(self, item, spider):
-        # Clean price
-        if item.get("price"):
-            # Remove currency symbol and non-numeric characters
-            price_str = item["price"].replace("R$", "").replace(".", "").replace(",", ".").strip()
-            try:
-                item["price"] = float(re.sub(r"[^\d.]", "", price_str))
-            except ValueError:
-                item["price"] = None
+        # Clean price, condo fee and IPTU
+        for money_field in ["price", "condo_fee", "iptu"]:
+            if item.get(money_field):
+                item[money_field] = parse_brl(item[money_field])
 
         # Clean area values
         for area_field in ["area_total", "area_util"]:
             if item.get(area_field):
-                # Extract numeric value and convert to float
-                area_str = item[area_field]
-                match = re.search(r"(\d+(?:[\.,]\d+)?)", area_str)
-                if match:
-                    try:
-                        item[area_field] = float(match.group(1).replace(",", "."))
-                    except ValueError:
-                        item[area_field] = None
+                item[area_field] = parse_area(item[area_field])
 
         # Clean numeric fields
         for field in ["bedrooms", "bathrooms", "parking_spots"]:
             if item.get(field):
-                try:
-                    item[field] = int(re.sub(r"[^\d]", "", item[field]))
-                except ValueError:
-                    item[field] = None
-
-        # Clean condo fee and IPTU
-        for fee_field in ["condo_fee", "iptu"]:
-            if item.get(fee_field):
-                fee_str = (
-                    item[fee_field].replace("R$", "").replace(".", "").replace(",", ".").strip()
-                )
-                try:
-                    item[fee_field] = float(re.sub(r"[^\d.]", "", fee_str))
-                except ValueError:
-                    item[fee_field] = None
+                item[field] = parse_count(item[field])
 
         # Convert boolean fields
         for bool_field in ["accept_pets", "furnished"]:
             if item.get(bool_field):
-                item[bool_field] = "sim" in item[bool_field].lower()
+                item[bool_field] = parse_bool(item[bool_field])
 
         return item
@@ -1,12 +1,18 @@
 import json
-import random
-import time
+from pathlib import Path
 from urllib.parse import urlencode
 import uuid
 
 from loguru import logger
 import scrapy
 
+from real_estate_ml.legacy_scraping.ad_parser import parse_ad_html
+from real_estate_ml.legacy_scraping.frontier import (
+    DEFAULT_FRONTIER_PATH,
+    DEFAULT_SEEN_MAX_AGE,
+    CrawlFrontier,
+)
+
 
 class OlxApiSpider(scrapy.Spider):
     name = "olx_api"
@@ -15,6 +21,31 @@ class OlxApiSpider(scrapy.Spider):
     # Base API URL
     api_base_url = "https://apigw.olx.com.br/api/v2/rec"
 
+    # Listing search page visited first for cookies, and the ad page of a listing
+    main_site_url = "https://www.olx.com.br/imoveis/aluguel/estado-pe"
+    ad_page_url = "https://www.olx.com.br/vi/{list_id}"
+
+    # Pacing is left to the downloader instead of sleeping in callbacks, which would
+    # block the reactor and serialize every download. Each hostname is one download
+    # slot, and AutoThrottle never goes below DOWNLOAD_DELAY, so the delay is only a
+    # small floor: AutoThrottle sets the pace from the observed latency to keep about
+    # AUTOTHROTTLE_TARGET_CONCURRENCY requests in flight per host, capped by
+    # CONCURRENT_REQUESTS_PER_DOMAIN, and backs off up to AUTOTHROTTLE_MAX_DELAY when
+    # the server slows down. The API chain and the ad pages on www.olx.com.br use
+    # separate slots and proceed in parallel.
+    custom_settings = {
+        "DOWNLOAD_DELAY": 0.25,
+        "CONCURRENT_REQUESTS": 8,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 4,
+        "AUTOTHROTTLE_ENABLED": True,
+        "AUTOTHROTTLE_START_DELAY": 1,
+        "AUTOTHROTTLE_MAX_DELAY": 60,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 4.0,
+    }
+
+    # The recommendation chain is strictly sequential, so its requests go first
+    api_priority = 10
+
     # Regions in Pernambuco
     regions = {"pernambuco": "81", "recife": "3744", "boa_viagem": "29748"}
 
@@ -36,12 +67,33 @@ class OlxApiSpider(scrapy.Spider):
         "Pragma": "no-cache",
     }
 
-    def __init__(self, region="pernambuco", category="aluguel", *args, **kwargs):
+    # Known listing ID used to start the recommendation chain on a fresh crawl
+    seed_list_id = "1387432094"
+
+    def __init__(
+        self,
+        region="pernambuco",
+        category="aluguel",
+        frontier_path=DEFAULT_FRONTIER_PATH,
+        seen_max_age=DEFAULT_SEEN_MAX_AGE,
+        *args,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.region_id = self.regions.get(region, "81")  # Default to Pernambuco
         self.category_id = self.categories.get(category, "1020")  # Default to aluguel
         self.lurker_id = str(uuid.uuid4())  # Generate a random UUID for each session
-        self.processed_ads = set()  # Keep track of processed ads
+        # Processed ads and the recommendation IDs still to visit survive restarts. Ads
+        # seen more than seen_max_age seconds ago are visited again, so a later crawl
+        # refreshes them and the recommendation chain can grow from them again
+        # ("-a seen_max_age=none" never revisits)
+        max_age = None if str(seen_max_age).lower() == "none" else float(seen_max_age)
+        self.processed_ads = CrawlFrontier(
+            Path(frontier_path), namespace="olx_api_spider", max_age=max_age
+        )
+        self.seeds = CrawlFrontier(
+            Path(frontier_path), namespace="olx_api_spider_seeds", max_age=max_age
+        )
 
         # Update referer to match the region and category
         self.headers["Referer"] = f"https://www.olx.com.br/imoveis/{category}/estado-{region}"
@@ -50,18 +102,27 @@ class OlxApiSpider(scrapy.Spider):
         """Generate initial API requests"""
         # First, we need to visit the main site to get cookies
         yield scrapy.Request(
-            url="https://www.olx.com.br/imoveis/aluguel/estado-pe",
+            url=self.main_site_url,
             callback=self.parse_main_site,
             headers=self.headers,
             meta={"dont_redirect": True, "handle_httpstatus_list": [302, 403]},
         )
 
-    def parse_main_site(self, response):
-        """Parse the main site to get cookies and then make API request"""
-        # Now make the API request with cookies from the main site
+    async def start(self):
+        """Entry point of Scrapy 2.13+, which no longer calls start_requests itself"""
+        for request in self.start_requests():
+            yield request
+
+    def closed(self, reason):
+        """Persist the seen ads and pending seeds when the spider stops"""
+        self.processed_ads.close()
+        self.seeds.close()
+
+    def api_request(self, list_id, **meta):
+        """Build the recommendation API request for a listing ID"""
         params = {
             "custom_tag": "vi_web",
-            "list_id": "1387432094",  # Use a known listing ID
+            "list_id": list_id,
             "lurker_id": self.lurker_id,
             "object_name": "ad_detail",  # Start with ad_detail which seems to work
             "platform": "web",
@@ -70,20 +131,22 @@ class OlxApiSpider(scrapy.Spider):
             "test_id": "hold",
         }
 
-        url = f"{self.api_base_url}?{urlencode(params)}"
-
-        # Add a random delay to mimic human behavior
-        time.sleep(random.uniform(2, 5))
-
-        yield scrapy.Request(
-            url=url,
+        return scrapy.Request(
+            url=f"{self.api_base_url}?{urlencode(params)}",
             callback=self.parse_detail_api,
             headers=self.headers,
-            meta={
-                "dont_redirect": True,
-                "handle_httpstatus_list": [302, 403],
-                "list_id": "1387432094",
-            },
+            priority=self.api_priority,
+            meta={"list_id": list_id, **meta},
+        )
+
+    def parse_main_site(self, response):
+        """Parse the main site to get cookies and then make API request"""
+        # Resume from the first unfinished seed of an earlier run, if any
+        seed_list_id = next(iter(self.seeds.dequeue(1)), self.seed_list_id)
+
+        # Now make the API request with cookies from the main site
+        yield self.api_request(
+            seed_list_id, dont_redirect=True, handle_httpstatus_list=[302, 403]
         )
 
     def parse_detail_api(self, response):
@@ -115,6 +178,7 @@ class OlxApiSpider(scrapy.Spider):
                                 listings.append(listing)
 
             logger.info(f"Found {len(listings)} new listings")
+            self.seeds.add(list_id)
 
             # Process each listing
             for listing in listings:
@@ -136,13 +200,8 @@ class OlxApiSpider(scrapy.Spider):
                 }
 
                 # Make a request to the actual ad page to get more details
-                ad_url = f"https://www.olx.com.br/vi/{list_id}"
-
-                # Add random delay
-                time.sleep(random.uniform(2, 5))
-
                 yield scrapy.Request(
-                    url=ad_url,
+                    url=self.ad_page_url.format(list_id=list_id),
                     callback=self.parse_ad_page,
                     headers=self.headers,
                     meta={"item": item},
@@ -152,29 +211,8 @@ class OlxApiSpider(scrapy.Spider):
             if listings:
                 # Use the last listing ID for the next request
                 next_list_id = listings[-1].get("list_id")
-
-                params = {
-                    "custom_tag": "vi_web",
-                    "list_id": next_list_id,
-                    "lurker_id": self.lurker_id,
-                    "object_name": "ad_detail",
-                    "platform": "web",
-                    "region_id": self.region_id,
-                    "subcategory_id": self.category_id,
-                    "test_id": "hold",
-                }
-
-                next_url = f"{self.api_base_url}?{urlencode(params)}"
-
-                # Add random delay
-                time.sleep(random.uniform(3, 7))
-
-                yield scrapy.Request(
-                    url=next_url,
-                    callback=self.parse_detail_api,
-                    headers=self.headers,
-                    meta={"list_id": next_list_id},
-                )
+                self.seeds.enqueue([next_list_id])
+                yield self.api_request(next_list_id)
 
         except json.JSONDecodeError:
             logger.error(f"Failed to parse JSON from API response: {response.text[:100]}...")
@@ -186,51 +224,12 @@ class OlxApiSpider(scrapy.Spider):
         item = response.meta["item"]
 
         try:
-            # Extract description
-            description = response.css("div[data-testid='ad-description']::text").get()
-            if description:
-                item["description"] = description.strip()
-
-            # Extract property details
-            property_details = {}
-            detail_sections = response.css("div[data-testid='ad-properties']")
-
-            if detail_sections:
-                detail_items = detail_sections.css("div[data-testid='ad-property']")
-                for detail in detail_items:
-                    label = detail.css("div[data-testid='ad-property-label']::text").get()
-                    value = detail.css("div[data-testid='ad-property-value']::text").get()
-                    if label and value:
-                        property_details[label.strip()] = value.strip()
-
-            # Map details to item fields
-            item["property_type"] = property_details.get("Tipo")
-            item["area_total"] = property_details.get("Área total")
-            item["area_util"] = property_details.get("Área útil")
-            item["bedrooms"] = property_details.get("Quartos")
-            item["bathrooms"] = property_details.get("Banheiros")
-            item["parking_spots"] = property_details.get("Vagas na garagem")
-            item["condo_fee"] = property_details.get("Condomínio")
-            item["iptu"] = property_details.get("IPTU")
-
-            # Additional features
-            item["accept_pets"] = property_details.get("Aceita animais")
-            item["furnished"] = property_details.get("Mobiliado")
-
-            # Images
-            image_urls = response.css("img[data-testid='ad-image']::attr(src)").getall()
-            item["image_urls"] = image_urls
-
-            # Publication date
-            published_date = response.css("span[data-testid='ad-posted-date']::text").get()
-            item["published_date"] = published_date
-
-            # Seller information
-            seller_name = response.css("div[data-testid='seller-name']::text").get()
-            item["seller_name"] = seller_name
-
-            seller_since = response.css("div[data-testid='seller-member-since']::text").get()
-            item["seller_since"] = seller_since
+            ad = parse_ad_html(response.body, response.encoding)
+
+            # Values from the page win; those from the API are kept where the page has none
+            item.update(
+                {field: value for field, value in ad.items() if value or field not in item}
+            )
 
             yield item
 
@@ -2,11 +2,13 @@ import random
 import time
 
 from loguru import logger
+import scrapy
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium_stealth import stealth
 
+from ..ad_parser import is_empty_ad, parse_ad_html
 from ..items import RealEstateItem
 from .base_selenium_spider import BaseSeleniumSpider
 
@@ -20,6 +22,8 @@ class OlxSeleniumSpider(BaseSeleniumSpider):
         super().__init__(*args, **kwargs)
         self.max_pages = int(max_pages) if max_pages else None
         self.pages_scraped = 0
+        # Browser tab for ad fallbacks, so the listing page stays open for pagination
+        self.ad_window = None
         self.start_selenium()
         self.setup_stealth()
 
@@ -191,14 +195,13 @@ class OlxSeleniumSpider(BaseSeleniumSpider):
             # Extract hrefs
             urls = [link.get_attribute("href") for link in ad_links]
 
-            # Visit each ad
+            # Fetch each ad as plain HTML; the downloader's delay paces these requests
             for url in urls:
-                # Longer random delay between ads
-                time.sleep(random.uniform(8, 15))
-                if self.safe_get(url):
-                    yield self.parse_ad()
-                    # Add extra delay after parsing
-                    time.sleep(random.uniform(5, 10))
+                yield scrapy.Request(
+                    url=url,
+                    callback=self.parse_ad_page,
+                    meta={"handle_httpstatus_list": [403]},
+                )
 
             # Handle pagination with improved method
             if self.handle_pagination():
@@ -253,86 +256,36 @@ class OlxSeleniumSpider(BaseSeleniumSpider):
             logger.error(f"Error in pagination: {e}")
             return False
 
+    def parse_ad_page(self, response):
+        """Parse an ad from its plain HTML, opening it in the browser only if that fails"""
+        ad = parse_ad_html(response.body, response.encoding) if response.status == 200 else {}
+
+        if not is_empty_ad(ad):
+            yield RealEstateItem(**ad)
+            return
+
+        # Blocked or rendered client side: fall back to the browser session
+        logger.info(f"HTML parse of {response.url} came back empty, loading it in the browser")
+        item = self.parse_ad_in_window(response.url)
+        if item is not None:
+            yield item
+
+    def parse_ad_in_window(self, url):
+        """Load an ad in the dedicated ad tab and switch back to the listing page"""
+        listing_window = self.driver.current_window_handle
+        try:
+            if self.ad_window is None:
+                self.driver.switch_to.new_window("tab")
+                self.ad_window = self.driver.current_window_handle
+            else:
+                self.driver.switch_to.window(self.ad_window)
+
+            return self.parse_ad() if self.safe_get(url) else None
+        finally:
+            self.driver.switch_to.window(listing_window)
+
     def parse_ad(self):
-        """Parse individual ad page"""
-        item = RealEstateItem()
-
-        # Basic information - Updated selectors
-        title_elem = self.wait_for_element(By.CSS_SELECTOR, "h1[data-testid='ad-title']")
-        item["title"] = title_elem.text if title_elem else None
-
-        description_elem = self.wait_for_element(
-            By.CSS_SELECTOR, "div[data-testid='ad-description']"
-        )
-        item["description"] = description_elem.text if description_elem else None
-
-        price_elem = self.wait_for_element(By.CSS_SELECTOR, "div[data-testid='ad-price-value']")
-        item["price"] = price_elem.text if price_elem else None
-
-        location_elem = self.wait_for_element(By.CSS_SELECTOR, "div[data-testid='ad-address']")
-        item["location"] = location_elem.text if location_elem else None
-
-        # Publication date
-        published_date_elem = self.wait_for_element(
-            By.CSS_SELECTOR, "span[data-testid='ad-posted-date']"
-        )
-        item["published_date"] = published_date_elem.text if published_date_elem else None
-
-        # Ad ID
-        ad_id_elem = self.wait_for_element(By.CSS_SELECTOR, "span[data-testid='ad-identifier']")
-        if ad_id_elem:
-            # Extract just the number from text like "ID: 12345678"
-            ad_id_text = ad_id_elem.text
-            item["ad_id"] = ad_id_text.split(":")[-1].strip() if ":" in ad_id_text else ad_id_text
-
-        # Extract details
-        details = {}
-        detail_sections = self.driver.find_elements(
-            By.CSS_SELECTOR, "div[data-testid='ad-properties']"
-        )
-
-        if detail_sections:
-            detail_items = detail_sections[0].find_elements(
-                By.CSS_SELECTOR, "div[data-testid='ad-property']"
-            )
-            for detail in detail_items:
-                # Each property has a label and value
-                label_elem = detail.find_element(
-                    By.CSS_SELECTOR, "div[data-testid='ad-property-label']"
-                )
-                value_elem = detail.find_element(
-                    By.CSS_SELECTOR, "div[data-testid='ad-property-value']"
-                )
-                if label_elem and value_elem:
-                    key = label_elem.text.strip()
-                    value = value_elem.text.strip()
-                    details[key] = value
-
-        # Map details to item fields
-        item["property_type"] = details.get("Tipo")
-        item["area_total"] = details.get("Área total")
-        item["area_util"] = details.get("Área útil")
-        item["bedrooms"] = details.get("Quartos")
-        item["bathrooms"] = details.get("Banheiros")
-        item["parking_spots"] = details.get("Vagas na garagem")
-        item["condo_fee"] = details.get("Condomínio")
-        item["iptu"] = details.get("IPTU")
-
-        # Additional features
-        item["accept_pets"] = details.get("Aceita animais")
-        item["furnished"] = details.get("Mobiliado")
-
-        # Images - Updated selector
-        image_elements = self.driver.find_elements(By.CSS_SELECTOR, "img[data-testid='ad-image']")
-        item["image_urls"] = [img.get_attribute("src") for img in image_elements]
-
-        # Seller information
-        seller_name_elem = self.wait_for_element(By.CSS_SELECTOR, "div[data-testid='seller-name']")
-        item["seller_name"] = seller_name_elem.text if seller_name_elem else None
-
-        seller_since_elem = self.wait_for_element(
-            By.CSS_SELECTOR, "div[data-testid='seller-member-since']"
-        )
-        item["seller_since"] = seller_since_elem.text if seller_since_elem else None
-
-        return item
+        """Parse the ad page currently open in the browser"""
+        # Wait once for the page to render, then read every field from its HTML
+        self.wait_for_element(By.CSS_SELECTOR, "h1[data-testid='ad-title']")
+        return RealEstateItem(**parse_ad_html(self.driver.page_source))
@@ -1,29 +1,378 @@
+import json
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
+import joblib
 from loguru import logger
-from tqdm import tqdm
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy import sparse
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.preprocessing import MaxAbsScaler
 import typer
 
-from real_estate_ml.config import MODELS_DIR, PROCESSED_DATA_DIR
+from real_estate_ml.config import (
+    FEATURE_STORE_DIR,
+    MODELS_DIR,
+    PROCESSED_DATA_DIR,
+    PROCESSED_DATASET_DIR,
+    TEXT_FEATURES_DIR,
+)
+from real_estate_ml.dataset import iter_listing_batches
+from real_estate_ml.features.geo import normalize_location
+from real_estate_ml.features.groups import default_feature_groups
+from real_estate_ml.features.store import KEY_COLUMNS, ORDER_COLUMN, FeatureStore, listing_keys
 
 app = typer.Typer()
 
+LABELS_PATH = PROCESSED_DATA_DIR / "labels.parquet"
+LABEL_EDGES_ATTR = "price_class_edges"
+
+DEFAULT_N_CLASSES = 5
+DEFAULT_EPOCHS = 3
+DEFAULT_BATCH_ROWS = 4096
+# Hashed columns for the string features of the feature store groups
+CATEGORY_HASH_FEATURES = 2**12
+
+# Estimators that learn incrementally with partial_fit
+ESTIMATORS = {
+    "sgd": lambda seed: SGDClassifier(loss="log_loss", alpha=1e-6, random_state=seed),
+    "nb": lambda seed: MultinomialNB(alpha=0.1),
+}
+
+
+def build_price_labels(
+    output_path: Path = LABELS_PATH,
+    root: Path = PROCESSED_DATASET_DIR,
+    n_classes: int = DEFAULT_N_CLASSES,
+    sample_size: int = 100_000,
+    seed: int = 0,
+) -> Dict[str, List[float]]:
+    """
+    Label every listing with its price class, the price quantile bin within its listing type.
+
+    Two streaming passes over the listings dataset: the first keeps a uniform
+    sample of at most ``sample_size`` prices per listing type (random priority
+    sampling) to estimate the bin edges, the second writes the labels batch by
+    batch. The edges are stored in the file metadata, so predictions can be
+    mapped back to price ranges.
+
+    Returns:
+        Bin edges per listing type
+    """
+    rng = np.random.default_rng(seed)
+    columns = [*KEY_COLUMNS, "crawl_date", "listing_type", "price"]
+
+    def priced_batches() -> Iterator[pd.DataFrame]:
+        for batch in iter_listing_batches(columns=columns, root=root):
+            frame = batch.to_pandas()
+            frame["listing_type"] = normalize_location(frame["listing_type"]).fillna("")
+            frame["price"] = pd.to_numeric(frame["price"], errors="coerce")
+            yield frame[(frame["price"] > 0) & frame["listing_id"].notna()]
+
+    samples: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for frame in priced_batches():
+        for listing_type, rows in frame.groupby("listing_type").indices.items():
+            priorities = rng.random(len(rows))
+            prices = frame["price"].to_numpy()[rows]
+            if listing_type in samples:
+                priorities = np.concatenate([samples[listing_type][0], priorities])
+                prices = np.concatenate([samples[listing_type][1], prices])
+            # The sample_size smallest random priorities are a uniform sample
+            keep = np.argsort(priorities)[:sample_size]
+            samples[listing_type] = (priorities[keep], prices[keep])
+    if not samples:
+        raise ValueError(f"No priced listings in the dataset at {root}")
+
+    quantiles = np.linspace(0, 1, n_classes + 1)[1:-1]
+    edges = {
+        listing_type: np.quantile(prices, quantiles).tolist()
+        for listing_type, (_, prices) in samples.items()
+    }
+
+    schema = pa.schema(
+        [
+            ("source", pa.string()),
+            ("listing_id", pa.string()),
+            ("crawl_date", pa.string()),
+            ("label", pa.int8()),
+        ],
+        metadata={LABEL_EDGES_ATTR: json.dumps(edges), "n_classes": str(n_classes)},
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+        for frame in priced_batches():
+            labels = np.zeros(len(frame), dtype=np.int8)
+            for listing_type, positions in frame.groupby("listing_type").indices.items():
+                prices = frame["price"].to_numpy()[positions]
+                labels[positions] = np.searchsorted(edges[listing_type], prices, side="right")
+            table = pd.DataFrame(
+                {
+                    "source": frame["source"].astype(str).to_numpy(),
+                    "listing_id": frame["listing_id"].astype(str).to_numpy(),
+                    "crawl_date": frame["crawl_date"].astype(str).to_numpy(),
+                    "label": labels,
+                }
+            )
+            writer.write_table(pa.Table.from_pandas(table, schema=schema, preserve_index=False))
+            rows += len(table)
+
+    logger.success(f"Wrote {rows} price class labels ({n_classes} classes) to {output_path}")
+    return edges
+
+
+def read_label_classes(labels_path: Path = LABELS_PATH) -> np.ndarray:
+    metadata = pq.read_schema(labels_path).metadata
+    return np.arange(int(metadata[b"n_classes"]))
+
+
+def read_labels(labels_path: Path, keys: pd.DataFrame) -> np.ndarray:
+    """Label of every listing in ``keys`` as of its latest crawl, -1 when unlabeled."""
+    listing_ids = keys["listing_id"].astype(str).unique().tolist()
+    labels = pq.read_table(labels_path, filters=[("listing_id", "in", listing_ids)]).to_pandas()
+    labels = labels.sort_values("crawl_date", kind="stable").drop_duplicates(
+        KEY_COLUMNS, keep="last"
+    )
+    aligned = pd.Series(labels["label"].to_numpy(), index=listing_keys(labels))
+    return aligned.reindex(listing_keys(keys)).fillna(-1).to_numpy(dtype=np.int64)
+
+
+class ShardedTrainingData:
+    """
+    Aligned (features, labels) mini-batches streamed from the text feature shards.
+
+    Every shard written by build_text_features is loaded on its own, together
+    with the labels and feature store rows of its listings only, so memory is
+    bounded by the shard and batch sizes rather than by the dataset. Numeric
+    store features are scaled by a MaxAbsScaler fitted in a streaming pass, and
+    string features are hashed. A fixed ``holdout_percent`` of listings, chosen
+    by a hash of their key, is held out for validation.
+    """
+
+    def __init__(
+        self,
+        text_dir: Path = TEXT_FEATURES_DIR,
+        labels_path: Path = LABELS_PATH,
+        store: Optional[FeatureStore] = None,
+        groups: Sequence[str] = (),
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        holdout_percent: int = 10,
+    ):
+        self.text_dir = text_dir
+        self.labels_path = labels_path
+        self.store = store
+        self.groups = list(groups)
+        self.batch_rows = batch_rows
+        self.holdout_percent = holdout_percent
+        self.scaler: Optional[MaxAbsScaler] = None
+        self.hasher = FeatureHasher(
+            CATEGORY_HASH_FEATURES, input_type="string", alternate_sign=False
+        )
+
+        self.shards = sorted(text_dir.glob("text-*.npz"))
+        if not self.shards:
+            raise ValueError(f"No text feature shards in {text_dir}")
+        if self.groups and store is None:
+            raise ValueError("A feature store is needed to train on feature groups")
+
+    def _store_features(self, keys: pd.DataFrame) -> Tuple[np.ndarray, List[List[str]]]:
+        features = self.store.fetch(keys, self.groups)
+        numeric = features.select_dtypes("number").astype("float32").fillna(0).to_numpy()
+        strings = features.select_dtypes(exclude="number")
+        tokens = [
+            [f"{column}={value}" for column, value in zip(strings.columns, row) if pd.notna(value)]
+            for row in strings.itertuples(index=False)
+        ]
+        return numeric, tokens
+
+    @staticmethod
+    def _shard_keys(matrix_path: Path) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Keys of a shard with one row per listing, and the shard rows they come from."""
+        keys = pd.read_parquet(matrix_path.with_suffix(".keys.parquet"))
+        # Older shards hold a row per crawl of a listing; only its latest crawl is kept,
+        # so re-crawled listings are not weighted more than the others
+        ordered = keys.sort_values(ORDER_COLUMN, kind="stable") if ORDER_COLUMN in keys else keys
+        rows = np.sort(ordered.index[~ordered.duplicated(KEY_COLUMNS, keep="last")].to_numpy())
+        return keys.iloc[rows].reset_index(drop=True), rows
+
+    def fit_scaler(self):
+        """Fit the scaler of the numeric store features in one streaming pass."""
+        self.scaler = MaxAbsScaler()
+        for matrix_path in self.shards:
+            keys, _ = self._shard_keys(matrix_path)
+            self.scaler.partial_fit(self._store_features(keys)[0])
+
+    def load_shard(self, matrix_path: Path) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+        """Features, labels and holdout mask of the labeled listings of a shard."""
+        keys, rows = self._shard_keys(matrix_path)
+        features = sparse.load_npz(matrix_path).tocsr()[rows]
+        if self.groups:
+            numeric, tokens = self._store_features(keys)
+            if self.scaler is not None:
+                numeric = self.scaler.transform(numeric)
+            features = sparse.hstack(
+                [features, sparse.csr_matrix(numeric), self.hasher.transform(tokens)],
+                format="csr",
+            )
+
+        labels = read_labels(self.labels_path, keys)
+        key_hashes = pd.util.hash_pandas_object(
+            keys[KEY_COLUMNS].astype(str), index=False
+        ).to_numpy()
+        holdout = key_hashes % 100 < self.holdout_percent
+
+        labeled = labels >= 0
+        return features[labeled], labels[labeled], holdout[labeled]
+
+    def shard_batches(
+        self, matrix_path: Path, rng: np.random.Generator
+    ) -> Iterator[Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]]:
+        """Shuffled mini-batches of the labeled listings of a shard."""
+        features, labels, holdout = self.load_shard(matrix_path)
+        order = rng.permutation(len(labels))
+        for start in range(0, len(order), self.batch_rows):
+            rows = order[start : start + self.batch_rows]
+            yield features[rows], labels[rows], holdout[rows]
+
+
+def _save(path: Path, state: Dict):
+    # Write then rename, so an interrupted save never leaves a corrupt file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    joblib.dump(state, tmp_path)
+    tmp_path.replace(path)
+
+
+def checkpoint_path(model_path: Path) -> Path:
+    return model_path.with_name(f"{model_path.stem}.checkpoint{model_path.suffix}")
+
+
+def train_incremental(
+    data: ShardedTrainingData,
+    model_path: Path = MODELS_DIR / "model.pkl",
+    estimator: str = "sgd",
+    epochs: int = DEFAULT_EPOCHS,
+    checkpoint_every: int = 4,
+    seed: int = 0,
+    resume: bool = True,
+):
+    """
+    Train an estimator with partial_fit over the shards, epoch after epoch.
+
+    Every epoch visits the shards in a new random order and shuffles the rows
+    inside each shard. Held out rows are scored before the model learns from the
+    batch they came in (progressive validation), so validation costs no extra
+    pass. A checkpoint with the model and the progress is written every
+    ``checkpoint_every`` shards and at the end of every epoch; with ``resume``
+    an interrupted run continues after the last checkpointed shard.
+
+    Returns:
+        The fitted estimator
+    """
+    checkpoint = checkpoint_path(model_path)
+    if resume and checkpoint.exists():
+        state = joblib.load(checkpoint)
+        if state["estimator"] != estimator or state["groups"] != data.groups:
+            raise ValueError(f"Checkpoint {checkpoint} was written by a different configuration")
+        data.scaler = state["scaler"]
+        logger.info(
+            f"Resuming from {checkpoint}: epoch {state['epoch'] + 1}, "
+            f"{state['shards_done']} shards done"
+        )
+    else:
+        if data.groups:
+            data.fit_scaler()
+        state = {
+            "estimator": estimator,
+            "groups": data.groups,
+            "model": ESTIMATORS[estimator](seed),
+            "scaler": data.scaler,
+            "classes": read_label_classes(data.labels_path),
+            "epoch": 0,
+            "shards_done": 0,
+            "history": [],
+        }
+
+    model = state["model"]
+    while state["epoch"] < epochs:
+        epoch = state["epoch"]
+        # Seeded per epoch and per shard, so a resumed epoch replays the same shard order
+        # and the same row shuffles without drawing for the shards it skips
+        order = np.random.default_rng([seed, epoch]).permutation(len(data.shards))
+        seen = state.get("seen", {"rows": 0, "holdout": 0, "correct": 0})
+
+        for shard in order[state["shards_done"] :]:
+            rng = np.random.default_rng([seed, epoch, shard])
+            for features, labels, holdout in data.shard_batches(data.shards[shard], rng):
+                if holdout.any() and hasattr(model, "classes_"):
+                    predicted = model.predict(features[holdout])
+                    seen["holdout"] += int(holdout.sum())
+                    seen["correct"] += int((predicted == labels[holdout]).sum())
+                if (~holdout).any():
+                    model.partial_fit(
+                        features[~holdout], labels[~holdout], classes=state["classes"]
+                    )
+                    seen["rows"] += int((~holdout).sum())
+
+            state["shards_done"] += 1
+            if state["shards_done"] % checkpoint_every == 0:
+                _save(checkpoint, {**state, "seen": seen})
+
+        accuracy = seen["correct"] / seen["holdout"] if seen["holdout"] else float("nan")
+        state["history"].append({"epoch": epoch + 1, "rows": seen["rows"], "accuracy": accuracy})
+        logger.info(
+            f"Epoch {epoch + 1}/{epochs}: trained on {seen['rows']} rows, "
+            f"progressive holdout accuracy {accuracy:.4f}"
+        )
+        state.update(epoch=epoch + 1, shards_done=0)
+        state.pop("seen", None)
+        _save(checkpoint, state)
+
+    bundle = {key: state[key] for key in ("estimator", "groups", "model", "scaler", "classes")}
+    _save(model_path, {**bundle, "history": state["history"]})
+    checkpoint.unlink(missing_ok=True)
+    logger.success(f"Saved {estimator} model trained for {epochs} epochs to {model_path}")
+    return model
+
 
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    text_features_dir: Path = TEXT_FEATURES_DIR,
+    labels_path: Path = LABELS_PATH,
+    store_dir: Path = FEATURE_STORE_DIR,
     model_path: Path = MODELS_DIR / "model.pkl",
-    # -----------------------------------------
+    estimator: str = typer.Option("sgd", help="Incremental estimator: sgd or nb"),
+    groups: Optional[List[str]] = typer.Option(
+        None, help="Feature store groups added to the text features (sgd only)"
+    ),
+    epochs: int = DEFAULT_EPOCHS,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    checkpoint_every: int = typer.Option(4, help="Shards between checkpoints"),
+    seed: int = 0,
+    build_labels: bool = typer.Option(False, help="Rebuild the price class labels first"),
+    resume: bool = typer.Option(True, help="Continue from the last checkpoint if any"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Training real estate classification model...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Model training complete.")
-    # -----------------------------------------
+    """Train a price class model out of core over the text feature shards."""
+    if estimator not in ESTIMATORS:
+        raise typer.BadParameter(f"Unknown estimator {estimator!r}, pick from {list(ESTIMATORS)}")
+    if estimator == "nb" and groups:
+        raise typer.BadParameter("Naive Bayes needs non-negative counts; train it on text only")
+    if build_labels or not labels_path.exists():
+        build_price_labels(labels_path)
+
+    groups = groups or []
+    store = None
+    if groups:
+        store = FeatureStore(
+            [group for group in default_feature_groups() if group.name in groups], store_dir
+        )
+    data = ShardedTrainingData(text_features_dir, labels_path, store, groups, batch_rows)
+    train_incremental(data, model_path, estimator, epochs, checkpoint_every, seed, resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from loguru import logger
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+
+    def loads(data: bytes) -> Any:
+        """Decode JSON bytes with orjson."""
+        return orjson.loads(data)
+
+except ModuleNotFoundError:
+
+    def loads(data: bytes) -> Any:
+        """Decode JSON bytes with the standard library (orjson not installed)."""
+        return json.loads(data)
+
+
+# Gallery holding household products instead of real estate listings
+SKIPPED_GALLERY_TITLE = "Produtos para sua casa"
+
+
+def load_json_file(file_path: Path) -> Any:
+    """Read and decode a raw JSON file using the fastest available decoder."""
+    with open(file_path, "rb") as f:
+        return loads(f.read())
+
+
+def iter_gallery_listings(data: List[Dict]) -> Iterator[Dict]:
+    """
+    Walk an OLX recommendation response and yield each listing it contains.
+
+    Handles both ``GalleryGroup`` (galleries nested in a group) and
+    ``SingleGallery`` entries, skipping the household products gallery.
+    """
+    for gallery_group in data:
+        if gallery_group.get("title") == SKIPPED_GALLERY_TITLE:
+            continue
+
+        gallery_type = gallery_group.get("type")
+
+        if gallery_type == "GalleryGroup":
+            for gallery in gallery_group.get("content", []):
+                yield from gallery.get("content", [])
+
+        elif gallery_type == "SingleGallery":
+            yield from gallery_group.get("content", [])
+
+
+class ColumnarBatchWriter:
+    """
+    Accumulate rows into per-column builders and flush them as Arrow record
+    batches to a Parquet file.
+
+    Only one batch worth of rows is held in memory at a time, so peak memory
+    depends on ``batch_size`` rather than on the size of the dataset.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        schema: pa.Schema,
+        batch_size: int = 50_000,
+        converters: Optional[Dict[str, Callable[[List], pa.Array]]] = None,
+    ):
+        """
+        Args:
+            output_path: Parquet file to write
+            schema: Arrow schema of the output
+            batch_size: Number of rows buffered before a record batch is flushed
+            converters: Optional per-column functions turning raw values into Arrow arrays
+        """
+        self.output_path = output_path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.converters = converters or {}
+        self.columns: Dict[str, List] = {name: [] for name in schema.names}
+        self.rows_written = 0
+        self._pending = 0
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def append(self, row: Dict):
+        """Append a single row, flushing a record batch once the buffer is full."""
+        for name, values in self.columns.items():
+            values.append(row.get(name))
+
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Convert the buffered columns to a record batch and write it out."""
+        if not self._pending:
+            return
+
+        arrays = []
+        for field in self.schema:
+            values = self.columns[field.name]
+            converter = self.converters.get(field.name)
+            array = converter(values) if converter else pa.array(values, type=field.type)
+            arrays.append(array.cast(field.type) if array.type != field.type else array)
+
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+        if self._writer is None:
+            self.output_path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.output_path, self.schema)
+
+        self._writer.write_batch(batch)
+        self.rows_written += self._pending
+        logger.debug(f"Flushed record batch of {self._pending} rows to {self.output_path}")
+
+        for values in self.columns.values():
+            values.clear()
+        self._pending = 0
+
+    def close(self):
+        """Flush remaining rows and close the Parquet file."""
+        self.flush()
+
+        if self._writer is None:
+            # Nothing was appended; still produce a valid (empty) file
+            self.output_path.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(self.schema.empty_table(), self.output_path)
+        else:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,123 @@
+from datetime import datetime
+import json
+import math
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+import zlib
+
+from loguru import logger
+
+from real_estate_ml.processing.columnar import loads
+
+DEFAULT_PARTITIONS = 64
+
+
+def _to_epoch(value) -> float:
+    # Records keep their raw values: epoch numbers (OLX date_ts) or ISO strings (ZAP)
+    if value is None:
+        return -math.inf
+    if isinstance(value, (int, float)):
+        return -math.inf if value != value else float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return -math.inf
+    return -math.inf
+
+
+def recency_key(listing: Dict) -> Tuple[float, float]:
+    """Sort key of a listing version: newest ``updated_at``, then newest ``timestamp``."""
+    return _to_epoch(listing.get("updated_at")), _to_epoch(listing.get("timestamp"))
+
+
+class ExternalDeduplicator:
+    """
+    Keep the newest version of every listing with bounded memory.
+
+    Listings are spilled to ``partitions`` JSONL files on disk, hash partitioned by
+    listing ID, so all versions of a listing land in the same file. Each partition
+    is then reduced on its own, so memory is bounded by the largest partition
+    rather than by the whole archive.
+
+    The winner of each listing ID is the version with the highest ``recency`` key,
+    by default the newest ``updated_at``, then the newest ``timestamp``; remaining
+    ties are broken by comparing the canonical JSON of the versions. The result
+    therefore does not depend on the order in which files were read, and it is
+    yielded sorted by partition and listing ID. Iterating again reduces the
+    spilled partitions again.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[Path] = None,
+        partitions: int = DEFAULT_PARTITIONS,
+        key: str = "listing_id",
+        recency: Callable[[Dict], Tuple] = recency_key,
+    ):
+        self.key = key
+        self.recency = recency
+        self.partitions = partitions
+        if spill_dir is not None:
+            spill_dir.mkdir(parents=True, exist_ok=True)
+        self._dir = Path(tempfile.mkdtemp(prefix="dedup-", dir=spill_dir))
+        self._files = [
+            open(self._dir / f"part-{i:04d}.jsonl", "w", encoding="utf-8")
+            for i in range(partitions)
+        ]
+        self.records_added = 0
+
+    def _partition(self, listing_id) -> int:
+        return zlib.crc32(str(listing_id).encode("utf-8")) % self.partitions
+
+    def add(self, listing: Dict):
+        line = json.dumps(
+            listing, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str
+        )
+        self._files[self._partition(listing.get(self.key))].write(line + "\n")
+        self.records_added += 1
+
+    def add_many(self, listings: Iterable[Dict]):
+        for listing in listings:
+            self.add(listing)
+
+    def _reduce(self, partition_path: Path) -> Iterator[Dict]:
+        best: Dict[str, Tuple[Tuple, str]] = {}
+        with open(partition_path, encoding="utf-8") as f:
+            for line in f:
+                listing = loads(line)
+                listing_id = str(listing.get(self.key))
+                candidate = (self.recency(listing), line)
+                if listing_id not in best or candidate > best[listing_id]:
+                    best[listing_id] = candidate
+
+        for listing_id in sorted(best):
+            yield loads(best[listing_id][1])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for f in self._files:
+            f.close()
+
+        unique = 0
+        for i in range(self.partitions):
+            for listing in self._reduce(self._dir / f"part-{i:04d}.jsonl"):
+                unique += 1
+                yield listing
+
+        logger.info(f"Kept the newest version of {unique} listings out of {self.records_added}")
+
+    def close(self):
+        for f in self._files:
+            f.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,366 @@
+import math
+from pathlib import Path
+import re
+from typing import Iterator, List, Optional, Tuple
+import unicodedata
+import zlib
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+
+# Mersenne prime 2**31 - 1: with 31 bit shingle hashes, a * x + b never overflows uint64
+MERSENNE_PRIME = (1 << 31) - 1
+SHINGLE_SIZE = 4
+# Each coarse attribute is added this many times so it weighs like a few title shingles
+ATTRIBUTE_WEIGHT = 4
+# Only fields every source fills in are shingled, so listings of the same property
+# score alike whichever sites they come from
+SIGNATURE_ATTRIBUTES = ("city", "neighborhood", "price")
+# Price and area buckets are ~10% wide on a log scale
+BUCKET_GROWTH = 1.1
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_THRESHOLD = 0.6
+# Buckets shared by more listings than this are uninformative (e.g. empty titles)
+DEFAULT_MAX_BUCKET_SIZE = 200
+
+# Candidate pairs must also agree on these attributes when both listings have them
+PRICE_TOLERANCE = 0.1
+AREA_TOLERANCE = 0.1
+# Share of the words of the shorter address that the other address must contain
+ADDRESS_MIN_OVERLAP = 0.5
+
+ENTITY_KEY_COLUMNS = ["source", "listing_id"]
+ENTITY_ATTRIBUTE_COLUMNS = ["city", "address", "price", "area", "bedrooms"]
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(value) -> str:
+    """Lowercase, strip accents and punctuation and collapse whitespace."""
+    if not isinstance(value, str):
+        return ""
+    text = unicodedata.normalize("NFKD", value.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def _log_bucket(value) -> Optional[int]:
+    if value is None or pd.isna(value) or value <= 0:
+        return None
+    return round(math.log(float(value)) / math.log(BUCKET_GROWTH))
+
+
+def listing_shingles(listing: dict) -> List[str]:
+    """
+    Build the shingle set of a processed listing.
+
+    Character shingles of the normalized title are combined with tokens for the
+    city, neighborhood and price band. Fields only some sources have (address,
+    area, bedrooms) are left out and checked on candidate pairs instead.
+    """
+    shingles = set()
+    title = normalize_text(listing.get("title"))
+    if len(title) <= SHINGLE_SIZE:
+        if title:
+            shingles.add(title)
+    else:
+        shingles.update(title[i : i + SHINGLE_SIZE] for i in range(len(title) - SHINGLE_SIZE + 1))
+
+    attributes = {
+        "city": normalize_text(listing.get("city")) or None,
+        "neighborhood": normalize_text(listing.get("neighborhood")) or None,
+        "price": _log_bucket(listing.get("price")),
+    }
+    for name, value in attributes.items():
+        if value is not None and not pd.isna(value):
+            shingles.update(f"{name}={value}#{i}" for i in range(ATTRIBUTE_WEIGHT))
+
+    return sorted(shingles)
+
+
+def _hash_shingles(shingles: List[str]) -> np.ndarray:
+    return np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) & MERSENNE_PRIME for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+class MinHasher:
+    """Vectorized MinHash over a fixed family of universal hash functions."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets: List[List[str]], chunk_size: int = 4096) -> np.ndarray:
+        """Compute a (len(shingle_sets), num_perm) uint32 signature matrix."""
+        out = np.empty((len(shingle_sets), self.num_perm), dtype=np.uint32)
+
+        for start in range(0, len(shingle_sets), chunk_size):
+            chunk = shingle_sets[start : start + chunk_size]
+            # Empty sets get a sentinel so reduceat never sees an empty segment
+            hashed = [
+                _hash_shingles(s) if s else np.array([MERSENNE_PRIME], dtype=np.uint64)
+                for s in chunk
+            ]
+            offsets = np.cumsum([0] + [len(h) for h in hashed[:-1]])
+            values = np.concatenate(hashed)
+
+            permuted = (np.outer(values, self.a) + self.b) % MERSENNE_PRIME
+            out[start : start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=0)
+
+        return out
+
+
+def band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """Fold each band of rows of a signature matrix into one uint64 bucket key."""
+    rows = signatures.shape[1] // bands
+    folded = signatures[:, : bands * rows].reshape(len(signatures), bands, rows).astype(np.uint64)
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for r in range(rows):
+            keys = keys * np.uint64(0x100000001B3) ^ folded[:, :, r]
+    return keys
+
+
+def _within(values: np.ndarray, left: np.ndarray, right: np.ndarray, tolerance: float):
+    a, b = values[left], values[right]
+    with np.errstate(invalid="ignore"):
+        close = np.abs(a - b) <= tolerance * np.maximum(a, b)
+    return close | np.isnan(a) | np.isnan(b)
+
+
+def _similar_addresses(addresses: np.ndarray, left: np.ndarray, right: np.ndarray):
+    similar = np.ones(len(left), dtype=bool)
+    for pair, (a, b) in enumerate(zip(addresses[left], addresses[right])):
+        if isinstance(a, str) and isinstance(b, str):
+            a, b = set(a.split()), set(b.split())
+            similar[pair] = len(a & b) >= ADDRESS_MIN_OVERLAP * min(len(a), len(b))
+    return similar
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+class EntityIndex:
+    """
+    Incremental MinHash/LSH index assigning a cluster ID to every listing.
+
+    Listings are keyed by ``(source, listing_id)``. Each update only computes the
+    signatures of unseen listings and compares them with the listings sharing an
+    LSH bucket, so the work grows with the number of new listings rather than with
+    the number of pairs. Candidate pairs are accepted when their estimated Jaccard
+    similarity reaches ``threshold``, and clusters are the connected components of
+    accepted pairs. Signatures only cover the title, city, neighborhood and price,
+    which every source fills in. Pairs whose city, price, or (when both listings
+    have them) address, bedrooms or area clearly disagree are rejected even when
+    their text is similar, since agencies reuse generic titles.
+
+    The cluster ID is the position of the oldest listing in the cluster, so IDs are
+    stable across updates unless two existing clusters are merged. A listing that
+    is already indexed keeps the signature of the crawl it was first seen in.
+    """
+
+    def __init__(
+        self,
+        index_dir: Path,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_bucket_size: int = DEFAULT_MAX_BUCKET_SIZE,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.index_dir = index_dir
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.threshold = threshold
+        self.max_bucket_size = max_bucket_size
+
+        self.entities = pd.DataFrame(
+            {
+                "source": pd.Series(dtype="string"),
+                "listing_id": pd.Series(dtype="string"),
+                "city": pd.Series(dtype="string"),
+                "address": pd.Series(dtype="string"),
+                "price": pd.Series(dtype="float64"),
+                "area": pd.Series(dtype="float64"),
+                "bedrooms": pd.Series(dtype="float64"),
+            }
+        )
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.cluster_ids = np.empty(0, dtype=np.int64)
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.index_dir / "entities.parquet"
+
+    @property
+    def _signatures_path(self) -> Path:
+        return self.index_dir / "signatures.npy"
+
+    def load(self) -> "EntityIndex":
+        if self._keys_path.exists():
+            entities = pd.read_parquet(self._keys_path)
+            if "address" not in entities.columns:
+                # Written when signatures still covered source specific fields
+                logger.warning(f"Entity index {self.index_dir} is outdated, rebuilding it")
+                return self
+            self.entities = entities[ENTITY_KEY_COLUMNS + ENTITY_ATTRIBUTE_COLUMNS]
+            self.cluster_ids = entities["cluster_id"].to_numpy(dtype=np.int64)
+            self.signatures = np.load(self._signatures_path)
+            logger.info(f"Loaded {len(self.entities)} listings from entity index {self.index_dir}")
+        return self
+
+    def save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        np.save(self._signatures_path, self.signatures)
+        self.entities.assign(cluster_id=self.cluster_ids).to_parquet(self._keys_path, index=False)
+        logger.info(f"Saved entity index with {len(self.entities)} listings to {self.index_dir}")
+
+    def _candidate_pairs(self, first_new: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        keys = band_keys(self.signatures, self.bands)
+
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            sorted_keys = keys[order, band]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            sizes = np.diff(np.r_[starts, len(order)])
+
+            # Most shared buckets hold a single pair, handle those without a Python loop
+            pairs = starts[sizes == 2]
+            first, second = order[pairs], order[pairs + 1]
+            lefts, rights = [np.maximum(first, second)], [np.minimum(first, second)]
+
+            large = (sizes > 2) & (sizes <= self.max_bucket_size)
+            for start, size in zip(starts[large], sizes[large]):
+                members = order[start : start + size]
+                new = members[members >= first_new]
+                if not len(new):
+                    continue
+
+                # Every new member against every other member of the bucket
+                left = np.repeat(new, size)
+                right = np.tile(members, len(new))
+                keep = left > right
+                lefts.append(left[keep])
+                rights.append(right[keep])
+
+            left, right = np.concatenate(lefts), np.concatenate(rights)
+            keep = left >= first_new
+            yield left[keep], right[keep]
+
+    def _compatible(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        cities = self._cities
+        same_city = (cities[left] == cities[right]) | (cities[left] < 0) | (cities[right] < 0)
+        compatible = (
+            same_city
+            & _within(self._bedrooms, left, right, 0)
+            & _within(self._prices, left, right, PRICE_TOLERANCE)
+            & _within(self._areas, left, right, AREA_TOLERANCE)
+        )
+        # Addresses are compared word by word, only on pairs that agree on everything else
+        compatible[compatible] = _similar_addresses(
+            self._addresses, left[compatible], right[compatible]
+        )
+        return compatible
+
+    def update(self, listings: pd.DataFrame) -> pd.Series:
+        """
+        Add unseen listings to the index and return the cluster ID of every row.
+
+        Args:
+            listings: Processed listings with ``source`` and ``listing_id`` columns
+
+        Returns:
+            Cluster IDs aligned with ``listings``
+        """
+        keys = listings[ENTITY_KEY_COLUMNS].astype("string")
+        known = pd.MultiIndex.from_frame(self.entities[ENTITY_KEY_COLUMNS])
+        is_new = ~pd.MultiIndex.from_frame(keys).isin(known) & ~keys.duplicated().to_numpy()
+        new_listings = listings[is_new]
+
+        first_new = len(self.entities)
+        if len(new_listings):
+            shingles = [listing_shingles(row) for row in new_listings.to_dict("records")]
+            self.signatures = np.concatenate([self.signatures, self.hasher.signatures(shingles)])
+
+            attributes = pd.DataFrame(
+                {
+                    "city": new_listings["city"].map(normalize_text).replace("", None),
+                    "address": new_listings["address"].map(normalize_text).replace("", None),
+                    "price": pd.to_numeric(new_listings["price"], errors="coerce"),
+                    "area": pd.to_numeric(new_listings["area"], errors="coerce"),
+                    "bedrooms": pd.to_numeric(new_listings["bedrooms"], errors="coerce"),
+                }
+            ).astype(self.entities.dtypes[ENTITY_ATTRIBUTE_COLUMNS].to_dict())
+            new_entities = pd.concat([keys[is_new], attributes], axis=1)
+            self.entities = pd.concat([self.entities, new_entities], ignore_index=True)
+
+            self._cities = pd.factorize(self.entities["city"])[0]
+            self._addresses = self.entities["address"].to_numpy(dtype=object, na_value=None)
+            self._prices = self.entities["price"].to_numpy(dtype="float64", na_value=np.nan)
+            self._areas = self.entities["area"].to_numpy(dtype="float64", na_value=np.nan)
+            self._bedrooms = self.entities["bedrooms"].to_numpy(dtype="float64", na_value=np.nan)
+
+            # Existing cluster IDs already point at their root; new listings start alone
+            parent = np.concatenate(
+                [self.cluster_ids, np.arange(first_new, len(self.entities), dtype=np.int64)]
+            )
+            accepted = 0
+            for left, right in self._candidate_pairs(first_new):
+                similar = (self.signatures[left] == self.signatures[right]).mean(axis=1)
+                similar = (similar >= self.threshold) & self._compatible(left, right)
+                for a, b in zip(left[similar], right[similar]):
+                    root_a, root_b = _find(parent, a), _find(parent, b)
+                    if root_a != root_b:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+                        accepted += 1
+
+            # Flatten so every listing points straight at its cluster root
+            while True:
+                flattened = parent[parent]
+                if np.array_equal(flattened, parent):
+                    break
+                parent = flattened
+            self.cluster_ids = parent
+
+            logger.info(
+                f"Indexed {len(new_listings)} new listings, {accepted} merges, "
+                f"{len(np.unique(self.cluster_ids))} clusters in total"
+            )
+
+        index = pd.MultiIndex.from_frame(self.entities[ENTITY_KEY_COLUMNS])
+        positions = index.get_indexer(pd.MultiIndex.from_frame(keys))
+        return pd.Series(self.cluster_ids[positions], index=listings.index, name="cluster_id")
+
+
+def assign_clusters(listings: pd.DataFrame, index_dir: Path, **kwargs) -> pd.DataFrame:
+    """
+    Update the entity index stored in ``index_dir`` and add a ``cluster_id`` column.
+
+    Args:
+        listings: Processed listings from one or more sources, with a ``source`` column
+        index_dir: Directory where the index is persisted between crawls
+        **kwargs: Passed to EntityIndex
+
+    Returns:
+        A copy of ``listings`` with the cluster ID of each row
+    """
+    index = EntityIndex(index_dir, **kwargs).load()
+    cluster_ids = index.update(listings)
+    index.save()
+    return listings.assign(cluster_id=cluster_ids)
@@ -0,0 +1,149 @@
+import hashlib
+from pathlib import Path
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from real_estate_ml.config import IMAGES_DIR
+
+DEFAULT_THUMBNAIL_SIZES = (224,)
+
+# Responses that will not change on a retry, so their URLs are not fetched again
+PERMANENT_STATUSES = {200, 403, 404, 410}
+
+# (source, listing_id, image URL)
+ImageReference = Tuple[str, object, str]
+
+
+def image_content_hash(body: bytes) -> str:
+    """Hash of the downloaded bytes; identical photos share one stored copy."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ImageStore:
+    """
+    Content addressed store of listing thumbnails with a SQLite index.
+
+    Thumbnails live at ``<root>/<size>/<hash[:2]>/<hash>.jpg``, so a photo shared by
+    many listings (or served under several URLs) is stored once. The index records
+    every stored image, the outcome of every fetched URL, and which listings
+    reference which URLs.
+    """
+
+    def __init__(self, root: Path = IMAGES_DIR, sizes: Sequence[int] = DEFAULT_THUMBNAIL_SIZES):
+        self.root = root
+        self.sizes = tuple(sizes)
+
+        root.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(root / "index.sqlite")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                content_hash TEXT PRIMARY KEY,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                content_hash TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS listing_images (
+                source TEXT NOT NULL,
+                listing_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (source, listing_id, url)
+            );
+            """
+        )
+
+    def path(self, content_hash: str, size: int) -> Path:
+        return self.root / str(size) / content_hash[:2] / f"{content_hash}.jpg"
+
+    def has_image(self, content_hash: str) -> bool:
+        """Whether the image is indexed and has a thumbnail in every configured size."""
+        indexed = (
+            self.conn.execute(
+                "SELECT 1 FROM images WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            is not None
+        )
+        return indexed and all(self.path(content_hash, size).exists() for size in self.sizes)
+
+    def add_image(
+        self,
+        content_hash: str,
+        thumbnails: Dict[int, bytes],
+        original_size: Tuple[int, int],
+        size: int,
+    ):
+        """Write the thumbnails of an image, then record it in the index."""
+        for thumbnail_size, data in thumbnails.items():
+            path = self.path(content_hash, thumbnail_size)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so an interrupted run never leaves a partial file
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO images VALUES (?, ?, ?, ?, ?)",
+                (content_hash, *original_size, size, time.time()),
+            )
+
+    def record_url(self, url: str, status: Optional[int], content_hash: Optional[str] = None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?)",
+                (url, status, content_hash, time.time()),
+            )
+
+    def link(self, references: Iterable[ImageReference]):
+        """Record which listings reference which image URLs."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO listing_images VALUES (?, ?, ?)",
+                ((source, str(listing_id), url) for source, listing_id, url in references),
+            )
+
+    def pending_urls(self) -> Iterable[str]:
+        """Linked URLs without a final outcome yet, i.e. never fetched or failed transiently."""
+        # Read through a second connection so outcomes recorded meanwhile do not disturb the scan
+        reader = sqlite3.connect(self.root / "index.sqlite")
+        placeholders = ",".join("?" * len(PERMANENT_STATUSES))
+        try:
+            cursor = reader.execute(
+                "SELECT DISTINCT l.url FROM listing_images l LEFT JOIN urls u ON u.url = l.url "
+                f"WHERE u.status IS NULL OR u.status NOT IN ({placeholders})",
+                tuple(PERMANENT_STATUSES),
+            )
+            while rows := cursor.fetchmany(10_000):
+                yield from (url for (url,) in rows)
+        finally:
+            reader.close()
+
+    def listing_images(self) -> pd.DataFrame:
+        """Stored images per listing: source, listing_id, url and content_hash."""
+        return pd.read_sql_query(
+            "SELECT l.source, l.listing_id, l.url, u.content_hash FROM listing_images l "
+            "JOIN urls u ON u.url = l.url WHERE u.content_hash IS NOT NULL "
+            "ORDER BY l.source, l.listing_id, l.url",
+            self.conn,
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,117 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from loguru import logger
+import pandas as pd
+
+MANIFEST_VERSION = 1
+
+
+def file_digest(file_path: Path, chunk_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 hex digest of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RawFileManifest:
+    """
+    Persisted record of the raw files that have already been processed.
+
+    Each entry stores the file size, modification time and content hash, keyed
+    by the path relative to the raw data directory. Size and mtime are checked
+    first; the file is only hashed again when one of them changed.
+    """
+
+    def __init__(self, manifest_path: Path, raw_data_dir: Path):
+        self.manifest_path = manifest_path
+        self.raw_data_dir = raw_data_dir
+        self.entries: Dict[str, Dict] = {}
+        self._pending: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        """Load the manifest from disk if it exists."""
+        if not self.manifest_path.exists():
+            return
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = data.get("files", {})
+            logger.info(f"Loaded manifest with {len(self.entries)} files from {self.manifest_path}")
+        except Exception as e:
+            logger.error(f"Error loading manifest {self.manifest_path}, starting fresh: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write the manifest atomically, including files marked as processed."""
+        self.entries.update(self._pending)
+        self._pending = {}
+
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f)
+        tmp_path.replace(self.manifest_path)
+
+        logger.info(f"Saved manifest with {len(self.entries)} files to {self.manifest_path}")
+
+    def discard(self, files: Iterable[Path]):
+        """Unstage files that failed to process, so the next run picks them up again."""
+        for file_path in files:
+            self._pending.pop(self._key(file_path), None)
+
+    def _key(self, file_path: Path) -> str:
+        return file_path.relative_to(self.raw_data_dir).as_posix()
+
+    def changed_files(self, files: Iterable[Path]) -> List[Path]:
+        """
+        Return the files that are new or whose content changed since the last run.
+
+        The state of every returned file is staged and written by the next ``save``,
+        so callers should only save once the files were processed successfully.
+        """
+        changed = []
+
+        for file_path in files:
+            key = self._key(file_path)
+            stat = file_path.stat()
+            entry = self.entries.get(key)
+
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                continue
+
+            state = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": file_digest(file_path),
+            }
+
+            if entry and entry["sha256"] == state["sha256"]:
+                # Touched but not modified; just refresh the stat information
+                self.entries[key] = state
+                continue
+
+            self._pending[key] = state
+            changed.append(file_path)
+
+        logger.info(f"{len(changed)} new or changed raw files since the last run")
+        return changed
+
+
+def merge_processed_data(
+    previous: pd.DataFrame, new: pd.DataFrame, key: str = "listing_id"
+) -> pd.DataFrame:
+    """Merge newly processed rows into a previous output, new rows replacing old ones."""
+    if previous.empty:
+        return new.reset_index(drop=True)
+    if new.empty:
+        return previous.reset_index(drop=True)
+
+    merged = pd.concat([previous, new], ignore_index=True)
+    return merged.drop_duplicates(subset=key, keep="last").reset_index(drop=True)
@@ -0,0 +1,113 @@
+import re
+from typing import Any, Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Scalar parsers (parse_*) are used item by item, e.g. in the Scrapy pipeline; the
+# column versions (*_to_numeric, bool_from_text) run the same patterns through Arrow
+# compute kernels over a whole pandas Series.
+
+# First number written the Brazilian way: "." groups thousands, "," starts decimals
+BR_NUMBER_PATTERN = r"(?P<number>[0-9]+(?:\.[0-9]{3})*(?:,[0-9]+)?)"
+INTEGER_PATTERN = r"(?P<number>[0-9]+)"
+
+_search_br_number = re.compile(BR_NUMBER_PATTERN).search
+_search_integer = re.compile(INTEGER_PATTERN).search
+
+# Substring marking a positive answer in fields such as "Aceita animais: Sim"
+TRUE_MARKER = "sim"
+
+
+def parse_br_number(value: Any) -> Optional[float]:
+    """Parse the first Brazilian formatted number in a value ("R$ 1.234,56" -> 1234.56)."""
+    if value.__class__ is str:
+        match = _search_br_number(value)
+        if match is None:
+            return None
+        return float(match.group(1).replace(".", "").replace(",", "."))
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def parse_count(value: Any) -> Optional[int]:
+    """Parse an integer count such as "3 quartos" or "5+"."""
+    if value.__class__ is str:
+        if value.isascii() and value.isdigit():
+            return int(value)
+        match = _search_integer(value)
+        return int(match.group(1)) if match else None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value) if value == value else None
+    return None
+
+
+def parse_bool(value: Any) -> Optional[bool]:
+    """Parse a "sim"/"não" answer; any non-empty answer without "sim" is False."""
+    if isinstance(value, bool):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return TRUE_MARKER in value.lower()
+
+
+# Money ("R$ 1.234,56") and areas ("1.200 m²") share the Brazilian number format
+parse_brl = parse_br_number
+parse_area = parse_br_number
+
+
+def _as_string_array(values: pd.Series) -> Optional[pa.Array]:
+    """Convert a column to an Arrow string array, or None if it mixes in non-strings."""
+    try:
+        return pa.array(values, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+
+def _extract_br_numbers(
+    values: pd.Series, pattern: str, parse: Callable[[Any], Any]
+) -> pd.Series:
+    """Extract the first number matching pattern from every value of a column."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype("float64")
+
+    text = _as_string_array(values)
+    if text is None:
+        # JSON sources mix strings and numbers in the same column
+        return values.map(parse, na_action="ignore").astype("float64")
+
+    token = pc.struct_field(pc.extract_regex(text, pattern), [0])
+    token = pc.replace_substring(pc.replace_substring(token, ".", ""), ",", ".")
+    numbers = pc.cast(token, pa.float64())
+    return pd.Series(numbers.to_numpy(zero_copy_only=False), index=values.index, name=values.name)
+
+
+def brl_to_numeric(values: pd.Series) -> pd.Series:
+    """Vectorized ``parse_brl`` over a whole column, returning float64."""
+    return _extract_br_numbers(values, BR_NUMBER_PATTERN, parse_br_number)
+
+
+def area_to_numeric(values: pd.Series) -> pd.Series:
+    """Vectorized ``parse_area`` over a whole column, returning float64."""
+    return _extract_br_numbers(values, BR_NUMBER_PATTERN, parse_br_number)
+
+
+def count_to_numeric(values: pd.Series) -> pd.Series:
+    """Vectorized ``parse_count`` over a whole column, returning nullable Int64."""
+    return _extract_br_numbers(values, INTEGER_PATTERN, parse_count).round().astype("Int64")
+
+
+def bool_from_text(values: pd.Series) -> pd.Series:
+    """Vectorized ``parse_bool`` over a whole column, returning nullable boolean."""
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype("boolean")
+
+    text = _as_string_array(values)
+    if text is None:
+        return values.map(parse_bool, na_action="ignore").astype("boolean")
+
+    text = pc.utf8_lower(pc.utf8_trim_whitespace(text))
+    answers = pc.if_else(pc.equal(text, ""), None, pc.match_substring(text, TRUE_MARKER))
+    return pd.Series(answers.to_pandas(), index=values.index, name=values.name, dtype="boolean")
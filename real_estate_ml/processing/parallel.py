@@ -0,0 +1,84 @@
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+import os
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Files handed to each worker per round trip; keeps IPC overhead low for small files
+DEFAULT_CHUNKSIZE = 16
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Turn a user supplied worker count into a usable one (None or <= 0 means all cores)."""
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def bounded_map(
+    executor: Optional[Executor], func: Callable, items: Iterable, max_in_flight: int
+) -> Iterator:
+    """Like executor.map, but submits lazily so at most max_in_flight items are pending."""
+    if executor is None:
+        yield from map(func, items)
+        return
+
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def _map_chunk(func: Callable[[Path], T], files: List[Path]) -> List[T]:
+    return [func(file_path) for file_path in files]
+
+
+def map_files(
+    func: Callable[[Path], T],
+    files: Iterable[Path],
+    workers: Optional[int] = 1,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Iterator[Tuple[Path, T]]:
+    """
+    Apply ``func`` to every file, fanning out to a process pool when more than one
+    worker is requested.
+
+    Results are yielded in input order, so callers that deduplicate with
+    "last one wins" semantics get the same output as with a sequential run.
+    At most ``2 * workers`` chunks are submitted ahead of the consumer, so
+    memory is bounded by the chunk size rather than the number of files.
+
+    Args:
+        func: Picklable callable taking a file path (e.g. a bound processor method)
+        files: Files to process
+        workers: Number of worker processes (1 runs in-process, None/0 uses all cores)
+        chunksize: Number of files sent to a worker at a time
+    """
+    files = list(files)
+    workers = min(resolve_workers(workers), max(len(files), 1))
+
+    if workers == 1:
+        for file_path in files:
+            yield file_path, func(file_path)
+        return
+
+    chunks = list(_chunks(files, max(chunksize, 1)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = bounded_map(
+            executor, partial(_map_chunk, func), chunks, max_in_flight=2 * workers
+        )
+        for chunk, chunk_results in zip(chunks, results):
+            yield from zip(chunk, chunk_results)
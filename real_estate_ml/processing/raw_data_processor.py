@@ -1,50 +1,87 @@
-import json
 from pathlib import Path
-from typing import Dict, List, Literal
+import tempfile
+from typing import Dict, Iterator, List, Literal, Optional, Sequence
 
 from loguru import logger
 import pandas as pd
 
+from real_estate_ml.processing.columnar import (
+    ColumnarBatchWriter,
+    iter_gallery_listings,
+    load_json_file,
+)
+from real_estate_ml.processing.dedup import DEFAULT_PARTITIONS, ExternalDeduplicator
+from real_estate_ml.processing.parallel import DEFAULT_CHUNKSIZE, map_files
+from real_estate_ml.processing.schema import (
+    LISTING_ARROW_SCHEMA,
+    apply_listing_schema,
+    arrow_converters,
+    build_listing_frame,
+)
+from real_estate_ml.processing.shards import (
+    crawl_date,
+    find_record_files,
+    is_record_file,
+    iter_records,
+)
+from real_estate_ml.processing.sinks import OutputFormat, write_frame, write_outputs
+
 
 class RawDataProcessor:
     # OLX category codes
     RENT_CATEGORY = "1020"  # Aluguel
 
-    def __init__(self, raw_data_dir: Path):
+    def __init__(
+        self,
+        raw_data_dir: Path,
+        workers: Optional[int] = 1,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        dedup: Literal["memory", "external"] = "memory",
+        spill_dir: Optional[Path] = None,
+        dedup_partitions: int = DEFAULT_PARTITIONS,
+    ):
         self.raw_data_dir = raw_data_dir
+        self.workers = workers
+        self.chunksize = chunksize
+        # "external" spills listings to disk and keeps the newest version of each one
+        self.dedup = dedup
+        self.spill_dir = spill_dir
+        self.dedup_partitions = dedup_partitions
+        self.processed_data = None
+        # Files of the last run that could not be read, to be retried by the next one
+        self.failed_files: List[Path] = []
+
+    def process_file(self, file_path: Path) -> Optional[List[Dict]]:
+        """
+        Process a single JSON file, or a segment of responses, and extract relevant listings.
 
-    def process_file(self, file_path: Path) -> List[Dict]:
-        """Process a single JSON file and extract relevant listings."""
+        Returns None when the file could not be read.
+        """
         clean_listings = []
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            for gallery_group in data:
-                # Skip "Produtos para sua casa" gallery
-                if gallery_group.get("title") == "Produtos para sua casa":
-                    continue
-
-                gallery_type = gallery_group.get("type")
-
-                if gallery_type == "GalleryGroup":
-                    for gallery in gallery_group.get("content", []):
-                        clean_listings.extend(
-                            self._process_listing(item)
-                            for item in gallery.get("content", [])
-                            if self._is_valid_listing(item)
-                        )
-
-                elif gallery_type == "SingleGallery":
-                    clean_listings.extend(
-                        self._process_listing(item)
-                        for item in gallery_group.get("content", [])
-                        if self._is_valid_listing(item)
-                    )
+            if is_record_file(file_path):
+                records = iter_records(file_path)
+            else:
+                records = [{"data": load_json_file(file_path)}]
+
+            for record in records:
+                # Deduplicated stores keep one listing per record instead of whole responses
+                if "content_hash" in record:
+                    items = [record["data"]]
+                else:
+                    items = iter_gallery_listings(record["data"])
+
+                date = crawl_date(file_path, record.get("fetched_at"))
+                clean_listings.extend(
+                    {**self._process_listing(item), "crawl_date": date}
+                    for item in items
+                    if self._is_valid_listing(item)
+                )
 
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {e}")
+            return None
 
         return clean_listings
 
@@ -70,52 +107,147 @@ class RawDataProcessor:
             "timestamp": listing.get("date_ts"),
         }
 
-    def process_all_files(self) -> List[Dict]:
-        """Process all JSON files in the raw data directory."""
-        all_listings = []
-
-        for file_path in self.raw_data_dir.glob("**/*.json"):
-            logger.info(f"Processing {file_path}")
-            listings = self.process_file(file_path)
-            all_listings.extend(listings)
+    def raw_files(self) -> List[Path]:
+        """List all raw JSON files and response segments in the raw data directory."""
+        return find_record_files(self.raw_data_dir) + list(self.raw_data_dir.glob("**/*.json"))
+
+    def _iter_listings(self, files: List[Path]) -> Iterator[Dict]:
+        self.failed_files = []
+        for file_path, listings in map_files(
+            self.process_file, files, workers=self.workers, chunksize=self.chunksize
+        ):
+            if listings is None:
+                self.failed_files.append(file_path)
+                continue
             logger.info(f"Found {len(listings)} valid rental listings in {file_path}")
+            yield from listings
+
+    def process_all_files(self, files: Optional[List[Path]] = None) -> Iterator[Dict]:
+        """
+        Process JSON files from the raw data directory, yielding unique listings.
+
+        With ``dedup="external"`` the newest version of each listing is kept and the
+        result does not depend on file order; listings are yielded straight from the
+        spilled partitions, so they are never all held in memory. Otherwise the last
+        copy read wins, and listings come out in the order of their last copy.
+
+        Args:
+            files: Files to process; defaults to every JSON file in the directory
+        """
+        files = self.raw_files() if files is None else files
+        logger.info(f"Found {len(files)} JSON files to process with {self.workers} worker(s)")
+
+        unique = 0
+        if self.dedup == "external":
+            with ExternalDeduplicator(self.spill_dir, self.dedup_partitions) as deduplicator:
+                deduplicator.add_many(self._iter_listings(files))
+                for listing in deduplicator:
+                    unique += 1
+                    yield listing
+        else:
+            # Remove duplicates based on listing_id; re-inserting keeps last-copy order,
+            # the order stream_to_parquet writes them in
+            unique_listings = {}
+            for listing in self._iter_listings(files):
+                unique_listings.pop(listing["listing_id"], None)
+                unique_listings[listing["listing_id"]] = listing
+            unique = len(unique_listings)
+            yield from unique_listings.values()
+
+        logger.info(f"Total unique rental listings after processing: {unique}")
+
+    def stream_to_parquet(self, output_path: Path, batch_size: int = 50_000) -> int:
+        """
+        Process all files and stream clean listings straight into a Parquet file.
 
-        # Remove duplicates based on listing_id
-        unique_listings = {listing["listing_id"]: listing for listing in all_listings}.values()
+        Listings are appended to per-column builders and flushed as record batches.
+        The same listings are written as by ``process_all_files``, in the same order:
+        the last copy of a duplicated listing wins, which takes a first pass over the
+        files to find the position of every last copy, so one batch plus a map of
+        listing IDs is kept in memory. With ``dedup="external"`` listings are spilled
+        to disk and the newest version of each one is written, without any map of IDs.
 
-        logger.info(f"Total unique rental listings after processing: {len(unique_listings)}")
-        return list(unique_listings)
+        Args:
+            output_path: Path of the Parquet file to write
+            batch_size: Number of rows per record batch
+
+        Returns:
+            Number of unique listings written
+        """
+        files = self.raw_files()
+        logger.info(f"Streaming {len(files)} JSON files to {output_path}")
+
+        with ColumnarBatchWriter(
+            output_path, LISTING_ARROW_SCHEMA, batch_size, arrow_converters()
+        ) as writer:
+            if self.dedup == "external":
+                for listing in self.process_all_files(files):
+                    writer.append(listing)
+            else:
+                last_copies = {}
+                for position, listing in enumerate(self._iter_listings(files)):
+                    last_copies[listing["listing_id"]] = position
+                for position, listing in enumerate(self._iter_listings(files)):
+                    if last_copies.get(listing["listing_id"]) == position:
+                        writer.append(listing)
+
+        logger.info(f"Streamed {writer.rows_written} unique rental listings to {output_path}")
+        return writer.rows_written
+
+    def process_raw_data(self, files: Optional[List[Path]] = None):
+        """
+        Process raw files into a DataFrame with the canonical listing schema,
+        stored in ``processed_data``.
+
+        With ``dedup="external"`` the unique listings are streamed through a
+        columnar Parquet file in the spill directory, so only the typed columns
+        are ever in memory, never a list of listing dicts.
+
+        Args:
+            files: Files to process; defaults to every JSON file in the directory
+        """
+        if self.dedup == "external":
+            if self.spill_dir is not None:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.TemporaryDirectory(prefix="listings-", dir=self.spill_dir) as tmp_dir:
+                path = Path(tmp_dir) / "listings.parquet"
+                with ColumnarBatchWriter(
+                    path, LISTING_ARROW_SCHEMA, converters=arrow_converters()
+                ) as writer:
+                    for listing in self.process_all_files(files):
+                        writer.append(listing)
+                frame = pd.read_parquet(path) if writer.rows_written else pd.DataFrame()
+            self.processed_data = apply_listing_schema(frame)
+        else:
+            # Prices, timestamps and categories are typed while the frame is built
+            self.processed_data = build_listing_frame(list(self.process_all_files(files)))
 
     def save_processed_data(
         self, output_path: Path, format: Literal["json", "csv", "parquet"] = "parquet"
     ):
         """
-        Process all files and save clean data in the specified format.
+        Save clean data in the specified format, processing the raw files first if needed.
 
         Args:
             output_path: Path where to save the processed data
             format: Output format ("json", "csv", or "parquet")
         """
-        clean_data = self.process_all_files()
-        df = pd.DataFrame(clean_data)
-
-        # Convert timestamp to datetime
-        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        if self.processed_data is None:
+            self.process_raw_data()
 
-        # Clean price values
-        df["price"] = df["price"].str.replace("R$", "").str.strip()
-        df["price"] = pd.to_numeric(
-            df["price"].str.replace(".", "").str.replace(",", "."), errors="coerce"
-        )
+        write_frame(self.processed_data, output_path, format)
 
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+    def save_outputs(
+        self, output_dir: Path, formats: Sequence[OutputFormat] = ("parquet", "csv")
+    ) -> Dict[str, Path]:
+        """
+        Save clean data once per format, writing all formats concurrently.
 
-        # Save in the specified format
-        if format == "json":
-            df.to_json(output_path, orient="records", force_ascii=False, indent=2)
-        elif format == "csv":
-            df.to_csv(output_path, index=False)
-        elif format == "parquet":
-            df.to_parquet(output_path, index=False)
+        Args:
+            output_dir: Directory where the listings files are written
+            formats: Output formats ("json", "csv" and/or "parquet")
+        """
+        if self.processed_data is None:
+            self.process_raw_data()
 
-        logger.info(f"Saved processed data to {output_path} in {format} format")
+        return write_outputs(self.processed_data, output_dir, formats)
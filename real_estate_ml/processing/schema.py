@@ -0,0 +1,179 @@
+from typing import Callable, Dict, Iterable, List
+
+import pandas as pd
+import pyarrow as pa
+
+from real_estate_ml.processing.normalize import area_to_numeric, brl_to_numeric, count_to_numeric
+
+# Bump whenever a column is added, removed or changes type
+LISTING_SCHEMA_VERSION = 2
+SCHEMA_VERSION_ATTR = "listing_schema_version"
+
+STRING = pd.StringDtype("pyarrow")
+CATEGORY = pd.CategoricalDtype()
+TIMESTAMP = "datetime64[ms, UTC]"
+
+# Largest count accepted for bedrooms/bathrooms/parking; anything above is bad data
+MAX_COUNT = 255
+
+
+def _objects(values: List) -> pd.Series:
+    return pd.Series(values, dtype="object")
+
+
+def _to_id(values: List) -> pd.Series:
+    return pd.to_numeric(_objects(values), errors="coerce").astype("Int64")
+
+
+def _to_string(values: List) -> pd.Series:
+    return _objects(values).astype(STRING)
+
+
+def _to_category(values: List) -> pd.Series:
+    return _to_string(values).astype(CATEGORY)
+
+
+def _to_money(values: List) -> pd.Series:
+    return brl_to_numeric(_objects(values)).astype("float64")
+
+
+def _to_area(values: List) -> pd.Series:
+    return area_to_numeric(_objects(values)).astype("float32")
+
+
+def _to_count(values: List) -> pd.Series:
+    counts = count_to_numeric(_objects(values))
+    return counts.where((counts >= 0) & (counts <= MAX_COUNT)).astype("UInt8")
+
+
+def _to_epoch_ms(values: List) -> pd.Series:
+    millis = pd.to_numeric(_objects(values), errors="coerce")
+    return pd.to_datetime(millis, unit="ms", utc=True).astype(TIMESTAMP)
+
+
+def _to_datetime(values: List) -> pd.Series:
+    dates = pd.to_datetime(_objects(values), utc=True, errors="coerce", format="ISO8601")
+    return dates.astype(TIMESTAMP)
+
+
+# Canonical processed listing: column -> (pandas dtype, converter from raw values).
+# Both OLX and ZAP frames carry every column; fields a source lacks are null.
+LISTING_SCHEMA: Dict[str, tuple] = {
+    "listing_id": ("Int64", _to_id),
+    "title": (STRING, _to_string),
+    "price": ("float64", _to_money),
+    "url": (STRING, _to_string),
+    "image_url": (STRING, _to_string),
+    "address": (STRING, _to_string),
+    "neighborhood": (CATEGORY, _to_category),
+    "city": (CATEGORY, _to_category),
+    "state": (CATEGORY, _to_category),
+    "area": ("float32", _to_area),
+    "bedrooms": ("UInt8", _to_count),
+    "bathrooms": ("UInt8", _to_count),
+    "parking_spaces": ("UInt8", _to_count),
+    "property_type": (CATEGORY, _to_category),
+    "listing_type": (CATEGORY, _to_category),
+    "timestamp": (TIMESTAMP, _to_epoch_ms),
+    "created_at": (TIMESTAMP, _to_datetime),
+    "updated_at": (TIMESTAMP, _to_datetime),
+    # YYYYmmdd date the raw listing was fetched, not the date it was processed
+    "crawl_date": (STRING, _to_string),
+}
+
+LISTING_COLUMNS = list(LISTING_SCHEMA)
+
+# Arrow equivalent used by the streaming writers; categories become dictionary columns
+LISTING_ARROW_SCHEMA = pa.schema(
+    [
+        ("listing_id", pa.int64()),
+        ("title", pa.string()),
+        ("price", pa.float64()),
+        ("url", pa.string()),
+        ("image_url", pa.string()),
+        ("address", pa.string()),
+        ("neighborhood", pa.dictionary(pa.int32(), pa.string())),
+        ("city", pa.dictionary(pa.int32(), pa.string())),
+        ("state", pa.dictionary(pa.int32(), pa.string())),
+        ("area", pa.float32()),
+        ("bedrooms", pa.uint8()),
+        ("bathrooms", pa.uint8()),
+        ("parking_spaces", pa.uint8()),
+        ("property_type", pa.dictionary(pa.int32(), pa.string())),
+        ("listing_type", pa.dictionary(pa.int32(), pa.string())),
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("created_at", pa.timestamp("ms", tz="UTC")),
+        ("updated_at", pa.timestamp("ms", tz="UTC")),
+        ("crawl_date", pa.string()),
+    ],
+    metadata={SCHEMA_VERSION_ATTR: str(LISTING_SCHEMA_VERSION)},
+)
+
+
+def convert_column(name: str, values: List) -> pd.Series:
+    """Convert the raw values of one listing column to its canonical dtype."""
+    _, converter = LISTING_SCHEMA[name]
+    return converter(values)
+
+
+def to_arrow_array(name: str, values: List) -> pa.Array:
+    """Convert the raw values of one listing column to an Arrow array of the canonical type."""
+    field = LISTING_ARROW_SCHEMA.field(name)
+    return pa.Array.from_pandas(convert_column(name, values)).cast(field.type)
+
+
+def arrow_converters() -> Dict[str, Callable[[List], pa.Array]]:
+    """Per-column converters for ColumnarBatchWriter producing the canonical Arrow schema."""
+    return {name: _ArrowConverter(name) for name in LISTING_COLUMNS}
+
+
+class _ArrowConverter:
+    # Picklable stand-in for functools.partial(to_arrow_array, name)
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, values: List) -> pa.Array:
+        return to_arrow_array(self.name, values)
+
+
+def build_listing_frame(records: Iterable[Dict]) -> pd.DataFrame:
+    """
+    Build a processed listings DataFrame with the canonical schema.
+
+    Columns are converted straight from the raw record values to their final
+    dtypes, so no intermediate all-object frame is ever materialized.
+    """
+    records = records if isinstance(records, list) else list(records)
+    df = pd.DataFrame(
+        {name: convert_column(name, [r.get(name) for r in records]) for name in LISTING_COLUMNS}
+    )
+    df.attrs[SCHEMA_VERSION_ATTR] = LISTING_SCHEMA_VERSION
+    return df
+
+
+def _has_dtype(values: pd.Series, dtype) -> bool:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Categories read back from Parquet are object strings, not the canonical STRING
+        return str(dtype) == "category" and values.cat.categories.dtype == STRING
+    return str(values.dtype) == str(dtype)
+
+
+def apply_listing_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce an existing frame (e.g. an older output or a merge of several frames) to
+    the canonical schema, adding missing columns as nulls.
+    """
+    columns = {}
+    for name, (dtype, converter) in LISTING_SCHEMA.items():
+        if name not in df.columns:
+            columns[name] = converter([None] * len(df)).set_axis(df.index)
+        elif _has_dtype(df[name], dtype):
+            columns[name] = df[name]
+        elif pd.api.types.is_datetime64_any_dtype(df[name]):
+            columns[name] = pd.to_datetime(df[name], utc=True).astype(TIMESTAMP)
+        else:
+            columns[name] = converter(df[name].tolist()).set_axis(df.index)
+
+    typed = pd.DataFrame(columns, index=df.index)
+    typed.attrs[SCHEMA_VERSION_ATTR] = LISTING_SCHEMA_VERSION
+    return typed
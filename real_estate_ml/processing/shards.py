@@ -0,0 +1,421 @@
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+import gzip
+import io
+import json
+import os
+from pathlib import Path
+import re
+from typing import Dict, Iterator, List, Optional, Set
+
+from loguru import logger
+import zstandard
+
+from real_estate_ml.processing.columnar import load_json_file, loads
+
+SHARD_SUFFIX = ".jsonl.gz"
+# Append-only collector output, see SegmentWriter
+SEGMENT_SUFFIX = ".jsonl.zst"
+RECORD_SUFFIXES = (SHARD_SUFFIX, SEGMENT_SUFFIX)
+# Shards live next to the raw files they replace, e.g. data/raw/zap/shards
+SHARD_DIRNAME = "shards"
+INDEX_FILENAME = "index.tsv"
+
+# Raw collector files are named listing_<id>_<YYYYmmdd_HHMMSS>.json
+RAW_FILENAME_RE = re.compile(r"listing_(?P<listing_id>.+)_(?P<fetched_at>\d{8}_\d{6})\.json$")
+# Every collector run writes below data/raw/<source>/<YYYYmmdd_HHMMSS>/
+CRAWL_DIRNAME_RE = re.compile(r"^(?P<date>\d{8})_\d{6}$")
+
+DEFAULT_MAX_SHARD_BYTES = 256 * 1024 * 1024
+DEFAULT_BLOCK_BYTES = 64 * 1024
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ShardLocation:
+    """Position of a record: a gzip member in a shard and the line inside it."""
+
+    shard: str
+    offset: int
+    length: int
+    line: int
+    source: str
+
+
+def _iter_zstd_lines(segment_path: Path) -> Iterator[bytes]:
+    with open(segment_path, "rb") as raw:
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        try:
+            yield from io.BufferedReader(reader)
+        except zstandard.ZstdError as e:
+            # A crash can leave the last frame unfinished; keep every complete record
+            logger.warning(f"Truncated segment {segment_path}, stopping early: {e}")
+
+
+def _iter_gzip_lines(shard_path: Path) -> Iterator[bytes]:
+    with gzip.open(shard_path, "rb") as lines:
+        yield from lines
+
+
+def iter_records(record_path: Path) -> Iterator[Dict]:
+    """Stream the records of a compressed JSONL shard (.jsonl.gz) or segment (.jsonl.zst)."""
+    if record_path.name.endswith(SEGMENT_SUFFIX):
+        lines = _iter_zstd_lines(record_path)
+    else:
+        lines = _iter_gzip_lines(record_path)
+
+    # Closing an abandoned reader closes the file right away
+    with closing(lines):
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping corrupt record in {record_path}: {e}")
+
+
+def crawl_date(file_path: Path, fetched_at: Optional[str] = None) -> str:
+    """
+    Crawl date (YYYYmmdd) of a raw listing.
+
+    The fetch time stored with the record wins, then the timestamp in the file
+    name, then the collector run directory, and finally the file's mtime.
+    """
+    if fetched_at:
+        return datetime.fromisoformat(fetched_at).strftime("%Y%m%d")
+
+    match = RAW_FILENAME_RE.search(file_path.name)
+    if match:
+        return match.group("fetched_at")[:8]
+
+    for parent in file_path.parents:
+        match = CRAWL_DIRNAME_RE.match(parent.name)
+        if match:
+            return match.group("date")
+
+    return datetime.fromtimestamp(file_path.stat().st_mtime).strftime("%Y%m%d")
+
+
+def is_record_file(path: Path) -> bool:
+    """Whether a path is a shard or segment holding many records."""
+    return path.name.endswith(RECORD_SUFFIXES)
+
+
+def find_record_files(raw_data_dir: Path) -> List[Path]:
+    """List every shard and segment below a raw data directory."""
+    return sorted(
+        path for suffix in RECORD_SUFFIXES for path in raw_data_dir.rglob(f"*{suffix}")
+    )
+
+
+class ShardWriter:
+    """
+    Append records to size bounded, gzip compressed JSONL shards.
+
+    Records are grouped in blocks of roughly ``block_bytes`` that are compressed
+    as independent gzip members. The shard stays a valid ``.jsonl.gz`` file for
+    sequential readers, while the index stores each member's byte range so a
+    single record can be read by decompressing only its block.
+    """
+
+    def __init__(
+        self,
+        shard_dir: Path,
+        max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES,
+        block_bytes: int = DEFAULT_BLOCK_BYTES,
+        prefix: str = "shard",
+    ):
+        self.shard_dir = shard_dir
+        self.max_shard_bytes = max_shard_bytes
+        self.block_bytes = block_bytes
+        self.prefix = prefix
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+
+        self._shard_number = self._next_shard_number()
+        self._file = None
+        self._shard_name = None
+        self._block: List[bytes] = []
+        self._block_keys: List[tuple] = []
+        self._block_size = 0
+        self._index_rows: List[str] = []
+        self.records_written = 0
+
+    def _next_shard_number(self) -> int:
+        numbers = [
+            int(path.name[len(self.prefix) + 1 : -len(SHARD_SUFFIX)])
+            for path in self.shard_dir.glob(f"{self.prefix}-*{SHARD_SUFFIX}")
+        ]
+        return max(numbers, default=-1) + 1
+
+    def _open_shard(self):
+        self._shard_name = f"{self.prefix}-{self._shard_number:05d}{SHARD_SUFFIX}"
+        self._file = open(self.shard_dir / self._shard_name, "ab")
+        self._shard_number += 1
+
+    def _close_shard(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        self._write_index()
+        logger.info(f"Closed shard {self._shard_name}")
+
+    def _write_index(self):
+        # Index rows are only published once the shard data is on disk
+        if not self._index_rows:
+            return
+        with open(self.shard_dir / INDEX_FILENAME, "a", encoding="utf-8") as f:
+            f.writelines(self._index_rows)
+            f.flush()
+            os.fsync(f.fileno())
+        self._index_rows = []
+
+    def write(self, listing_id: str, record: Dict, source: str = ""):
+        """Append a record; ``source`` is the original file it came from, if any."""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._block.append(line + b"\n")
+        self._block_keys.append((str(listing_id), source))
+        self._block_size += len(line) + 1
+
+        if self._block_size >= self.block_bytes:
+            self._flush_block()
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        if self._file is None:
+            self._open_shard()
+
+        member = gzip.compress(b"".join(self._block))
+        offset = self._file.tell()
+        self._file.write(member)
+
+        location = f"{self._shard_name}\t{offset}\t{len(member)}"
+        for line_number, (listing_id, source) in enumerate(self._block_keys):
+            self._index_rows.append(f"{listing_id}\t{location}\t{line_number}\t{source}\n")
+
+        self.records_written += len(self._block)
+        self._block, self._block_keys, self._block_size = [], [], 0
+
+        if self._file.tell() >= self.max_shard_bytes:
+            self._close_shard()
+
+    def close(self):
+        """Flush the last block and close the current shard."""
+        self._flush_block()
+        self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SegmentWriter:
+    """
+    Append records to rotating zstd compressed JSONL segments.
+
+    Records are compressed as they arrive and a zstd frame is closed every
+    ``frame_records`` records, so at most one frame is lost if the process dies.
+    When a segment grows past ``max_segment_bytes`` it is closed and fsynced
+    and a new one is started.
+    """
+
+    def __init__(
+        self,
+        segment_dir: Path,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        frame_records: int = 100,
+        level: int = 3,
+        prefix: str = "segment",
+    ):
+        self.segment_dir = segment_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.frame_records = frame_records
+        self.prefix = prefix
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._segment_number = 0
+        self._file = None
+        self._writer = None
+        self._frame_pending = 0
+        self.segment_path: Optional[Path] = None
+        self.records_written = 0
+
+    def _open_segment(self):
+        # Never append to a segment from an earlier run; it may end in a broken frame
+        while True:
+            name = f"{self.prefix}-{self._segment_number:05d}{SEGMENT_SUFFIX}"
+            self._segment_number += 1
+            if not (self.segment_dir / name).exists():
+                break
+
+        self.segment_path = self.segment_dir / name
+        self._file = open(self.segment_path, "wb")
+        self._writer = self._compressor.stream_writer(self._file, closefd=False)
+
+    def _end_frame(self):
+        if self._writer is not None and self._frame_pending:
+            self._writer.flush(zstandard.FLUSH_FRAME)
+            self._frame_pending = 0
+
+    def rotate(self):
+        """Close the current segment, making sure it is durably on disk."""
+        if self._file is None:
+            return
+
+        self._end_frame()
+        self._writer.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        logger.info(f"Closed segment {self.segment_path}")
+        self._file = self._writer = None
+
+    def write(self, record: Dict) -> Path:
+        """Append a record and return the segment it was written to."""
+        if self._file is None:
+            self._open_segment()
+
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._writer.write(line + b"\n")
+        self._frame_pending += 1
+        self.records_written += 1
+        segment_path = self.segment_path
+
+        if self._frame_pending >= self.frame_records:
+            self._end_frame()
+            if self._file.tell() >= self.max_segment_bytes:
+                self.rotate()
+
+        return segment_path
+
+    def close(self):
+        self.rotate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ShardIndex:
+    """Random access to shard records by listing ID using the offset index."""
+
+    def __init__(self, shard_dir: Path):
+        self.shard_dir = shard_dir
+        self.locations: Dict[str, ShardLocation] = {}
+        self._sources: Set[str] = set()
+        self.load()
+
+    def load(self):
+        index_path = self.shard_dir / INDEX_FILENAME
+        if not index_path.exists():
+            return
+
+        with open(index_path, "r", encoding="utf-8") as f:
+            for row in f:
+                listing_id, shard, offset, length, line, source = row.rstrip("\n").split("\t")
+                # Later rows win, so re-compacted listings point at their newest copy
+                self.locations[listing_id] = ShardLocation(
+                    shard, int(offset), int(length), int(line), source
+                )
+                if source:
+                    self._sources.add(source)
+
+    def __contains__(self, listing_id) -> bool:
+        return str(listing_id) in self.locations
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def sources(self) -> Set[str]:
+        """Original files that were already packed into shards."""
+        return self._sources
+
+    def get(self, listing_id) -> Optional[Dict]:
+        """Read one record by listing ID, decompressing only the block that holds it."""
+        location = self.locations.get(str(listing_id))
+        if location is None:
+            return None
+
+        with open(self.shard_dir / location.shard, "rb") as f:
+            f.seek(location.offset)
+            block = gzip.decompress(f.read(location.length))
+
+        return loads(block.split(b"\n")[location.line])
+
+
+def _raw_file_metadata(file_path: Path, data: Dict) -> Dict:
+    match = RAW_FILENAME_RE.search(file_path.name)
+    if match:
+        fetched_at = datetime.strptime(match.group("fetched_at"), "%Y%m%d_%H%M%S")
+    else:
+        fetched_at = datetime.fromtimestamp(file_path.stat().st_mtime)
+
+    listing_id = data.get("id") if isinstance(data, dict) else None
+    if listing_id is None:
+        listing_id = match.group("listing_id") if match else file_path.stem
+
+    return {"listing_id": str(listing_id), "fetched_at": fetched_at.isoformat()}
+
+
+def compact_directory(
+    raw_data_dir: Path,
+    shard_dir: Path,
+    max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES,
+    remove_sources: bool = False,
+) -> int:
+    """
+    Pack per-listing JSON files into compressed JSONL shards.
+
+    Each record keeps the original payload under ``data`` together with its
+    listing ID, fetch time and source path. Files already present in the shard
+    index are skipped, so the command can run again after every crawl.
+
+    Args:
+        raw_data_dir: Directory holding the per-listing JSON files
+        shard_dir: Directory where shards and the index are written
+        max_shard_bytes: Compressed size after which a new shard is started
+        remove_sources: Delete the JSON files once their shard is safely on disk
+
+    Returns:
+        Number of files packed
+    """
+    already_packed = ShardIndex(shard_dir).sources()
+    files = [
+        path
+        for path in sorted(raw_data_dir.rglob("*.json"))
+        if path.relative_to(raw_data_dir).as_posix() not in already_packed
+    ]
+    logger.info(f"Compacting {len(files)} JSON files from {raw_data_dir} into {shard_dir}")
+
+    packed = []
+    with ShardWriter(shard_dir, max_shard_bytes=max_shard_bytes) as writer:
+        for file_path in files:
+            try:
+                data = load_json_file(file_path)
+            except Exception as e:
+                logger.error(f"Error reading {file_path}, leaving it in place: {e}")
+                continue
+
+            source = file_path.relative_to(raw_data_dir).as_posix()
+            record = {**_raw_file_metadata(file_path, data), "source": source, "data": data}
+            writer.write(record["listing_id"], record, source)
+            packed.append(file_path)
+
+    logger.info(f"Packed {len(packed)} files into shards under {shard_dir}")
+
+    if remove_sources:
+        for file_path in packed:
+            file_path.unlink()
+        logger.info(f"Removed {len(packed)} compacted JSON files")
+
+    return len(packed)
@@ -0,0 +1,193 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Literal, Sequence
+import uuid
+
+from loguru import logger
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+OutputFormat = Literal["parquet", "csv", "json"]
+
+OUTPUT_SUFFIXES: Dict[str, str] = {"parquet": ".parquet", "csv": ".csv", "json": ".json"}
+
+
+def write_frame(df: pd.DataFrame, output_path: Path, format: OutputFormat = "parquet"):
+    """
+    Write a processed DataFrame to a single sink.
+
+    Args:
+        df: Processed listings
+        output_path: Path where to save the data
+        format: Output format ("parquet", "csv" or "json")
+    """
+    if format not in OUTPUT_SUFFIXES:
+        raise ValueError(f"Unsupported output format: {format}")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if format == "json":
+        df.to_json(output_path, orient="records", force_ascii=False, indent=2)
+    elif format == "csv":
+        df.to_csv(output_path, index=False)
+    elif format == "parquet":
+        df.to_parquet(output_path, index=False)
+
+    logger.info(f"Saved processed data to {output_path} in {format} format")
+
+
+def write_outputs(
+    df: pd.DataFrame,
+    output_dir: Path,
+    formats: Sequence[OutputFormat] = ("parquet", "csv"),
+    stem: str = "listings",
+) -> Dict[str, Path]:
+    """
+    Write the same DataFrame to several formats concurrently.
+
+    The frame is built once and each sink runs in its own thread. Only the Parquet
+    writer releases the GIL while encoding and compressing; pandas' CSV and JSON
+    writers mostly run Python code and hold it, so they overlap with Parquet but
+    not with each other. A failing sink is logged and does not prevent the others
+    from being written.
+
+    Args:
+        df: Processed listings
+        output_dir: Directory where the files are written
+        formats: Output formats, one file per format
+        stem: File name without suffix
+
+    Returns:
+        Mapping of format to the path that was written successfully
+    """
+    formats = list(dict.fromkeys(formats))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {fmt: output_dir / f"{stem}{OUTPUT_SUFFIXES[fmt]}" for fmt in formats}
+
+    written = {}
+    with ThreadPoolExecutor(max_workers=max(len(formats), 1)) as executor:
+        futures = {fmt: executor.submit(write_frame, df, paths[fmt], fmt) for fmt in formats}
+
+        for fmt, future in futures.items():
+            try:
+                future.result()
+                written[fmt] = paths[fmt]
+            except Exception as e:
+                logger.error(f"Error saving processed data as {fmt}: {e}")
+
+    return written
+
+
+# Partition columns of the processed listings dataset, from coarsest to finest
+LISTINGS_PARTITIONING = pa.schema(
+    [
+        ("source", pa.string()),
+        ("state", pa.string()),
+        ("city", pa.string()),
+        ("crawl_date", pa.string()),
+    ]
+)
+
+# Row groups of ~128k rows keep min/max statistics selective without tiny pages
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+
+
+def write_partitioned_dataset(
+    df: pd.DataFrame,
+    root: Path,
+    source: str,
+    crawl_date: str,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = "zstd",
+    merge: bool = False,
+) -> int:
+    """
+    Write listings to a Hive partitioned Parquet dataset.
+
+    Files are laid out as ``source=<source>/state=<uf>/city=<city>/crawl_date=<YYYYmmdd>``,
+    where the crawl date is the one of each row. Rows are sorted by listing ID
+    inside each partition and written with column statistics, so readers can skip
+    whole files and row groups. Partitions touched by this write are replaced,
+    which makes re-running a full processing idempotent. With ``merge``, as needed
+    by incremental runs that only hold part of a crawl, the rows already stored in
+    those partitions are kept, except those with the listing ID and crawl date of
+    a new row, so files that are processed again never add duplicates.
+
+    Args:
+        df: Processed listings with ``state`` and ``city`` columns
+        root: Root directory of the dataset
+        source: Data source (e.g. "olx" or "zap")
+        crawl_date: Crawl date of the rows that have none (older outputs)
+        row_group_size: Maximum number of rows per row group
+        compression: Parquet compression codec
+        merge: Merge the rows into the existing partitions instead of replacing them
+
+    Returns:
+        Number of rows written
+    """
+    df = df.assign(source=source)
+    if "crawl_date" in df.columns:
+        df["crawl_date"] = df["crawl_date"].astype("string").fillna(crawl_date)
+    else:
+        df = df.assign(crawl_date=crawl_date)
+
+    for column in LISTINGS_PARTITIONING.names:
+        df[column] = df[column].astype("string")
+
+    if merge:
+        df = _merge_existing_partitions(df, root)
+
+    sort_keys = LISTINGS_PARTITIONING.names + (["listing_id"] if "listing_id" in df else [])
+    table = pa.Table.from_pandas(df.sort_values(sort_keys, kind="stable"), preserve_index=False)
+
+    file_options = ds.ParquetFileFormat().make_write_options(
+        compression=compression, write_statistics=True
+    )
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=ds.partitioning(LISTINGS_PARTITIONING, flavor="hive"),
+        existing_data_behavior="delete_matching",
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        file_options=file_options,
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=row_group_size,
+    )
+
+    logger.info(f"Wrote {table.num_rows} rows to partitioned dataset {root} ({source})")
+    return table.num_rows
+
+
+def _merge_existing_partitions(df: pd.DataFrame, root: Path) -> pd.DataFrame:
+    """Add the stored rows of the partitions ``df`` touches, new rows replacing old ones."""
+    if not root.exists():
+        return df
+
+    names = LISTINGS_PARTITIONING.names
+    partitioning = ds.partitioning(LISTINGS_PARTITIONING, flavor="hive")
+    dataset = ds.dataset(root, format="parquet", partitioning=partitioning)
+    # Prune by every partition value, then keep the exact partitions in pandas
+    expression = None
+    for name in names:
+        values = pa.array(df[name].dropna().unique(), type=pa.string())
+        condition = pc.field(name).isin(values) | pc.field(name).is_null()
+        expression = condition if expression is None else expression & condition
+    existing = dataset.to_table(filter=expression).to_pandas()
+    if existing.empty:
+        return df
+
+    for name in names:
+        existing[name] = existing[name].astype("string")
+    touched = df[names].drop_duplicates()
+    existing = existing.merge(touched, on=names, how="inner")
+
+    merged = pd.concat([existing, df], ignore_index=True)
+    keys = [name for name in ("listing_id", "crawl_date") if name in merged]
+    merged = merged.drop_duplicates(subset=keys, keep="last", ignore_index=True)
+    logger.info(
+        f"Merged {len(df)} new rows into {len(existing)} stored rows of {len(touched)} partitions"
+    )
+    return merged
@@ -1,14 +1,36 @@
-import json
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence
 
 from loguru import logger
-import pandas as pd
+
+from real_estate_ml.processing.columnar import load_json_file
+from real_estate_ml.processing.parallel import DEFAULT_CHUNKSIZE, map_files
+from real_estate_ml.processing.schema import build_listing_frame
+from real_estate_ml.processing.shards import (
+    SHARD_DIRNAME,
+    ShardIndex,
+    crawl_date,
+    find_record_files,
+    is_record_file,
+    iter_records,
+)
+from real_estate_ml.processing.sinks import OutputFormat, write_frame, write_outputs
 
 
 class ZapDataProcessor:
-    def __init__(self, raw_data_dir: Path):
+    def __init__(
+        self,
+        raw_data_dir: Path,
+        workers: Optional[int] = 1,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+    ):
         self.raw_data_dir = raw_data_dir
+        self.workers = workers
+        self.chunksize = chunksize
         self.processed_data = None
+        # Files of the last run that could not be read, to be retried by the next one
+        self.failed_files: List[Path] = []
+        self._shard_index = None
 
     def process_listing(self, data: dict) -> dict:
         """Process a single listing data"""
@@ -34,42 +56,97 @@ class ZapDataProcessor:
             logger.error(f"Error processing listing: {e}")
             return None
 
-    def process_raw_data(self):
-        """Process all raw data files"""
-        processed_listings = []
+    def _dated_listing(
+        self, data: dict, raw_file: Path, record: Optional[dict] = None
+    ) -> Optional[dict]:
+        """Process a listing and tag it with the date it was crawled"""
+        listing = self.process_listing(data)
+        if listing:
+            fetched_at = record.get("fetched_at") if record else None
+            listing["crawl_date"] = crawl_date(raw_file, fetched_at)
+        return listing
+
+    def process_file(self, raw_file: Path) -> Optional[List[dict]]:
+        """Load and process a raw listing file, or a shard or segment of listings
+
+        Returns None when the file could not be read.
+        """
+        processed = []
+
+        try:
+            if is_record_file(raw_file):
+                for record in iter_records(raw_file):
+                    processed.append(self._dated_listing(record["data"], raw_file, record))
+            else:
+                processed.append(self._dated_listing(load_json_file(raw_file), raw_file))
 
-        # Find all JSON files in raw data directory
-        json_files = list(self.raw_data_dir.rglob("*.json"))
-        logger.info(f"Found {len(json_files)} JSON files to process")
+        except Exception as e:
+            logger.error(f"Error processing file {raw_file}: {e}")
+            return None
 
-        for json_file in json_files:
-            try:
-                with open(json_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+        return [listing for listing in processed if listing]
 
-                processed_listing = self.process_listing(data)
-                if processed_listing:
-                    processed_listings.append(processed_listing)
+    @property
+    def shard_dir(self) -> Path:
+        """Directory holding the compacted shards of this source"""
+        return self.raw_data_dir / SHARD_DIRNAME
 
-            except Exception as e:
-                logger.error(f"Error processing file {json_file}: {e}")
+    def raw_files(self) -> List[Path]:
+        """List shards, collector segments and the JSON files not compacted into shards yet"""
+        compacted = ShardIndex(self.shard_dir).sources()
+        json_files = [
+            path
+            for path in self.raw_data_dir.rglob("*.json")
+            if path.relative_to(self.raw_data_dir).as_posix() not in compacted
+        ]
+        return find_record_files(self.raw_data_dir) + json_files
+
+    def get_listing(self, listing_id) -> Optional[dict]:
+        """Read and process a single compacted listing by ID through the shard index"""
+        if self._shard_index is None:
+            self._shard_index = ShardIndex(self.shard_dir)
+        record = self._shard_index.get(listing_id)
+        if record is None:
+            return None
+        return self._dated_listing(record["data"], self.shard_dir, record)
 
-        # Convert to DataFrame
-        self.processed_data = pd.DataFrame(processed_listings)
+    def process_raw_data(self, files: Optional[List[Path]] = None):
+        """Process raw data files (all shards and JSON files in the raw data directory by default)"""
+        processed_listings = []
+
+        raw_files = self.raw_files() if files is None else files
+        logger.info(f"Found {len(raw_files)} raw files to process with {self.workers} worker(s)")
+
+        self.failed_files = []
+        for raw_file, listings in map_files(
+            self.process_file, raw_files, workers=self.workers, chunksize=self.chunksize
+        ):
+            if listings is None:
+                self.failed_files.append(raw_file)
+                continue
+            processed_listings.extend(listings)
+
+        # Convert to DataFrame with the canonical listing schema
+        self.processed_data = build_listing_frame(processed_listings)
         logger.info(f"Processed {len(processed_listings)} listings successfully")
 
-    def save_processed_data(self, output_path: Path, format: str = "parquet"):
+    def save_processed_data(self, output_path: Path, format: OutputFormat = "parquet"):
         """Save processed data to file"""
         if self.processed_data is None:
             logger.error("No processed data available. Run process_raw_data first.")
             return
 
         try:
-            if format == "parquet":
-                self.processed_data.to_parquet(output_path)
-            elif format == "csv":
-                self.processed_data.to_csv(output_path, index=False)
-
-            logger.info(f"Saved processed data to {output_path}")
+            write_frame(self.processed_data, output_path, format)
         except Exception as e:
             logger.error(f"Error saving processed data: {e}")
+
+    def save_outputs(
+        self, output_dir: Path, formats: Sequence[OutputFormat] = ("parquet", "csv")
+    ) -> Dict[str, Path]:
+        """Save processed data once per format, writing all formats concurrently"""
+        if self.processed_data is None:
+            logger.error("No processed data available. Run process_raw_data first.")
+            return {}
+
+        return write_outputs(self.processed_data, output_dir, formats)
@@ -0,0 +1,112 @@
+import argparse
+from pathlib import Path
+import random
+import time
+
+from parsel import Selector
+
+from real_estate_ml.legacy_scraping.ad_parser import AD_PROPERTY_FIELDS, parse_ad_html
+
+# Markup outside the ad itself so that fixtures approach the size of real pages
+PAGE_NOISE = "".join(
+    f'<nav><ul>{"".join(f"<li><a href=/c/{i}/{j}>Categoria {j}</a></li>" for j in range(30))}'
+    f"</ul></nav><script>window.__state_{i} = {{\"k\": \"{'x' * 2000}\"}}</script>"
+    for i in range(20)
+)
+
+
+def random_ad_html(rng: random.Random, ad_id: int) -> str:
+    labels = rng.sample(list(AD_PROPERTY_FIELDS), k=8)
+    properties = "".join(
+        '<div data-testid="ad-property">'
+        f'<div data-testid="ad-property-label">{label}</div>'
+        f'<div data-testid="ad-property-value">{rng.randint(1, 300)}</div></div>'
+        for label in labels
+    )
+    images = "".join(
+        f'<img data-testid="ad-image" src="https://img.olx.com.br/{ad_id}_{i}.jpg">'
+        for i in range(rng.randint(3, 15))
+    )
+    return (
+        '<html><head><meta charset="utf-8"><title>OLX</title></head><body>'
+        f"{PAGE_NOISE}"
+        f'<h1 data-testid="ad-title">Apartamento com {rng.randint(1, 4)} quartos</h1>'
+        f'<div data-testid="ad-price-value">R$ {rng.randint(800, 9000)}</div>'
+        '<div data-testid="ad-address">Boa Viagem, Recife, PE</div>'
+        f'<div data-testid="ad-description">{"Perto da praia. " * rng.randint(5, 60)}</div>'
+        f'<div data-testid="ad-properties">{properties}</div>{images}'
+        '<span data-testid="ad-posted-date">Hoje, 10:32</span>'
+        f'<span data-testid="ad-identifier">ID: {ad_id}</span>'
+        '<div data-testid="seller-name">Imobiliária</div>'
+        '<div data-testid="seller-member-since">Na OLX desde 2015</div>'
+        "</body></html>"
+    )
+
+
+def css_parse(body: bytes) -> dict:
+    """The per-field CSS selector parse OlxApiSpider.parse_ad_page did before."""
+    sel = Selector(body=body)
+    ad = {
+        "title": sel.css("h1[data-testid='ad-title']::text").get(),
+        "description": sel.css("div[data-testid='ad-description']::text").get(),
+        "price": sel.css("div[data-testid='ad-price-value']::text").get(),
+        "location": sel.css("div[data-testid='ad-address']::text").get(),
+        "published_date": sel.css("span[data-testid='ad-posted-date']::text").get(),
+        "ad_id": sel.css("span[data-testid='ad-identifier']::text").get(),
+        "seller_name": sel.css("div[data-testid='seller-name']::text").get(),
+        "seller_since": sel.css("div[data-testid='seller-member-since']::text").get(),
+        "image_urls": sel.css("img[data-testid='ad-image']::attr(src)").getall(),
+    }
+    details = sel.css("div[data-testid='ad-properties']").css("div[data-testid='ad-property']")
+    for detail in details:
+        label = detail.css("div[data-testid='ad-property-label']::text").get()
+        value = detail.css("div[data-testid='ad-property-value']::text").get()
+        if label in AD_PROPERTY_FIELDS and value:
+            ad[AD_PROPERTY_FIELDS[label]] = value.strip()
+    return ad
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ad page parsing on HTML fixtures")
+    parser.add_argument(
+        "--fixtures", type=Path, default=None, help="Directory of saved ad pages (*.html)"
+    )
+    parser.add_argument(
+        "--pages", type=int, default=500, help="Synthetic pages to parse when no fixtures given"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        pages = [path.read_bytes() for path in sorted(args.fixtures.glob("*.html"))]
+    else:
+        rng = random.Random(42)
+        pages = [random_ad_html(rng, 1_000_000 + i).encode("utf-8") for i in range(args.pages)]
+    if not pages:
+        parser.error(f"No *.html fixtures found in {args.fixtures}")
+
+    def best(func) -> float:
+        runs = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for body in pages:
+                func(body)
+            runs.append(time.perf_counter() - start)
+        return min(runs)
+
+    mean_kb = sum(len(body) for body in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {mean_kb:.0f} KB on average, single process (one core)")
+    print(f"{'parser':40} {'seconds':>10} {'ads/s':>10}")
+    for name, func in [
+        ("CSS selectors per field (parsel)", css_parse),
+        ("precompiled XPath (parse_ad_html)", parse_ad_html),
+    ]:
+        seconds = best(func)
+        print(f"{name:40} {seconds:>10.3f} {len(pages) / seconds:>10.0f}")
+
+    fields = sum(value is not None for value in parse_ad_html(pages[0]).values())
+    print(f"First page: {fields} fields extracted")
+
+
+if __name__ == "__main__":
+    main()
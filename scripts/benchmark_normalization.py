@@ -0,0 +1,145 @@
+import argparse
+import random
+import re
+import time
+
+import pandas as pd
+
+from real_estate_ml.processing.normalize import (
+    area_to_numeric,
+    brl_to_numeric,
+    parse_area,
+    parse_bool,
+    parse_brl,
+    parse_count,
+)
+
+
+def legacy_clean_price(prices: pd.Series) -> pd.Series:
+    """Price cleaning as previously done in RawDataProcessor.save_processed_data."""
+    prices = prices.str.replace("R$", "").str.strip()
+    return pd.to_numeric(prices.str.replace(".", "").str.replace(",", "."), errors="coerce")
+
+
+def legacy_process_item(item: dict) -> dict:
+    """Field cleaning as previously done in RealEstatePipeline.process_item."""
+    if item.get("price"):
+        price_str = item["price"].replace("R$", "").replace(".", "").replace(",", ".").strip()
+        try:
+            item["price"] = float(re.sub(r"[^\d.]", "", price_str))
+        except ValueError:
+            item["price"] = None
+
+    for area_field in ["area_total", "area_util"]:
+        if item.get(area_field):
+            match = re.search(r"(\d+(?:[\.,]\d+)?)", item[area_field])
+            if match:
+                try:
+                    item[area_field] = float(match.group(1).replace(",", "."))
+                except ValueError:
+                    item[area_field] = None
+
+    for field in ["bedrooms", "bathrooms", "parking_spots"]:
+        if item.get(field):
+            try:
+                item[field] = int(re.sub(r"[^\d]", "", item[field]))
+            except ValueError:
+                item[field] = None
+
+    for fee_field in ["condo_fee", "iptu"]:
+        if item.get(fee_field):
+            fee_str = item[fee_field].replace("R$", "").replace(".", "").replace(",", ".").strip()
+            try:
+                item[fee_field] = float(re.sub(r"[^\d.]", "", fee_str))
+            except ValueError:
+                item[fee_field] = None
+
+    for bool_field in ["accept_pets", "furnished"]:
+        if item.get(bool_field):
+            item[bool_field] = "sim" in item[bool_field].lower()
+
+    return item
+
+
+def new_process_item(item: dict) -> dict:
+    """Field cleaning with the shared normalization kernel."""
+    for money_field in ["price", "condo_fee", "iptu"]:
+        if item.get(money_field):
+            item[money_field] = parse_brl(item[money_field])
+    for area_field in ["area_total", "area_util"]:
+        if item.get(area_field):
+            item[area_field] = parse_area(item[area_field])
+    for field in ["bedrooms", "bathrooms", "parking_spots"]:
+        if item.get(field):
+            item[field] = parse_count(item[field])
+    for bool_field in ["accept_pets", "furnished"]:
+        if item.get(bool_field):
+            item[bool_field] = parse_bool(item[bool_field])
+    return item
+
+
+def random_money(rng: random.Random) -> str:
+    value = rng.randint(300, 5_000_000)
+    cents = rng.randint(0, 99)
+    return f"R$ {value:,}".replace(",", ".") + (f",{cents:02d}" if rng.random() < 0.3 else "")
+
+
+def random_item(rng: random.Random) -> dict:
+    return {
+        "price": random_money(rng),
+        "condo_fee": random_money(rng),
+        "iptu": random_money(rng),
+        "area_total": f"{rng.randint(20, 900)} m²",
+        "area_util": f"{rng.randint(20, 900)},{rng.randint(0, 9)} m²",
+        "bedrooms": str(rng.randint(1, 5)),
+        "bathrooms": str(rng.randint(1, 4)),
+        "parking_spots": f"{rng.randint(0, 4)}+",
+        "accept_pets": rng.choice(["Sim", "Não"]),
+        "furnished": rng.choice(["Sim", "Não"]),
+    }
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark listing value normalization")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the price column")
+    parser.add_argument("--items", type=int, default=200_000, help="Scrapy items to clean")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    prices = pd.Series([random_money(rng) for _ in range(args.rows)])
+    areas = pd.Series([f"{rng.randint(20, 900)} m²" for _ in range(args.rows)])
+    items = [random_item(rng) for _ in range(args.items)]
+
+    def best(func, *func_args):
+        return min(timed(func, *func_args) for _ in range(args.repeat))
+
+    results = [
+        ("price column (legacy str.replace chain)", best(legacy_clean_price, prices), args.rows),
+        ("price column (brl_to_numeric)", best(brl_to_numeric, prices), args.rows),
+        ("area column (area_to_numeric)", best(area_to_numeric, areas), args.rows),
+        (
+            "pipeline items (legacy regex per field)",
+            best(lambda: [legacy_process_item(dict(item)) for item in items]),
+            args.items,
+        ),
+        (
+            "pipeline items (scalar kernel)",
+            best(lambda: [new_process_item(dict(item)) for item in items]),
+            args.items,
+        ),
+    ]
+
+    print(f"{'benchmark':45} {'seconds':>10} {'rows/s':>14}")
+    for name, seconds, rows in results:
+        print(f"{name:45} {seconds:10.3f} {rows / seconds:14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
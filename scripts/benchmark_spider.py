@@ -0,0 +1,141 @@
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+from pathlib import Path
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from scrapy.crawler import CrawlerProcess
+
+from real_estate_ml.legacy_scraping.spiders.olx_api_spider import OlxApiSpider
+
+AD_PAGE = """<html><body>
+<div data-testid="ad-description">Apartamento {list_id} perto da praia</div>
+<div data-testid="ad-properties">
+  <div data-testid="ad-property">
+    <div data-testid="ad-property-label">Quartos</div>
+    <div data-testid="ad-property-value">2</div>
+  </div>
+  <div data-testid="ad-property">
+    <div data-testid="ad-property-label">Área útil</div>
+    <div data-testid="ad-property-value">65m²</div>
+  </div>
+</div>
+<img data-testid="ad-image" src="https://img.olx.com.br/{list_id}.jpg">
+<span data-testid="ad-posted-date">Hoje</span>
+</body></html>"""
+
+
+def make_handler(latency: float, per_page: int):
+    """Mock of the OLX search page, recommendation API and ad pages."""
+    ids = itertools.count(1_000_000_000)
+    ids_lock = threading.Lock()
+
+    class MockOlxHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, body: str, content_type: str):
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            time.sleep(latency)
+            parts = urlsplit(self.path)
+
+            if parts.path == "/api/v2/rec":
+                with ids_lock:
+                    new_ids = [next(ids) for _ in range(per_page)]
+                listings = [
+                    {
+                        "list_id": list_id,
+                        "subject": f"Apartamento {list_id}",
+                        "price": "R$ 2.500",
+                        "neighbourhood": "Boa Viagem",
+                        "municipality": "Recife",
+                        "state_uf": "pe",
+                    }
+                    for list_id in new_ids
+                ]
+                seed = parse_qs(parts.query).get("list_id", [""])[0]
+                body = [{"type": "GalleryGroup", "seed": seed, "content": [{"content": listings}]}]
+                self._send(json.dumps(body), "application/json")
+            elif parts.path.startswith("/vi/"):
+                self._send(AD_PAGE.format(list_id=parts.path[4:]), "text/html")
+            else:
+                self._send("<html><body>OLX</body></html>", "text/html")
+
+    return MockOlxHandler
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Measure OlxApiSpider throughput against a local mock of OLX'
+    )
+    parser.add_argument('--items', type=int, default=100,
+                      help='Stop after this many scraped ads')
+    parser.add_argument('--latency', type=float, default=1.0,
+                      help='Seconds the mock server waits before answering each request')
+    parser.add_argument('--per-page', type=int, default=20,
+                      help='Listings returned by every recommendation API call')
+    parser.add_argument('--delay', type=float, default=None,
+                      help='Override DOWNLOAD_DELAY (default: the spider setting)')
+    parser.add_argument('--no-autothrottle', action='store_true',
+                      help='Disable AutoThrottle to measure the unthrottled downloader')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency, args.per_page))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    # Ad pages under another hostname get their own download slot, as www.olx.com.br does
+    ad_base_url = f"http://localhost:{server.server_address[1]}"
+
+    frontier_dir = Path(tempfile.mkdtemp(prefix="spider-benchmark-"))
+    scraped = []
+
+    # The production pacing is measured unless overridden; only the item limit is added
+    settings = {**OlxApiSpider.custom_settings, "CLOSESPIDER_ITEMCOUNT": args.items}
+    if args.delay is not None:
+        settings["DOWNLOAD_DELAY"] = args.delay
+    if args.no_autothrottle:
+        settings["AUTOTHROTTLE_ENABLED"] = False
+
+    class BenchmarkSpider(OlxApiSpider):
+        name = "olx_api_benchmark"
+        allowed_domains = ["127.0.0.1", "localhost"]
+        api_base_url = f"{base_url}/api/v2/rec"
+        main_site_url = f"{base_url}/imoveis/aluguel/estado-pe"
+        ad_page_url = ad_base_url + "/vi/{list_id}"
+        custom_settings = settings
+
+        def parse_ad_page(self, response):
+            for item in super().parse_ad_page(response):
+                scraped.append(item)
+                yield item
+
+    process = CrawlerProcess({"LOG_LEVEL": "WARNING", "TELNETCONSOLE_ENABLED": False})
+    process.crawl(BenchmarkSpider, frontier_path=frontier_dir / "frontier.sqlite")
+
+    start = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    # Requests still in flight when the item limit is hit also get scraped
+    print(f"Scraped {len(scraped)} ads in {elapsed:.2f}s ({len(scraped) / elapsed:.1f} ads/s)")
+    print(
+        f"Serialized lower bound at {args.latency}s latency: "
+        f"{len(scraped) * args.latency:.2f}s ({1 / args.latency:.1f} ads/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+from pathlib import Path
+
+from real_estate_ml.config import (
+    GAZETTEER_PATH,
+    GEO_FEATURES_PATH,
+    GEOCODE_CACHE_PATH,
+    PROCESSED_DATASET_DIR,
+)
+from real_estate_ml.features.geo import DEFAULT_K, DEFAULT_WINDOW_DAYS, build_geo_features
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Geocode listings and compute neighborhood and kNN price features'
+    )
+    parser.add_argument('--dataset-dir', type=Path, default=PROCESSED_DATASET_DIR,
+                      help='Root of the partitioned listings dataset')
+    parser.add_argument('--gazetteer', type=Path, default=GAZETTEER_PATH,
+                      help='CSV of place centroids: state, city, neighborhood, lat, lon')
+    parser.add_argument('--cache', type=Path, default=GEOCODE_CACHE_PATH,
+                      help='SQLite file memoizing gazetteer lookups')
+    parser.add_argument('--output', type=Path, default=GEO_FEATURES_PATH,
+                      help='Parquet file for the geo features')
+    parser.add_argument('--k', type=int, default=DEFAULT_K,
+                      help='Nearest comparables per listing')
+    parser.add_argument('--window-days', type=int, default=DEFAULT_WINDOW_DAYS,
+                      help='Trailing window of the neighborhood price aggregates')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='kNN query threads (default: all cores)')
+    args = parser.parse_args()
+
+    build_geo_features(
+        args.output,
+        args.dataset_dir,
+        gazetteer_path=args.gazetteer,
+        cache_path=args.cache,
+        k=args.k,
+        window_days=args.window_days,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
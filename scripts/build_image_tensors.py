@@ -0,0 +1,35 @@
+import argparse
+from pathlib import Path
+
+from real_estate_ml.config import IMAGE_TENSORS_DIR, IMAGES_DIR
+from real_estate_ml.dataset import build_image_tensors
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Decode stored listing thumbnails once into a memory-mapped uint8 array'
+    )
+    parser.add_argument('--images-dir', type=Path, default=IMAGES_DIR,
+                      help='Root directory of the image store')
+    parser.add_argument('--output-dir', type=Path, default=IMAGE_TENSORS_DIR,
+                      help='Directory for images.npy and index.parquet')
+    parser.add_argument('--size', type=int, default=224,
+                      help='Side of the square images in pixels')
+    parser.add_argument('--max-images', type=int, default=None,
+                      help='Keep at most this many photos per listing')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Decoding threads (default: all cores)')
+    args = parser.parse_args()
+
+    build_image_tensors(
+        args.images_dir,
+        args.output_dir,
+        size=args.size,
+        max_images_per_listing=args.max_images,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+from pathlib import Path
+
+from real_estate_ml.config import PROCESSED_DATASET_DIR, TEXT_FEATURES_DIR
+from real_estate_ml.features.text import (
+    DEFAULT_N_FEATURES,
+    DEFAULT_TEXT_COLUMNS,
+    build_text_features,
+)
+from real_estate_ml.processing.dedup import DEFAULT_PARTITIONS
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Hash listing titles and descriptions into sparse TF-IDF shards'
+    )
+    parser.add_argument('--dataset-dir', type=Path, default=PROCESSED_DATASET_DIR,
+                      help='Root of the partitioned listings dataset')
+    parser.add_argument('--output-dir', type=Path, default=TEXT_FEATURES_DIR,
+                      help='Directory for idf.npz and the text-NNNNN.npz shards')
+    parser.add_argument('--columns', nargs='+', default=list(DEFAULT_TEXT_COLUMNS),
+                      help='Text columns concatenated per listing')
+    parser.add_argument('--n-features', type=int, default=DEFAULT_N_FEATURES,
+                      help='Number of hashed feature columns')
+    parser.add_argument('--max-ngram', type=int, default=2,
+                      help='Longest word n-gram')
+    parser.add_argument('--shard-rows', type=int, default=65_536,
+                      help='Approximate rows per shard')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Tokenizer processes (default: all cores)')
+    parser.add_argument('--reuse-idf', action='store_true',
+                      help='Keep the saved document frequencies instead of recounting them')
+    parser.add_argument('--spill-dir', type=Path, default=None,
+                      help='Directory for the dedup partitions (default: system temp)')
+    parser.add_argument('--dedup-partitions', type=int, default=DEFAULT_PARTITIONS,
+                      help='Number of partitions the texts are spilled to')
+    args = parser.parse_args()
+
+    build_text_features(
+        args.output_dir,
+        args.dataset_dir,
+        text_columns=args.columns,
+        n_features=args.n_features,
+        ngram_range=(1, args.max_ngram),
+        shard_rows=args.shard_rows,
+        workers=args.workers,
+        refit=not args.reuse_idf,
+        spill_dir=args.spill_dir,
+        dedup_partitions=args.dedup_partitions,
+    )
+
+
+if __name__ == "__main__":
+    main()
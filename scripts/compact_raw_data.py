@@ -0,0 +1,38 @@
+import argparse
+from pathlib import Path
+
+from real_estate_ml.processing.shards import (
+    DEFAULT_MAX_SHARD_BYTES,
+    SHARD_DIRNAME,
+    compact_directory,
+)
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Pack per-listing raw JSON files into compressed JSONL shards'
+    )
+    parser.add_argument('--source', type=str, default='zap', choices=['zap'],
+                      help='Source of the raw data (only zap stores one file per listing)')
+    parser.add_argument('--max-shard-mb', type=int,
+                      default=DEFAULT_MAX_SHARD_BYTES // (1024 * 1024),
+                      help='Compressed size in MB after which a new shard is started')
+    parser.add_argument('--remove-sources', action='store_true',
+                      help='Delete the JSON files once they are safely stored in a shard')
+    args = parser.parse_args()
+
+    # Define paths
+    project_root = Path(__file__).parents[1]
+    raw_data_dir = project_root / "data" / "raw" / args.source
+
+    compact_directory(
+        raw_data_dir,
+        raw_data_dir / SHARD_DIRNAME,
+        max_shard_bytes=args.max_shard_mb * 1024 * 1024,
+        remove_sources=args.remove_sources,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+from pathlib import Path
+
+from loguru import logger
+import pandas as pd
+
+from real_estate_ml.config import IMAGES_DIR, get_latest_processed_dir
+from real_estate_ml.legacy_scraping.collectors.images import ImageDownloader
+from real_estate_ml.processing.image_store import DEFAULT_THUMBNAIL_SIZES, ImageStore
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Download listing photos as deduplicated thumbnails'
+    )
+    parser.add_argument('--sources', nargs='+', default=['olx', 'zap'], choices=['olx', 'zap'],
+                      help='Sources whose latest processed listings provide the image URLs')
+    parser.add_argument('--images-dir', type=Path, default=IMAGES_DIR,
+                      help='Root directory of the image store')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_THUMBNAIL_SIZES),
+                      help='Square thumbnail sizes in pixels')
+    parser.add_argument('--concurrency', type=int, default=16,
+                      help='Downloads in flight at once')
+    parser.add_argument('--rate', type=float, default=10.0,
+                      help='Requests per second allowed per image host')
+    parser.add_argument('--limit', type=int, default=None,
+                      help='Only take the first N listings of each source')
+    args = parser.parse_args()
+
+    references = []
+    for source in args.sources:
+        latest_dir = get_latest_processed_dir(source)
+        if latest_dir is None:
+            logger.warning(f"No processed listings found for {source}, skipping")
+            continue
+        listings = pd.read_parquet(
+            latest_dir / "listings.parquet", columns=["listing_id", "image_url"]
+        ).dropna()
+        if args.limit:
+            listings = listings.head(args.limit)
+        references += [(source, row.listing_id, row.image_url) for row in listings.itertuples()]
+        logger.info(f"{len(listings)} {source} listings with an image URL")
+
+    # URLs linked by an interrupted run are picked up again even without new references
+    with ImageStore(args.images_dir, args.sizes) as store:
+        downloader = ImageDownloader(store, concurrency=args.concurrency, rate=args.rate)
+        asyncio.run(downloader.download(references))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+from pathlib import Path
+
+from real_estate_ml.config import IMAGE_EMBEDDINGS_DIR, IMAGES_DIR
+from real_estate_ml.features.images import DEFAULT_BACKBONE, DEFAULT_BATCH_SIZE, embed_images
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Embed stored listing photos with a pretrained CNN on CPU'
+    )
+    parser.add_argument('--images-dir', type=Path, default=IMAGES_DIR,
+                      help='Root directory of the image store')
+    parser.add_argument('--embeddings-dir', type=Path, default=IMAGE_EMBEDDINGS_DIR,
+                      help='Directory holding one embedding matrix per backbone')
+    parser.add_argument('--backbone', type=str, default=DEFAULT_BACKBONE,
+                      help='torchvision model name, e.g. resnet50 or efficientnet_b0')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                      help='Images per forward pass')
+    parser.add_argument('--threads', type=int, default=None,
+                      help='torch intra-op threads (default: one per core)')
+    parser.add_argument('--loader-workers', type=int, default=2,
+                      help='Threads decoding the upcoming batches')
+    parser.add_argument('--prefetch', type=int, default=4,
+                      help='Batches decoded ahead of the model')
+    args = parser.parse_args()
+
+    embeddings = embed_images(
+        args.images_dir,
+        args.embeddings_dir,
+        backbone=args.backbone,
+        batch_size=args.batch_size,
+        threads=args.threads,
+        loader_workers=args.loader_workers,
+        prefetch=args.prefetch,
+    )
+    embeddings.close()
+
+
+if __name__ == "__main__":
+    main()
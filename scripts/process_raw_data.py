@@ -1,8 +1,22 @@
 import argparse
 from pathlib import Path
 
-from real_estate_ml.config import get_processed_dir
+from loguru import logger
+import pandas as pd
+
+from real_estate_ml.config import (
+    CURRENT_DATE,
+    PROCESSED_DATASET_DIR,
+    get_latest_processed_dir,
+    get_manifest_path,
+    get_processed_dir,
+)
+from real_estate_ml.processing.dedup import DEFAULT_PARTITIONS
+from real_estate_ml.processing.manifest import RawFileManifest, merge_processed_data
+from real_estate_ml.processing.parallel import DEFAULT_CHUNKSIZE
 from real_estate_ml.processing.raw_data_processor import RawDataProcessor
+from real_estate_ml.processing.schema import apply_listing_schema
+from real_estate_ml.processing.sinks import OUTPUT_SUFFIXES, write_partitioned_dataset
 from real_estate_ml.processing.zap_processor import ZapDataProcessor
 
 
@@ -11,7 +25,35 @@ def main():
     parser = argparse.ArgumentParser(description='Process raw data from different sources')
     parser.add_argument('--source', type=str, required=True, choices=['olx', 'zap'],
                       help='Source of the raw data (olx or zap)')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Number of worker processes (0 uses all available cores)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                      help='Number of raw files handed to a worker at a time')
+    parser.add_argument('--stream', action='store_true',
+                      help='Stream OLX listings straight to Parquet with bounded memory')
+    parser.add_argument('--formats', nargs='+', default=['parquet', 'csv'],
+                      choices=list(OUTPUT_SUFFIXES),
+                      help='Output formats to write (default: parquet csv)')
+    parser.add_argument('--dataset', action='store_true',
+                      help='Also write to the partitioned Parquet dataset (source/state/city/crawl_date)')
+    parser.add_argument('--incremental', action='store_true',
+                      help='Only process new or changed raw files and merge them into the latest output')
+    parser.add_argument('--dedup', type=str, default='memory', choices=['memory', 'external'],
+                      help='OLX dedup: in memory (last copy wins) or spilled to disk (newest wins)')
+    parser.add_argument('--spill-dir', type=Path, default=None,
+                      help='Directory for the external dedup partitions (default: system temp)')
+    parser.add_argument('--dedup-partitions', type=int, default=DEFAULT_PARTITIONS,
+                      help='Number of partitions the external dedup spills listings to')
     args = parser.parse_args()
+    if args.stream and args.source != 'olx':
+        parser.error('--stream is only supported for the olx source')
+    if args.stream and (args.incremental or args.dataset):
+        parser.error('--stream cannot be combined with --incremental or --dataset')
+    if args.dedup == 'external' and args.source != 'olx':
+        parser.error('--dedup external is only supported for the olx source')
+    if args.incremental and 'parquet' not in args.formats:
+        # The next incremental run merges into the latest listings.parquet
+        parser.error('--incremental requires parquet in --formats')
     
     # Define paths
     project_root = Path(__file__).parents[1]
@@ -19,28 +61,71 @@ def main():
     
     # Create appropriate processor based on source
     if args.source == 'olx':
-        processor = RawDataProcessor(raw_data_dir)
+        processor = RawDataProcessor(
+            raw_data_dir,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            dedup=args.dedup,
+            spill_dir=args.spill_dir,
+            dedup_partitions=args.dedup_partitions,
+        )
     else:  # zap
-        processor = ZapDataProcessor(raw_data_dir)
+        processor = ZapDataProcessor(raw_data_dir, workers=args.workers, chunksize=args.chunksize)
     
     # Get processed directory
     processed_dir = get_processed_dir(args.source)
     processed_dir.mkdir(parents=True, exist_ok=True)
     
+    # Streaming mode writes Parquet batch by batch without building a DataFrame
+    if args.stream:
+        processor.stream_to_parquet(processed_dir / "listings.parquet")
+        return
+    
     # Process the data
-    processor.process_raw_data()
-    
-    # Save as Parquet (best for ML pipelines)
-    processor.save_processed_data(
-        processed_dir / "listings.parquet",
-        format="parquet"
-    )
-    
-    # Also save as CSV for easy viewing
-    processor.save_processed_data(
-        processed_dir / "listings.csv",
-        format="csv"
-    )
+    if args.incremental:
+        manifest = RawFileManifest(get_manifest_path(args.source), raw_data_dir)
+        changed_files = manifest.changed_files(processor.raw_files())
+        if not changed_files:
+            logger.info("No new or changed raw files, processed data is up to date")
+            return
+        
+        # Load the previous output before it can be overwritten by today's run
+        previous_dir = get_latest_processed_dir(args.source)
+        previous = (
+            pd.read_parquet(previous_dir / "listings.parquet")
+            if previous_dir is not None
+            else pd.DataFrame()
+        )
+        
+        processor.process_raw_data(changed_files)
+        new_rows = processor.processed_data
+        processor.processed_data = apply_listing_schema(merge_processed_data(previous, new_rows))
+    else:
+        processor.process_raw_data()
+        new_rows = processor.processed_data
+    
+    # Write every requested format from the same DataFrame
+    # (Parquet is best for ML pipelines, CSV for easy viewing)
+    written = processor.save_outputs(processed_dir, args.formats)
+    if len(written) != len(set(args.formats)):
+        raise SystemExit("Some output formats could not be written, see the log for details")
+    
+    # Partitioned copy for downstream jobs that only need some cities or dates; rows go
+    # to the partition of their own crawl date, and incremental runs merge the rows of
+    # the files they processed into the partitions already stored
+    if args.dataset:
+        write_partitioned_dataset(
+            new_rows,
+            PROCESSED_DATASET_DIR,
+            args.source,
+            CURRENT_DATE,
+            merge=args.incremental,
+        )
+    
+    # Only record the files once their rows were saved, and never the ones that failed
+    if args.incremental:
+        manifest.discard(processor.failed_files)
+        manifest.save()
 
 
 if __name__ == "__main__":
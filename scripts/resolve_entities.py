@@ -0,0 +1,49 @@
+import argparse
+
+from loguru import logger
+import pandas as pd
+
+from real_estate_ml.config import ENTITY_INDEX_DIR, get_latest_processed_dir, get_processed_dir
+from real_estate_ml.processing.entities import DEFAULT_THRESHOLD, assign_clusters
+from real_estate_ml.processing.sinks import OUTPUT_SUFFIXES, write_outputs
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Cluster listings of the same property across sources and crawls'
+    )
+    parser.add_argument('--sources', nargs='+', default=['olx', 'zap'], choices=['olx', 'zap'],
+                      help='Sources whose latest processed listings are clustered')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                      help='Minimum estimated Jaccard similarity of two listings in a cluster')
+    parser.add_argument('--formats', nargs='+', default=['parquet'],
+                      choices=list(OUTPUT_SUFFIXES),
+                      help='Output formats to write (default: parquet)')
+    args = parser.parse_args()
+
+    # Load the latest processed listings of every source
+    frames = []
+    for source in args.sources:
+        latest_dir = get_latest_processed_dir(source)
+        if latest_dir is None:
+            logger.warning(f"No processed listings found for {source}, skipping")
+            continue
+        frames.append(pd.read_parquet(latest_dir / "listings.parquet").assign(source=source))
+
+    if not frames:
+        raise SystemExit("No processed listings to cluster")
+
+    # Only listings not seen in earlier runs are hashed and compared
+    listings = assign_clusters(
+        pd.concat(frames, ignore_index=True), ENTITY_INDEX_DIR, threshold=args.threshold
+    )
+    logger.info(
+        f"{len(listings)} listings grouped into {listings['cluster_id'].nunique()} clusters"
+    )
+
+    write_outputs(listings, get_processed_dir("entities"), args.formats)
+
+
+if __name__ == "__main__":
+    main()
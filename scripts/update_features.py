@@ -0,0 +1,40 @@
+import argparse
+from pathlib import Path
+
+from loguru import logger
+
+from real_estate_ml.config import FEATURE_STORE_DIR, IMAGES_DIR, PROCESSED_DATASET_DIR
+from real_estate_ml.features.groups import default_feature_groups
+from real_estate_ml.features.store import FeatureStore
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Compute the features of new or changed listings into the feature store'
+    )
+    parser.add_argument('--dataset-dir', type=Path, default=PROCESSED_DATASET_DIR,
+                      help='Root of the partitioned listings dataset')
+    parser.add_argument('--store-dir', type=Path, default=FEATURE_STORE_DIR,
+                      help='Root directory of the feature store')
+    parser.add_argument('--images-dir', type=Path, default=IMAGES_DIR,
+                      help='Root directory of the image store')
+    parser.add_argument('--image-embeddings-dir', type=Path, default=None,
+                      help='Embedding store of the image group (default: most recent)')
+    parser.add_argument('--groups', nargs='+', default=None,
+                      help='Feature groups to update (default: all)')
+    parser.add_argument('--compact', action='store_true',
+                      help='Rewrite every group into a single part afterwards')
+    args = parser.parse_args()
+
+    groups = default_feature_groups(args.dataset_dir, args.images_dir, args.image_embeddings_dir)
+    store = FeatureStore(groups, args.store_dir)
+    computed = store.update(args.groups)
+    if args.compact:
+        for name in args.groups or store.groups:
+            store.compact(name)
+    logger.success(f"Feature store updated: {computed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from real_estate_ml.processing.entities import assign_clusters
+
+
+def _listings(**zap_fields):
+    olx = {
+        "source": "olx",
+        "listing_id": "1001",
+        "title": "Apartamento 3 quartos com varanda em Boa Viagem",
+        "city": "Recife",
+        "neighborhood": "Boa Viagem",
+        "price": 3500.0,
+        "address": None,
+        "area": None,
+        "bedrooms": None,
+    }
+    zap = {
+        **olx,
+        "source": "zap",
+        "listing_id": "2002",
+        "address": "Rua dos Navegantes, 1200 - Boa Viagem, Recife",
+        "area": 95.0,
+        "bedrooms": 3,
+        **zap_fields,
+    }
+    return pd.DataFrame([olx, zap])
+
+
+def test_same_property_on_olx_and_zap_is_one_entity(tmp_path):
+    clustered = assign_clusters(_listings(), tmp_path)
+
+    assert clustered["cluster_id"].nunique() == 1
+
+
+def test_addresses_are_compared_when_both_listings_have_one(tmp_path):
+    other_address = _listings(listing_id="3003", address="Avenida Conselheiro Aguiar, 40 - Pina")
+    listings = pd.concat([_listings().iloc[[1]], other_address.iloc[[1]]], ignore_index=True)
+
+    clustered = assign_clusters(listings, tmp_path)
+
+    assert clustered["cluster_id"].nunique() == 2
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from real_estate_ml.features.geo import knn_price_per_m2
+
+
+def test_knn_prices_only_come_from_earlier_crawls():
+    # A query listing and two comparables crawled on day 1, nearby
+    coordinates = np.array([[-8.12, -34.90], [-8.121, -34.90], [-8.12, -34.901]])
+    log_price_m2 = np.array([np.nan, 3.0, 3.2])
+    days = np.array([1.0, 1.0, 1.0])
+    before, _ = knn_price_per_m2(coordinates, log_price_m2, days, k=3, workers=1)
+
+    # An expensive listing crawled later, right next to the query listing
+    later, _ = knn_price_per_m2(
+        np.vstack([coordinates, [[-8.12, -34.9001]]]),
+        np.append(log_price_m2, 6.0),
+        np.append(days, 2.0),
+        k=3,
+        workers=1,
+    )
+
+    assert before[0] == pytest.approx(3.1)
+    assert later[0] == before[0]
+    assert later[3] == pytest.approx(3.1)
@@ -0,0 +1,54 @@
+import json
+
+import pandas as pd
+import pytest
+
+from real_estate_ml.processing.raw_data_processor import RawDataProcessor
+from real_estate_ml.processing.schema import apply_listing_schema
+
+
+def _listing(list_id, price, date_ts):
+    return {
+        "list_id": list_id,
+        "subject": f"Apartamento {list_id}",
+        "price": f"R$ {price}",
+        "category": RawDataProcessor.RENT_CATEGORY,
+        "municipality": "Recife",
+        "neighbourhood": "Boa Viagem",
+        "state_uf": "pe",
+        "date_ts": date_ts,
+    }
+
+
+def _write_response(path, listings):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps([{"type": "SingleGallery", "content": listings}]))
+
+
+@pytest.fixture
+def raw_data_dir(tmp_path):
+    raw_data_dir = tmp_path / "raw"
+    _write_response(
+        raw_data_dir / "a.json",
+        [_listing(1, 1000, 100), _listing(2, 2000, 100), _listing(3, 3000, 100)],
+    )
+    # Later copies of listings 1 and 3, the last copy of listing 1 being an older version
+    _write_response(raw_data_dir / "b.json", [_listing(3, 3500, 300), _listing(1, 1500, 200)])
+    _write_response(raw_data_dir / "c.json", [_listing(4, 4000, 100), _listing(1, 1200, 50)])
+    return raw_data_dir
+
+
+# Memory dedup keeps the last copy read, external dedup the newest version
+@pytest.mark.parametrize("dedup, price", [("memory", 1200), ("external", 1500)])
+def test_streaming_keeps_the_same_listings_as_processing(raw_data_dir, tmp_path, dedup, price):
+    processor = RawDataProcessor(raw_data_dir, dedup=dedup, spill_dir=tmp_path / "spill")
+    processor.process_raw_data()
+
+    output_path = tmp_path / "listings.parquet"
+    processor.stream_to_parquet(output_path)
+    streamed = apply_listing_schema(pd.read_parquet(output_path))
+
+    listings = processor.processed_data.set_index("listing_id")
+    assert sorted(listings.index) == [1, 2, 3, 4]
+    assert listings.loc[1, "price"] == price
+    pd.testing.assert_frame_equal(streamed, processor.processed_data)